@@ -0,0 +1,146 @@
+import logging
+from enum import Enum
+from dataclasses import dataclass
+from typing import Dict, Callable, Optional, Tuple
+
+import numpy as np
+
+from core.evaluation.distance import calculate_total_distance_of_paths
+from core.evaluation import kernels as evaluation_kernels
+from core.crossover.crossover import CrossoverType, CROSSOVER_OPERATORS
+from core.crossover.crossover_alogrithm import draw_cut_points
+from core.crossover import kernels as crossover_kernels
+from core.mutation import kernels as mutation_kernels
+from core.local_search.local_search import two_opt_or_opt
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+logger = logging.getLogger("Backend")
+
+"""
+Backends for the hot loops of the genetic algorithm
+The numpy backend runs the vectorised operators.
+The numba backend compiles the loop kernels of core.evaluation, core.crossover, core.mutation
+and core.local_search,
+when Numba is not installed it falls back to the numpy backend.
+With cache enabled the compiled kernels are written to disk next to their source,
+so the JIT cost is paid once per machine instead of once per process;
+warmup compiles every kernel straight away instead of on first use, for every dtype of
+distance matrix core.evaluation.distance.generate_problem_distance_matrix picks.
+"""
+
+# float64 for the real valued metrics, int32 for the integer metrics and explicit edge weights
+WARMUP_DISTANCE_DTYPES = (np.float64, np.int32)
+
+class BackendType(Enum):
+    NUMPY = 'numpy'
+    NUMBA = 'numba'
+
+@dataclass(frozen=True)
+class Backend:
+    name: BackendType
+    # (tours, N) paths, distance matrix -> total distance of each tour
+    tour_lengths: Callable[[np.ndarray, np.ndarray], np.ndarray]
+    # batched crossover operator of each crossover type
+    crossover_operators: Dict[CrossoverType, Callable[..., Tuple[np.ndarray, np.ndarray]]]
+    # compiled mutation kernel, None to apply the mutation operators one row at a time
+    mutation_kernel: Optional[Callable] = None
+    # compiled 2-opt / Or-opt search, None to run core.local_search.local_search.two_opt_or_opt as Python
+    local_search_kernel: Optional[Callable] = None
+
+_backends: Dict[Tuple[BackendType, bool], Backend] = {}
+
+def _compiled_crossover(kernel: Callable) -> Callable[..., Tuple[np.ndarray, np.ndarray]]:
+    def crossover(
+            parents1: np.ndarray,
+            parents2: np.ndarray,
+            starts: Optional[np.ndarray] = None,
+            ends: Optional[np.ndarray] = None,
+            rng: Optional[np.random.Generator] = None,
+        ) -> Tuple[np.ndarray, np.ndarray]:
+        if starts is None or ends is None:
+            starts, ends = draw_cut_points(*parents1.shape, rng)
+        return kernel(
+            np.ascontiguousarray(parents1),
+            np.ascontiguousarray(parents2),
+            starts,
+            ends
+        )
+    return crossover
+
+def _warmup(backend: Backend):
+    paths = np.array([[0, 1, 2, 3], [3, 2, 1, 0]], dtype=np.int32)
+    for operator in backend.crossover_operators.values():
+        operator(paths[:1], paths[1:], np.array([1]), np.array([3]))
+
+    # the kernels reading the distance matrix are compiled once per matrix dtype
+    for dtype in WARMUP_DISTANCE_DTYPES:
+        distance_matrix = np.ones((4, 4), dtype=dtype)
+        distances = backend.tour_lengths(paths, distance_matrix)
+        if backend.mutation_kernel is not None:
+            backend.mutation_kernel(
+                paths.copy(),
+                distances,
+                np.array([0, 1]),
+                np.array([mutation_kernels.SWAP, mutation_kernels.SCRAMBLE]),
+                np.array([0, 1]),
+                np.array([2, 3]),
+                np.array([0.5]),
+                distance_matrix
+            )
+        if backend.local_search_kernel is not None:
+            neighbours = np.array([[1, 2], [0, 2], [1, 3], [2, 4], [3, 0]], dtype=np.int32)
+            backend.local_search_kernel(
+                np.array([0, 2, 4, 1, 3], dtype=np.int32),
+                np.ones((5, 5), dtype=dtype),
+                neighbours,
+                3
+            )
+
+def get_backend(
+        name: str = 'numpy',
+        cache: bool = True,
+        warmup: bool = False,
+    ) -> Backend:
+    """
+    Get the backend used by the hot loops of the genetic algorithm
+    :param name: str - 'numpy' or 'numba'
+    :param cache: bool - write the compiled kernels to disk and reuse them in later processes
+    :param warmup: bool - compile every kernel now instead of on first use
+    :return: Backend
+    """
+    backend_type = BackendType(name)
+
+    if backend_type == BackendType.NUMBA and numba is None:
+        logger.warning('Numba is not installed, falling back to the numpy backend')
+        backend_type = BackendType.NUMPY
+
+    if (backend_type, cache) in _backends:
+        backend = _backends[(backend_type, cache)]
+    elif backend_type == BackendType.NUMPY:
+        backend = Backend(
+            name=backend_type,
+            tour_lengths=calculate_total_distance_of_paths,
+            crossover_operators=dict(CROSSOVER_OPERATORS),
+        )
+    else:
+        jit = numba.njit(cache=cache)
+        backend = Backend(
+            name=backend_type,
+            tour_lengths=jit(evaluation_kernels.tour_lengths_kernel),
+            crossover_operators={
+                CrossoverType.OX: _compiled_crossover(jit(crossover_kernels.ordered_crossover_kernel)),
+                CrossoverType.PMX: _compiled_crossover(jit(crossover_kernels.partial_mapped_crossover_kernel)),
+            },
+            mutation_kernel=jit(mutation_kernels.mutate_kernel),
+            local_search_kernel=jit(two_opt_or_opt),
+        )
+    _backends[(backend_type, cache)] = backend
+
+    if warmup and backend_type == BackendType.NUMBA:
+        _warmup(backend)
+
+    return backend
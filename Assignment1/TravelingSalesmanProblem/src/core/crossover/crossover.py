@@ -1,46 +1,117 @@
-import random
 from enum import Enum
-from typing import List, Dict
-from core.models.population import Individual
-from core.crossover.crossover_alogrithm import ordered_crossover, partial_mapped_crossover
+from typing import Dict, Tuple, Callable, Optional
+
+import numpy as np
+
+from core.crossover.crossover_alogrithm import batch_ordered_crossover, batch_partial_mapped_crossover, \
+    draw_cut_points
+from core.crossover.edge_crossover import batch_edge_recombination_crossover, batch_edge_assembly_crossover
 
 class CrossoverType(Enum):
     OX = 'ox'
     PMX = 'pmx'
+    ERX = 'erx'
+    EAX = 'eax'
+
+# batched operator of each cut point crossover type, see core.crossover.crossover_alogrithm
+# (parents1, parents2, starts, ends) -> children1, children2
+CROSSOVER_OPERATORS: Dict[CrossoverType, Callable[..., Tuple[np.ndarray, np.ndarray]]] = {
+    CrossoverType.OX: batch_ordered_crossover,
+    CrossoverType.PMX: batch_partial_mapped_crossover,
+}
+
+# batched operator of each edge-preserving crossover type, see core.crossover.edge_crossover
+# (parents1, parents2, distance_matrix, neighbours, rng) -> children1, children2
+EDGE_CROSSOVER_OPERATORS: Dict[CrossoverType, Callable[..., Tuple[np.ndarray, np.ndarray]]] = {
+    CrossoverType.ERX: batch_edge_recombination_crossover,
+    CrossoverType.EAX: batch_edge_assembly_crossover,
+}
 
 def apply_crossover(
-        parents: List[Individual],
+        parents: np.ndarray,
         crossover_type: Dict[CrossoverType, int],
         chance_of_crossover: int,
-    ):
-    offspring: List[Individual] = []
-    random.shuffle(parents)
-
-    for i in range(0, len(parents), 2):
-        if i + 1 >= len(parents):
-            # if we have an odd number of parents, we just add the last parent to the offspring
-            offspring.append(parents[i])
-            break
-
-        # Perform Crossover
-        if random.randint(0, 100) < chance_of_crossover:
-            if CrossoverType.OX in crossover_type and \
-                CrossoverType.PMX in crossover_type:
-                crossover_type_chance = random.randint(0, 100)
-                if crossover_type_chance < crossover_type[CrossoverType.OK]:
-                    child1, child2 = ordered_crossover(parents[i], parents[i+1])
-                else:
-                    child1, child2 = partial_mapped_crossover(parents[i], parents[i+1])
-            elif CrossoverType.OX in crossover_type:
-                child1, child2 = ordered_crossover(parents[i], parents[i+1])
-            else: # PMX
-                child1, child2 = partial_mapped_crossover(parents[i], parents[i+1])
-
-            offspring.append(child1)
-            offspring.append(child2)
+        crossover_operators: Optional[Dict[CrossoverType, Callable[..., Tuple[np.ndarray, np.ndarray]]]] = None,
+        rng: Optional[np.random.Generator] = None,
+        distance_matrix: Optional[np.ndarray] = None,
+        neighbours: Optional[np.ndarray] = None,
+        applied: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Apply crossover to the selected parents
+    Consecutive rows are paired up, the caller shuffles the parents beforehand.
+    Every pair first draws whether it is crossed over and with which operator,
+    then each operator runs once over all of its pairs.
+    Each pair of rows is overwritten by its children, so no new tours are allocated outside the operators
+    :param parents: np.ndarray - (parents, N) matrix of the selected paths, owned by the caller
+    :param crossover_type: Dict[CrossoverType, int] - the crossover type and their probabilities
+    :param chance_of_crossover: int - the chance of crossover
+    :param crossover_operators: Dict[CrossoverType, Callable] - operators overriding CROSSOVER_OPERATORS,
+        see core.backend
+    :param rng: np.random.Generator - draws the pairs to cross, their operator and their slices,
+        a fresh one if not given
+    :param distance_matrix: np.ndarray - the distance matrix, needed by the edge-preserving operators
+    :param neighbours: np.ndarray - (N, k) neighbour lists of the edge-preserving operators
+    :param applied: np.ndarray - filled in place with the index in crossover_type of the operator
+        that produced every row, -1 for the rows that were not crossed over
+    :return: Tuple[np.ndarray, np.ndarray] - (parents, N) matrix of the offspring paths,
+        and a mask of the rows that were replaced by children and need to be evaluated
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    offspring = parents
+    crossed = np.zeros(len(offspring), dtype=bool)
+    operators = {**CROSSOVER_OPERATORS, **(crossover_operators or {})}
+
+    # if we have an odd number of parents, the last parent is kept as offspring
+    pairs = len(offspring) // 2
+    if applied is not None:
+        applied[:] = -1
+    if pairs == 0:
+        return offspring, crossed
+
+    # views on the first and second parent of every pair
+    first_parents = offspring[0:2 * pairs:2]
+    second_parents = offspring[1:2 * pairs:2]
+
+    # same chance as random.randint(0, 100) < chance_of_crossover for every pair
+    pair_crossed = rng.integers(0, 101, size=pairs) < chance_of_crossover
+
+    crossover_types = list(crossover_type.keys())
+    total = sum(crossover_type.values())
+    crossover_probabilities = [value / total for value in crossover_type.values()]
+    pair_operator = rng.choice(len(crossover_types), size=pairs, p=crossover_probabilities)
+
+    for operator_index, operator_type in enumerate(crossover_types):
+        selected = np.flatnonzero(pair_crossed & (pair_operator == operator_index))
+        if selected.size == 0:
+            continue
+
+        if operator_type in EDGE_CROSSOVER_OPERATORS:
+            assert distance_matrix is not None, f'{operator_type.name} needs the distance matrix'
+            children1, children2 = EDGE_CROSSOVER_OPERATORS[operator_type](
+                first_parents[selected],
+                second_parents[selected],
+                distance_matrix,
+                neighbours,
+                rng
+            )
         else:
-            # if no crossover is performed, we just add the parents to the offspring
-            offspring.append(parents[i])
-            offspring.append(parents[i+1])
+            starts, ends = draw_cut_points(len(selected), offspring.shape[1], rng)
+            children1, children2 = operators[operator_type](
+                first_parents[selected],
+                second_parents[selected],
+                starts,
+                ends
+            )
+        first_parents[selected] = children1
+        second_parents[selected] = children2
+
+    # if no crossover is performed, the parents are kept as offspring
+    crossed[0:2 * pairs] = np.repeat(pair_crossed, 2)
+
+    if applied is not None:
+        applied[0:2 * pairs] = np.where(np.repeat(pair_crossed, 2), np.repeat(pair_operator, 2), -1)
 
-    return offspring
+    return offspring, crossed
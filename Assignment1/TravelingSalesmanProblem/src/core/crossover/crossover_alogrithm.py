@@ -1,68 +1,169 @@
-from typing import Tuple
+from typing import Tuple, Optional
 
 import numpy as np
 
-from core.models.population import Individual
-
-def ordered_crossover(
-        parent1: Individual,
-        parent2: Individual,
-    ) -> Tuple[Individual, Individual]:
+"""
+The crossover operators work on whole (pairs, N) parent matrices at once.
+Instead of per-gene dict lookups and `in set` checks, every kernel uses
+index arrays: a (pairs, N) membership mask indexed by city,
+or a (pairs, N) mapping array indexed by city, so each step of the operator
+is a single vectorised operation over every pair.
+"""
+
+def draw_cut_points(
+        pairs: int,
+        chromosome_length: int,
+        rng: Optional[np.random.Generator] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Implementation of the Ordered Crossover algorithm
-    :param parent1: Individual - the first parent
-    :param parent2: Individual - the second parent
-    :param seed: int - random seed
-    :return: Tuple[Individual, Individual] - the two offspring
+    Draw the [start, end) slice of every pair, with the same distribution
+    as drawing two random positions per pair and ordering them
+    :param pairs: int - the number of parent pairs
+    :param chromosome_length: int - the length of the chromosome
+    :param rng: np.random.Generator - the random number generator, a fresh one if not given
+    :return: Tuple[np.ndarray, np.ndarray] - the start and end of each slice
     """
+    if rng is None:
+        rng = np.random.default_rng()
+    random_subset = rng.integers(0, chromosome_length, size=(pairs, 2))
+    return random_subset.min(axis=1), random_subset.max(axis=1)
+
+def _segment_mask(
+        starts: np.ndarray,
+        ends: np.ndarray,
+        chromosome_length: int,
+    ) -> np.ndarray:
+    positions = np.arange(chromosome_length)
+    return (positions >= starts[:, np.newaxis]) & (positions < ends[:, np.newaxis])
+
+def _ordered_crossover_kernel(
+        donor: np.ndarray,
+        filler: np.ndarray,
+        segment: np.ndarray,
+    ) -> np.ndarray:
+    """
+    The child keeps the segment of the donor in place and takes the remaining cities
+    in the order they appear in the filler
+    """
+    rows = np.arange(len(donor))[:, np.newaxis]
+
+    # city_in_segment[pair, city] is True when the donor holds that city inside the segment
+    city_in_segment = np.zeros(donor.shape, dtype=bool)
+    city_in_segment[rows, donor] = segment
+    keep = ~city_in_segment[rows, filler]
+
+    # every row keeps as many filler cities as it has free positions,
+    # so the row-major boolean assignment fills each row in order
+    child = donor.copy()
+    child[~segment] = filler[keep]
+    return child
+
+def _partial_mapped_crossover_kernel(
+        base: np.ndarray,
+        donor: np.ndarray,
+        segment: np.ndarray,
+    ) -> np.ndarray:
+    """
+    The child takes the segment of the donor and the remaining genes of the base,
+    genes outside the segment are repaired through the mapping donor[i] -> base[i]
+    until they no longer clash with the segment
+    """
+    pairs, chromosome_length = base.shape
+    rows = np.arange(pairs)[:, np.newaxis]
+
+    # mapping[pair, city] is the city it is replaced with, the identity outside the segment
+    mapping = np.empty_like(base)
+    mapping[rows, donor] = np.where(segment, base, donor)
+
+    child = np.where(segment, donor, base)
+
+    # genes outside the segment that clash with it, every repair step follows the mapping
+    # once for all of them and drops the genes that no longer clash
+    pair_index, position = np.nonzero(~segment & (mapping[rows, child] != child))
+    genes = child[pair_index, position]
+    while pair_index.size:
+        genes = mapping[pair_index, genes]
+        child[pair_index, position] = genes
+        clashing = mapping[pair_index, genes] != genes
+        pair_index, position, genes = pair_index[clashing], position[clashing], genes[clashing]
+
+    return child
+
+def batch_ordered_crossover(
+        parents1: np.ndarray,
+        parents2: np.ndarray,
+        starts: Optional[np.ndarray] = None,
+        ends: Optional[np.ndarray] = None,
+        rng: Optional[np.random.Generator] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ordered Crossover of many parent pairs at once
+    :param parents1: np.ndarray - (pairs, N) paths of the first parents
+    :param parents2: np.ndarray - (pairs, N) paths of the second parents
+    :param starts: np.ndarray - the start of each slice, drawn if not given
+    :param ends: np.ndarray - the end of each slice, drawn if not given
+    :param rng: np.random.Generator - draws the slices, a fresh one if not given
+    :return: Tuple[np.ndarray, np.ndarray] - (pairs, N) paths of the two offspring of each pair
+    """
+    assert parents1.shape == parents2.shape, 'The length of the chromosomes should be the same'
+    pairs, chromosome_length = parents1.shape
+
+    if starts is None or ends is None:
+        starts, ends = draw_cut_points(pairs, chromosome_length, rng)
+    segment = _segment_mask(starts, ends, chromosome_length)
+
+    children1 = _ordered_crossover_kernel(parents1, parents2, segment)
+    children2 = _ordered_crossover_kernel(parents2, parents1, segment)
+    return children1, children2
+
+def batch_partial_mapped_crossover(
+        parents1: np.ndarray,
+        parents2: np.ndarray,
+        starts: Optional[np.ndarray] = None,
+        ends: Optional[np.ndarray] = None,
+        rng: Optional[np.random.Generator] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Partial Mapped Crossover of many parent pairs at once
+    :param parents1: np.ndarray - (pairs, N) paths of the first parents
+    :param parents2: np.ndarray - (pairs, N) paths of the second parents
+    :param starts: np.ndarray - the start of each slice, drawn if not given
+    :param ends: np.ndarray - the end of each slice, drawn if not given
+    :param rng: np.random.Generator - draws the slices, a fresh one if not given
+    :return: Tuple[np.ndarray, np.ndarray] - (pairs, N) paths of the two offspring of each pair
+    """
+    assert parents1.shape == parents2.shape, 'The length of the chromosomes should be the same'
+    pairs, chromosome_length = parents1.shape
 
-    # Get the length of the chromosome
-    assert len(parent1.path) == len(parent2.path), 'The length of the chromosomes should be the same'
-    chromosome_length = len(parent1.path)
-
-    # Initialize the child paths
-    child1_path = np.full((chromosome_length,), -1, dtype=int)
-    child2_path = np.full((chromosome_length,), -1, dtype=int)
-
-    random_subset = np.random.randint(0, chromosome_length, 2)
-    start, end = min(random_subset), max(random_subset)
-    subset1 = parent1.path[start:end]
-    subset2 = parent2.path[start:end]
-
-    # Copy the subset to the child paths
-    child1_path[start:end] = subset1
-    child2_path[start:end] = subset2
-
-    set1 = set(subset1)
-    set2 = set(subset2)
-
-    # Fill the remaining slots
-    parent2_index = 0
-    for i in range(chromosome_length):
-        if child1_path[i] == -1:
-            while parent2.path[parent2_index] in set1:
-                parent2_index += 1
-            child1_path[i] = parent2.path[parent2_index]
-            parent2_index += 1
-
-    parent1_index = 0
-    for i in range(chromosome_length):
-        if child2_path[i] == -1:
-            while parent1.path[parent1_index] in set2:
-                parent1_index += 1
-            child2_path[i] = parent1.path[parent1_index]
-            parent1_index += 1
+    if starts is None or ends is None:
+        starts, ends = draw_cut_points(pairs, chromosome_length, rng)
+    segment = _segment_mask(starts, ends, chromosome_length)
 
-    child1 = Individual(path=child1_path, distance=0, fitness=0)
-    child2 = Individual(path=child2_path, distance=0, fitness=0)
+    children1 = _partial_mapped_crossover_kernel(parents1, parents2, segment)
+    children2 = _partial_mapped_crossover_kernel(parents2, parents1, segment)
+    return children1, children2
 
-    return child1, child2
+def ordered_crossover(
+        parent1: np.ndarray,
+        parent2: np.ndarray,
+        rng: Optional[np.random.Generator] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Implementation of the Ordered Crossover algorithm
+    :param parent1: np.ndarray - the path of the first parent
+    :param parent2: np.ndarray - the path of the second parent
+    :param rng: np.random.Generator - draws the slice, a fresh one if not given
+    :return: Tuple[np.ndarray, np.ndarray] - the paths of the two offspring
+    """
+    children1, children2 = batch_ordered_crossover(parent1[np.newaxis, :], parent2[np.newaxis, :], rng=rng)
+    return children1[0], children2[0]
 
 
 def partial_mapped_crossover(
-        parent1: Individual,
-        parent2: Individual,
-    ) -> Tuple[Individual, Individual]:
+        parent1: np.ndarray,
+        parent2: np.ndarray,
+        rng: Optional[np.random.Generator] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
     """
     Implementation of the Partial Mapped Crossover algorithm
 
@@ -70,47 +171,10 @@ def partial_mapped_crossover(
     https://observablehq.com/@swissmanu/pmx-crossover
     for code inspiration
 
-    :param parent1: List[int] - the first parent
-    :param parent2: List[int] - the second parent
-    :param seed: int - random seed
-    :return: Tuple[Individual, Individual] - the two offspring
+    :param parent1: np.ndarray - the path of the first parent
+    :param parent2: np.ndarray - the path of the second parent
+    :param rng: np.random.Generator - draws the slice, a fresh one if not given
+    :return: Tuple[np.ndarray, np.ndarray] - the paths of the two offspring
     """
-
-    # Get the length of the chromosome
-    assert len(parent1.path) == len(parent2.path), 'The length of the chromosomes should be the same'
-    chromosome_length = len(parent1.path)
-
-    random_subset = np.random.randint(0, chromosome_length, 2)
-    start, end = min(random_subset), max(random_subset)
-
-    child1_path = parent1.path[:]
-    child2_path = parent2.path[:]
-    mapping1 = {}
-    mapping2 = {}
-
-    # Map Slice:
-    for i in range(start, end):
-        mapping1[parent2.path[i]] = parent1.path[i]
-        child1_path[i] = parent2.path[i]
-
-        mapping2[parent1.path[i]] = parent2.path[i]
-        child2_path[i] = parent1.path[i]
-
-    # Repair Lower Slice:
-    for i in range(start):
-        while child1_path[i] in mapping1:
-            child1_path[i] = mapping1[child1_path[i]]
-        while child2_path[i] in mapping2:
-            child2_path[i] = mapping2[child2_path[i]]
-
-    # Repair Upper Slice:
-    for i in range(end, len(child1_path)):
-        while child1_path[i] in mapping1:
-            child1_path[i] = mapping1[child1_path[i]]
-        while child2_path[i] in mapping2:
-            child2_path[i] = mapping2[child2_path[i]]
-
-    child1 = Individual(path=child1_path, distance=0, fitness=0)
-    child2 = Individual(path=child2_path, distance=0, fitness=0)
-
-    return child1, child2
+    children1, children2 = batch_partial_mapped_crossover(parent1[np.newaxis, :], parent2[np.newaxis, :], rng=rng)
+    return children1[0], children2[0]
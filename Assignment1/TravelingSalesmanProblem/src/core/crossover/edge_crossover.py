@@ -0,0 +1,364 @@
+import heapq
+from typing import List, Tuple, Optional
+
+import numpy as np
+
+from core.models.population import PATH_DTYPE
+from core.evaluation.distance import generate_neighbour_lists
+
+"""
+Edge-preserving crossover operators
+OX and PMX keep the positions and the order of cities, but the length of a tour only depends
+on its edges. These operators build the children from the edges of the parents instead:
+- Edge Recombination (ERX) walks an edge table holding the up to four neighbours of every city in
+  both parents, always moving to the neighbour with the fewest neighbours left, shorter edge first.
+  All children of a batch are built in lockstep, one city per step
+- Edge Assembly Crossover (EAX) decomposes the union of both parents into AB-cycles, edges taken
+  alternately from each parent. The child is the first parent with the most improving AB-cycle
+  swapped in, and the subtours this leaves are merged back with the cheapest 2-opt style
+  exchange over the neighbour lists, smallest subtour first. Only the cities of the smaller subtour
+  are relabelled on a merge, so a pair costs O(N log N) with the neighbour lists. A subtour whose
+  neighbour lists all stay inside it falls back to every outside city from 32 of its edges, O(N) per
+  such merge. It works one pair at a time, and is the operator of choice on larger instances
+Both operators take the distance matrix and the neighbour lists, the cut points of apply_crossover are not used.
+"""
+
+# number of neighbours per city the subtour merge of EAX tries when no lists are given
+EAX_NEIGHBOURS = 10
+
+def edge_table(parents1: np.ndarray, parents2: np.ndarray) -> np.ndarray:
+    """
+    Get the edge table of every pair of parents
+    :param parents1: np.ndarray - (pairs, N) paths of the first parents
+    :param parents2: np.ndarray - (pairs, N) paths of the second parents
+    :return: np.ndarray - (pairs, N, 4) the previous and next city of every city in the first parent,
+        then in the second parent, an edge found in both parents appears twice
+    """
+    pairs, chromosome_length = parents1.shape
+    rows = np.arange(pairs)[:, np.newaxis]
+    table = np.empty((pairs, chromosome_length, 4), dtype=parents1.dtype)
+    for offset, parents in [(0, parents1), (2, parents2)]:
+        table[rows, parents, offset] = np.roll(parents, 1, axis=1)
+        table[rows, parents, offset + 1] = np.roll(parents, -1, axis=1)
+    return table
+
+def _edge_recombination(
+        table: np.ndarray,
+        starts: np.ndarray,
+        distance_matrix: np.ndarray,
+        neighbours: Optional[np.ndarray],
+        rng: np.random.Generator,
+    ) -> np.ndarray:
+    """
+    Walk the edge table of every row from its start city
+    """
+    tours, chromosome_length, _ = table.shape
+    rows = np.arange(tours)
+    children = np.empty((tours, chromosome_length), dtype=PATH_DTYPE)
+    visited = np.zeros((tours, chromosome_length), dtype=bool)
+    # earlier[j, k] is True when entry k comes before entry j, to count a shared edge once
+    earlier = np.tri(4, k=-1, dtype=bool)
+
+    current = starts.astype(np.int64)
+    children[:, 0] = current
+    visited[rows, current] = True
+
+    for step in range(1, chromosome_length):
+        candidates = table[rows, current]
+        repeated = ((candidates[:, :, np.newaxis] == candidates[:, np.newaxis, :]) & earlier).any(axis=2)
+        usable = ~visited[rows[:, np.newaxis], candidates] & ~repeated
+
+        # neighbours each candidate has left, shared edges counted once
+        candidate_entries = table[rows[:, np.newaxis], candidates]
+        entries_repeated = (
+            (candidate_entries[..., :, np.newaxis] == candidate_entries[..., np.newaxis, :]) & earlier
+        ).any(axis=3)
+        remaining = (~visited[rows[:, np.newaxis, np.newaxis], candidate_entries] & ~entries_repeated).sum(axis=2)
+
+        # fewest neighbours left first, ties to the shorter edge
+        lengths = np.asarray(distance_matrix[current[:, np.newaxis], candidates], dtype=np.float64)
+        key = remaining + lengths / (lengths.max(axis=1, keepdims=True) + 1.0)
+        key = np.where(usable, key, np.inf)
+        choice = key.argmin(axis=1)
+        following = candidates[rows, choice].astype(np.int64)
+
+        for tour in np.flatnonzero(~usable.any(axis=1)):
+            # every neighbour is used, move to the nearest unvisited city of the neighbour list or a random one
+            if neighbours is not None:
+                near = neighbours[current[tour]]
+                near = near[~visited[tour, near]]
+                if len(near):
+                    following[tour] = near[0]
+                    continue
+            following[tour] = rng.choice(np.flatnonzero(~visited[tour]))
+
+        current = following
+        children[:, step] = current
+        visited[rows, current] = True
+
+    return children
+
+def batch_edge_recombination_crossover(
+        parents1: np.ndarray,
+        parents2: np.ndarray,
+        distance_matrix: np.ndarray,
+        neighbours: Optional[np.ndarray] = None,
+        rng: Optional[np.random.Generator] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Edge Recombination Crossover of many parent pairs at once
+    :param parents1: np.ndarray - (pairs, N) paths of the first parents
+    :param parents2: np.ndarray - (pairs, N) paths of the second parents
+    :param distance_matrix: np.ndarray - the distance matrix, breaks ties between neighbours
+    :param neighbours: np.ndarray - (N, k) neighbour lists, tried before a random city on a dead end
+    :param rng: np.random.Generator - draws the random cities, a fresh one if not given
+    :return: Tuple[np.ndarray, np.ndarray] - (pairs, N) paths of the two offspring of each pair,
+        starting from the first city of the first and of the second parent
+    """
+    assert parents1.shape == parents2.shape, 'The length of the chromosomes should be the same'
+    if rng is None:
+        rng = np.random.default_rng()
+
+    pairs = len(parents1)
+    # both children of a pair share the edge table, they only differ in their start city
+    table = edge_table(parents1, parents2)
+    children = _edge_recombination(
+        np.concatenate([table, table]),
+        np.concatenate([parents1[:, 0], parents2[:, 0]]),
+        distance_matrix,
+        neighbours,
+        rng
+    )
+    return children[:pairs], children[pairs:]
+
+def _links(path: np.ndarray) -> np.ndarray:
+    # (N, 2) previous and next city of every city of the tour
+    links = np.empty((len(path), 2), dtype=np.int64)
+    links[path, 0] = np.roll(path, 1)
+    links[path, 1] = np.roll(path, -1)
+    return links
+
+def ab_cycles(
+        path_a: np.ndarray,
+        path_b: np.ndarray,
+        rng: np.random.Generator,
+    ) -> List[List[int]]:
+    """
+    Decompose the edges of two tours into AB-cycles
+    Edges found in both tours are left out. The walk takes an edge of A, then an edge of B,
+    each at random among the edges left, and cuts out a cycle whenever it comes back through
+    a B edge to a city it left through an A edge
+    :param path_a: np.ndarray - the tour A
+    :param path_b: np.ndarray - the tour B
+    :param rng: np.random.Generator - draws the walks
+    :return: List[List[int]] - every cycle as its cities [c0, c1, ..., c0],
+        the edges (c0, c1), (c2, c3), ... belong to A and the others to B
+    """
+    chromosome_length = len(path_a)
+    a_links = _links(path_a).tolist()
+    b_links = _links(path_b).tolist()
+
+    for city in range(chromosome_length):
+        for other in list(a_links[city]):
+            if other in b_links[city]:
+                a_links[city].remove(other)
+                b_links[city].remove(other)
+
+    # one uniform per edge walked
+    uniforms = rng.random(2 * chromosome_length).tolist()
+    drawn = 0
+
+    def take(links: List[List[int]], city: int) -> int:
+        nonlocal drawn
+        choices = links[city]
+        other = choices[int(uniforms[drawn] * len(choices))]
+        drawn += 1
+        links[city].remove(other)
+        links[other].remove(city)
+        return other
+
+    cycles = []
+    for start in rng.permutation(chromosome_length).tolist():
+        while a_links[start]:
+            path = [start]
+            # index of the cities left through an A edge, at the even positions of the path
+            left_through_a = {start: 0}
+            while True:
+                following = take(a_links, path[-1])
+                path.append(following)
+                following = take(b_links, following)
+                path.append(following)
+
+                if following not in left_through_a:
+                    left_through_a[following] = len(path) - 1
+                    continue
+
+                index = left_through_a[following]
+                cycles.append(path[index:])
+                for city in path[index + 2:-1:2]:
+                    del left_through_a[city]
+                del path[index + 1:]
+                if index == 0:
+                    break
+
+    return cycles
+
+def _merge_subtours(
+        links: np.ndarray,
+        distance_matrix: np.ndarray,
+        neighbours: np.ndarray,
+    ):
+    """
+    Merge the subtours of a 2-regular graph into one tour, updating links in place
+    The smallest subtour is merged first, removing one of its edges (u, u') and an edge (v, v')
+    of another subtour for the cheapest of (u, v) (u', v') or (u, v') (u', v), with v
+    among the neighbours of u. Every subtour keeps the list of its cities, a merge moves the
+    cities of the smaller one into the other
+    """
+    chromosome_length = len(links)
+    labels = np.full(chromosome_length, -1, dtype=np.int64)
+    # cities of every subtour by label, the first city found of it
+    members_of = {}
+    for city in range(chromosome_length):
+        if labels[city] >= 0:
+            continue
+        previous, current, cities = -1, city, []
+        while labels[current] < 0:
+            labels[current] = city
+            cities.append(current)
+            following = links[current, 0] if links[current, 0] != previous else links[current, 1]
+            previous, current = current, following
+        members_of[city] = cities
+
+    # (size, label) of every subtour, entries of merged or grown subtours are skipped when popped
+    heap = [(len(cities), label) for label, cities in members_of.items()]
+    heapq.heapify(heap)
+
+    while len(members_of) > 1:
+        size, label = heapq.heappop(heap)
+        if label not in members_of or len(members_of[label]) != size:
+            continue
+        members = np.sort(np.array(members_of[label], dtype=np.int64))
+        u = np.repeat(members, 2)
+        u_next = links[members].ravel()
+
+        candidates = neighbours[u]
+        outside = labels[candidates] != label
+        if not outside.any():
+            # the neighbour lists stay inside the subtour, try every outside city from a few of its edges
+            u, u_next = u[:32], u_next[:32]
+            candidates = np.broadcast_to(np.flatnonzero(labels != label), (len(u), chromosome_length - len(members)))
+            outside = np.ones(candidates.shape, dtype=bool)
+
+        removed_u = np.asarray(distance_matrix[u, u_next], dtype=np.float64)[:, np.newaxis]
+        best = (np.inf, None)
+        for side in range(2):
+            v_next = links[candidates, side]
+            removed = removed_u + np.asarray(distance_matrix[candidates, v_next], dtype=np.float64)
+            for crossed in [False, True]:
+                if crossed:
+                    added = np.asarray(distance_matrix[u[:, np.newaxis], v_next], dtype=np.float64) + \
+                        np.asarray(distance_matrix[u_next[:, np.newaxis], candidates], dtype=np.float64)
+                else:
+                    added = np.asarray(distance_matrix[u[:, np.newaxis], candidates], dtype=np.float64) + \
+                        np.asarray(distance_matrix[u_next[:, np.newaxis], v_next], dtype=np.float64)
+                cost = np.where(outside, added - removed, np.inf)
+                row, column = np.unravel_index(cost.argmin(), cost.shape)
+                if cost[row, column] < best[0]:
+                    v = candidates[row, column]
+                    best = (cost[row, column], (u[row], u_next[row], v, v_next[row, column], crossed))
+
+        a, a_next, b, b_next, crossed = best[1]
+        if crossed:
+            b, b_next = b_next, b
+        for city, old, new in [(a, a_next, b), (a_next, a, b_next), (b, b_next, a), (b_next, b, a_next)]:
+            links[city, np.flatnonzero(links[city] == old)[0]] = new
+
+        other = int(labels[b])
+        labels[members] = other
+        members_of[other].extend(members_of.pop(label))
+        heapq.heappush(heap, (len(members_of[other]), other))
+
+def _links_to_path(links: np.ndarray, start: int) -> np.ndarray:
+    path = np.empty(len(links), dtype=PATH_DTYPE)
+    links = links.tolist()
+    previous, current = -1, start
+    for index in range(len(path)):
+        path[index] = current
+        following = links[current][0] if links[current][0] != previous else links[current][1]
+        previous, current = current, following
+    return path
+
+def edge_assembly_crossover(
+        path_a: np.ndarray,
+        path_b: np.ndarray,
+        distance_matrix: np.ndarray,
+        neighbours: np.ndarray,
+        rng: np.random.Generator,
+    ) -> np.ndarray:
+    """
+    Edge Assembly Crossover of one pair, the child of A
+    :param path_a: np.ndarray - the tour A, the child keeps most of its edges
+    :param path_b: np.ndarray - the tour B
+    :param distance_matrix: np.ndarray - the distance matrix
+    :param neighbours: np.ndarray - (N, k) neighbour lists of the subtour merge
+    :param rng: np.random.Generator - draws the AB-cycles
+    :return: np.ndarray - the child, starting from the first city of A
+    """
+    cycles = ab_cycles(path_a, path_b, rng)
+    if not cycles:
+        # the parents are the same tour
+        return path_a.copy()
+
+    # the AB-cycle that shortens A the most, before the subtours are merged
+    gains = []
+    for cycle in cycles:
+        cycle = np.array(cycle)
+        lengths = np.asarray(distance_matrix[cycle[:-1], cycle[1:]], dtype=np.float64)
+        gains.append(lengths[0::2].sum() - lengths[1::2].sum())
+    cycle = cycles[int(np.argmax(gains))]
+
+    # A without the A edges of the cycle and with its B edges, a set of subtours
+    links = _links(path_a)
+    for index in range(len(cycle) - 1):
+        city, other = cycle[index], cycle[index + 1]
+        if index % 2 == 0:
+            links[city, np.flatnonzero(links[city] == other)[0]] = -1
+            links[other, np.flatnonzero(links[other] == city)[0]] = -1
+    for index in range(1, len(cycle) - 1, 2):
+        city, other = cycle[index], cycle[index + 1]
+        links[city, np.flatnonzero(links[city] == -1)[0]] = other
+        links[other, np.flatnonzero(links[other] == -1)[0]] = city
+
+    _merge_subtours(links, distance_matrix, neighbours)
+    return _links_to_path(links, int(path_a[0]))
+
+def batch_edge_assembly_crossover(
+        parents1: np.ndarray,
+        parents2: np.ndarray,
+        distance_matrix: np.ndarray,
+        neighbours: Optional[np.ndarray] = None,
+        rng: Optional[np.random.Generator] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Edge Assembly Crossover of many parent pairs, one pair at a time
+    :param parents1: np.ndarray - (pairs, N) paths of the first parents
+    :param parents2: np.ndarray - (pairs, N) paths of the second parents
+    :param distance_matrix: np.ndarray - the distance matrix
+    :param neighbours: np.ndarray - (N, k) neighbour lists, built from the distance matrix if not given
+    :param rng: np.random.Generator - draws the AB-cycles, a fresh one if not given
+    :return: Tuple[np.ndarray, np.ndarray] - (pairs, N) paths of the two offspring of each pair,
+        the child of the first parent and the child of the second parent
+    """
+    assert parents1.shape == parents2.shape, 'The length of the chromosomes should be the same'
+    if rng is None:
+        rng = np.random.default_rng()
+    if neighbours is None:
+        neighbours = generate_neighbour_lists(distance_matrix, EAX_NEIGHBOURS)
+
+    children1 = np.empty_like(parents1)
+    children2 = np.empty_like(parents2)
+    for pair in range(len(parents1)):
+        children1[pair] = edge_assembly_crossover(parents1[pair], parents2[pair], distance_matrix, neighbours, rng)
+        children2[pair] = edge_assembly_crossover(parents2[pair], parents1[pair], distance_matrix, neighbours, rng)
+    return children1, children2
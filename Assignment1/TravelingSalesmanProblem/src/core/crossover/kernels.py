@@ -0,0 +1,86 @@
+from typing import Tuple
+
+import numpy as np
+
+"""
+Loop kernels of the compiled backend, see core.backend
+They are plain Python that Numba can compile, and are only compiled when the
+numba backend is selected. The cut points are drawn by the caller, so the
+kernels themselves are deterministic.
+"""
+
+def ordered_crossover_kernel(
+        parents1: np.ndarray,
+        parents2: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    pairs, chromosome_length = parents1.shape
+    children1 = np.empty_like(parents1)
+    children2 = np.empty_like(parents2)
+    in_segment = np.zeros(chromosome_length, dtype=np.bool_)
+
+    for pair in range(pairs):
+        start = starts[pair]
+        end = ends[pair]
+
+        for side in range(2):
+            if side == 0:
+                donor, filler, child = parents1[pair], parents2[pair], children1[pair]
+            else:
+                donor, filler, child = parents2[pair], parents1[pair], children2[pair]
+
+            in_segment[:] = False
+            for i in range(start, end):
+                child[i] = donor[i]
+                in_segment[donor[i]] = True
+
+            # Fill the remaining slots in the order of the other parent
+            filler_index = 0
+            for i in range(chromosome_length):
+                if start <= i < end:
+                    continue
+                while in_segment[filler[filler_index]]:
+                    filler_index += 1
+                child[i] = filler[filler_index]
+                filler_index += 1
+
+    return children1, children2
+
+
+def partial_mapped_crossover_kernel(
+        parents1: np.ndarray,
+        parents2: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    pairs, chromosome_length = parents1.shape
+    children1 = np.empty_like(parents1)
+    children2 = np.empty_like(parents2)
+    # mapping[city] is the city it is replaced with, -1 when the city is not mapped
+    mapping = np.full(chromosome_length, -1, dtype=np.int64)
+
+    for pair in range(pairs):
+        start = starts[pair]
+        end = ends[pair]
+
+        for side in range(2):
+            if side == 0:
+                base, donor, child = parents1[pair], parents2[pair], children1[pair]
+            else:
+                base, donor, child = parents2[pair], parents1[pair], children2[pair]
+
+            mapping[:] = -1
+            for i in range(start, end):
+                mapping[donor[i]] = base[i]
+
+            for i in range(chromosome_length):
+                if start <= i < end:
+                    child[i] = donor[i]
+                    continue
+                gene = base[i]
+                while mapping[gene] != -1:
+                    gene = mapping[gene]
+                child[i] = gene
+
+    return children1, children2
@@ -1,8 +1,14 @@
-from typing import List, Tuple, Callable
+from typing import List, Tuple, Callable, Optional, Dict, Any
 
 import numpy as np
 
 from core.models.population import Population
+from core.evaluation.implicit_distance import ImplicitDistanceMatrix
+from core.evaluation.metrics import get_metric, metric_dtype, accumulator_dtype
+
+# Upper bound on the number of pairwise entries computed per chunk when building
+# the distance matrix, keeps the temporary (rows, N, 2) difference array small
+_MATRIX_CHUNK_ELEMENTS = 1 << 22
 
 def euclidean(
         point1: Tuple[np.float64, np.float64],
@@ -28,23 +34,153 @@ def calculate_distance(
 
 def generate_distance_matrix(
         dimension: int,
-        cities: List[Tuple[np.float64, np.float64]]
+        cities: List[Tuple[np.float64, np.float64]],
+        dtype: Optional[type] = None,
+        chunk_size: Optional[int] = None,
+        metric: str = 'EUCLIDEAN',
         ) -> np.ndarray:
-    distance_matrix = np.zeros((dimension, dimension), dtype=np.float64)
+    """
+    Generate the distance matrix between every pair of cities
+    The matrix is built with broadcasting, a block of rows at a time, so the
+    temporary memory stays bounded for large instances
+    :param dimension: int - the number of cities
+    :param cities: List[Tuple[float, float]] - the coordinates of each city
+    :param dtype: type - the dtype of the matrix, the dtype of the metric if not given
+    :param chunk_size: int - the number of rows computed per block, derived from N if not given
+    :param metric: str - the TSPLIB edge weight type, see core.evaluation.metrics
+    :return: np.ndarray - the (dimension, dimension) distance matrix
+    """
+    coordinates = np.asarray(cities, dtype=np.float64).reshape(dimension, 2)
+    metric = get_metric(metric)
+    if dtype is None:
+        dtype = metric_dtype(metric, coordinates)
+
+    if chunk_size is None:
+        chunk_size = max(1, _MATRIX_CHUNK_ELEMENTS // max(dimension, 1))
 
-    for i in range(dimension):
-        for j in range(i + 1, dimension):
-            # since distance between cities i and j is the same as j and i
-            # we can calculate the distance once and assign it to both
+    distance_matrix = np.empty((dimension, dimension), dtype=dtype)
+    x, y = coordinates[:, 0], coordinates[:, 1]
 
-            distance = calculate_distance(cities[i], cities[j])
-            distance_matrix[i][j] = distance
-            distance_matrix[j][i] = distance
+    for start in range(0, dimension, chunk_size):
+        end = min(start + chunk_size, dimension)
+        # (rows, 1) against (1, N) -> (rows, N)
+        distance_matrix[start:end] = metric.distance(
+            x[start:end, np.newaxis], y[start:end, np.newaxis], x[np.newaxis, :], y[np.newaxis, :]
+        )
 
+    # GEO gives 1 from a city to itself
+    np.fill_diagonal(distance_matrix, 0)
     return distance_matrix
 
+def problem_metric(problem: Dict[str, Any], metric: Optional[str] = None) -> str:
+    """
+    Get the name of the metric the distances of a problem are computed with
+    :param problem: Dict[str, Any] - the loaded problem
+    :param metric: str - overrides the EDGE_WEIGHT_TYPE of the file, e.g. 'EUCLIDEAN'
+    :return: str - the metric, or 'EXPLICIT' when the file lists the edge weights
+    """
+    if problem.get('edge_weights') is not None:
+        if metric not in [None, 'EXPLICIT']:
+            raise ValueError("The edge weights of the file are explicit, no metric applies")
+        return 'EXPLICIT'
+    return get_metric(metric or problem['edge_weight_type']).name
+
+def generate_problem_distance_matrix(
+        problem: Dict[str, Any],
+        dtype: Optional[type] = None,
+        metric: Optional[str] = None,
+        ) -> np.ndarray:
+    """
+    Get the distance matrix of a problem loaded by parsers.tsp_parser.load_tsp_file
+    :param problem: Dict[str, Any] - the loaded problem
+    :param dtype: type - the dtype of the matrix, the dtype of the metric if not given
+    :param metric: str - overrides the EDGE_WEIGHT_TYPE of the file, see problem_metric
+    :return: np.ndarray - the explicit edge weights if the file has them,
+        otherwise the matrix generated from the coordinates of the cities
+    """
+    metric = problem_metric(problem, metric)
+    if metric == 'EXPLICIT':
+        edge_weights = problem['edge_weights']
+        if dtype is None:
+            # integer weights, the usual case, are stored as int32 like the integer metrics
+            integral = np.array_equal(edge_weights, np.round(edge_weights)) and \
+                np.abs(edge_weights).max() < np.iinfo(np.int32).max
+            dtype = np.int32 if integral else np.float64
+        return np.asarray(edge_weights, dtype=dtype)
+    return generate_distance_matrix(problem['dimensions'], problem['cities'], dtype=dtype, metric=metric)
+
+def generate_neighbour_lists(
+        distance_matrix: np.ndarray,
+        neighbours: int,
+        chunk_size: Optional[int] = None,
+        ) -> np.ndarray:
+    """
+    Generate the k-nearest-neighbour candidate list of every city
+    :param distance_matrix: np.ndarray - the distance matrix
+    :param neighbours: int - the number of neighbours per city
+    :param chunk_size: int - the number of rows ranked per block, derived from N if not given
+    :return: np.ndarray - (N, neighbours) matrix of cities, each row sorted from nearest to furthest
+    """
+    if isinstance(distance_matrix, ImplicitDistanceMatrix) and distance_matrix.metric.lower_bound is not None:
+        # ranking every row would cost N^2 distances, the implicit matrix searches a grid instead
+        return distance_matrix.nearest_neighbours(neighbours)[0]
+
+    dimension = len(distance_matrix)
+    neighbours = min(neighbours, dimension - 1)
+    if chunk_size is None:
+        chunk_size = max(1, _MATRIX_CHUNK_ELEMENTS // max(dimension, 1))
+
+    neighbour_lists = np.empty((dimension, neighbours), dtype=np.int32)
+    for start in range(0, dimension, chunk_size):
+        end = min(start + chunk_size, dimension)
+        rows = np.arange(start, end)
+        block = np.array(distance_matrix[start:end], dtype=np.float64)
+        # a city is never its own neighbour
+        block[rows - start, rows] = np.inf
+
+        nearest = np.argpartition(block, neighbours - 1, axis=1)[:, :neighbours]
+        order = np.argsort(np.take_along_axis(block, nearest, axis=1), axis=1, kind='stable')
+        neighbour_lists[start:end] = np.take_along_axis(nearest, order, axis=1)
+
+    return neighbour_lists
+
 def calculate_total_distance_for_population(population: Population, distance_matrix: np.ndarray):
-    return [calculate_total_distance(individual, distance_matrix) for individual in population.individuals]
+    return calculate_total_distance_of_paths(population.paths, distance_matrix)
+
+def calculate_total_distance_of_paths(
+        paths: np.ndarray,
+        distance_matrix: np.ndarray,
+        chunk_size: Optional[int] = None,
+        ) -> np.ndarray:
+    """
+    Calculate the total distance of many tours at once
+    Every edge of every tour is gathered from the distance matrix with one fancy index,
+    a block of tours at a time to bound the temporary memory
+    :param paths: np.ndarray - (tours, N) array of city indices
+    :param distance_matrix: np.ndarray - the distance matrix
+    :param chunk_size: int - the number of tours gathered per block, derived from N if not given
+    :return: np.ndarray - the total distance of each tour
+    """
+    paths = np.asarray(paths)
+    if paths.ndim == 1:
+        paths = paths[np.newaxis, :]
+
+    tours, chromosome_length = paths.shape
+    if chunk_size is None:
+        chunk_size = max(1, _MATRIX_CHUNK_ELEMENTS // max(chromosome_length, 1))
+
+    # integer distances are summed in int64, so the lengths are exact
+    accumulator = accumulator_dtype(distance_matrix.dtype)
+
+    total_distances = np.empty(tours, dtype=np.float64)
+    for start in range(0, tours, chunk_size):
+        block = paths[start:start + chunk_size]
+        # edges i -> i+1, plus the edge from the last city back to the first city
+        total_distances[start:start + chunk_size] = \
+            distance_matrix[block[:, :-1], block[:, 1:]].sum(axis=1, dtype=accumulator) + \
+            distance_matrix[block[:, -1], block[:, 0]].astype(accumulator)
+
+    return total_distances
 
 def calculate_total_distance(
         chromosomes: List[int],
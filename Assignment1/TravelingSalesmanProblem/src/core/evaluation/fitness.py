@@ -1,7 +1,8 @@
-from typing import List, Callable
+from typing import List, Callable, Tuple
 import numpy as np
 
 from core.evaluation.heuristic_functions import _inverse_distance_heuristic
+from core.evaluation.distance import calculate_total_distance_of_paths
 
 def calculate_fitness(
         total_distance: np.float64,
@@ -12,5 +13,21 @@ def calculate_fitness(
 def calculate_fitness_of_population(
         total_distances: List[np.float64],
         heuristic: Callable = _inverse_distance_heuristic
-        ) -> List[np.float64]:
-    return [calculate_fitness(total_distance, heuristic) for total_distance in total_distances]
+        ) -> np.ndarray:
+    # the heuristics are plain arithmetic, so they apply to the whole vector at once
+    return np.asarray(heuristic(np.asarray(total_distances, dtype=np.float64)), dtype=np.float64)
+
+def evaluate_paths(
+        paths: np.ndarray,
+        distance_matrix: np.ndarray,
+        heuristic: Callable = _inverse_distance_heuristic
+        ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Evaluate a batch of tours
+    :param paths: np.ndarray - (tours, N) array of city indices
+    :param distance_matrix: np.ndarray - the distance matrix
+    :param heuristic: function to turn a total distance into a fitness
+    :return: Tuple[np.ndarray, np.ndarray] - the total distance and fitness of each tour
+    """
+    total_distances = calculate_total_distance_of_paths(paths, distance_matrix)
+    return total_distances, calculate_fitness_of_population(total_distances, heuristic)
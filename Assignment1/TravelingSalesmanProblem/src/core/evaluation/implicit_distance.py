@@ -0,0 +1,212 @@
+import math
+from collections import OrderedDict
+from typing import Dict, Any, Tuple, Optional
+
+import numpy as np
+
+from core.evaluation.metrics import Metric, get_metric, metric_dtype
+
+"""
+Distance matrix computed on the fly from the city coordinates
+A dense N x N matrix takes 8 * N^2 bytes, 80 GB for 100k cities. ImplicitDistanceMatrix answers
+the same indexing as the dense matrix by computing each requested edge from the (N, 2) coordinates,
+so the genetic algorithm runs in O(N) memory on instances whose matrix would not fit in RAM.
+Distances follow a metric of core.evaluation.metrics, like the dense matrix.
+- dm[a, b] with ints or index arrays gives the edge lengths, this is all the vectorised operators use
+- dm[i] gives a full row, the most recent rows are kept in an LRU cache
+- nearest_neighbours(k) gives the k-nearest-neighbour table and its distances, built with a grid
+  over the plane instead of ranking every row, and kept for the operators that look up neighbours,
+  only for the metrics that grow with the distance in the plane
+Compiled kernels index a real array, so the numba backend is not used in this mode.
+"""
+
+class ImplicitDistanceMatrix:
+    def __init__(self, cities: np.ndarray, row_cache_size: int = 64, metric: str = 'EUCLIDEAN'):
+        """
+        :param cities: np.ndarray - (N, 2) coordinates of the cities
+        :param row_cache_size: int - the number of full rows kept, 0 disables the row cache
+        :param metric: str - the TSPLIB edge weight type, see core.evaluation.metrics
+        """
+        cities = np.asarray(cities, dtype=np.float64)
+        self.metric: Metric = get_metric(metric)
+        self.x = np.ascontiguousarray(cities[:, 0])
+        self.y = np.ascontiguousarray(cities[:, 1])
+        # python floats for single edges, indexing a list is much cheaper than a numpy scalar
+        self._x_list = self.x.tolist()
+        self._y_list = self.y.tolist()
+
+        self.shape = (len(cities), len(cities))
+        self.dtype = metric_dtype(self.metric, cities)
+        self.row_cache_size = row_cache_size
+        self._rows: OrderedDict = OrderedDict()
+        self._neighbours: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            a, b = key
+            if isinstance(a, (int, np.integer)) and isinstance(b, (int, np.integer)):
+                if self.metric.name == 'EUCLIDEAN':
+                    return math.hypot(self._x_list[a] - self._x_list[b], self._y_list[a] - self._y_list[b])
+                return self.dtype.type(
+                    self.metric.distance(self._x_list[a], self._y_list[a], self._x_list[b], self._y_list[b])
+                )
+            return self.distances(a, b)
+        if isinstance(key, slice):
+            rows = np.arange(len(self))[key]
+            return self.distances(rows[:, np.newaxis], np.arange(len(self))[np.newaxis, :])
+        return self.row(int(key))
+
+    def distances(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """
+        Get the length of the edges between two arrays of cities
+        :param a: np.ndarray - city indices
+        :param b: np.ndarray - city indices, broadcast against a
+        :return: np.ndarray - the edge lengths, in the broadcast shape of a and b
+        """
+        return self.metric.distance(self.x[a], self.y[a], self.x[b], self.y[b]).astype(self.dtype, copy=False)
+
+    def row(self, city: int) -> np.ndarray:
+        """
+        Get the distances from a city to every city
+        :param city: int
+        :return: np.ndarray - (N,) read-only row, shared with the row cache
+        """
+        if city in self._rows:
+            self._rows.move_to_end(city)
+            return self._rows[city]
+
+        row = self.metric.distance(self.x, self.y, self._x_list[city], self._y_list[city]).astype(self.dtype, copy=False)
+        row[city] = 0
+        row.flags.writeable = False
+        if self.row_cache_size > 0:
+            self._rows[city] = row
+            if len(self._rows) > self.row_cache_size:
+                self._rows.popitem(last=False)
+        return row
+
+    def nearest_neighbours(self, neighbours: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the k-nearest-neighbour table, built once per k
+        Only for the metrics with a lower bound in the plane, see grid_neighbour_lists
+        :param neighbours: int - the number of neighbours per city
+        :return: Tuple[np.ndarray, np.ndarray] - (N, k) int32 cities sorted from nearest to furthest,
+            and their (N, k) distances
+        """
+        if self.metric.lower_bound is None:
+            raise ValueError(f"The {self.metric.name} metric has no grid neighbour search")
+        if neighbours not in self._neighbours:
+            neighbour_lists = grid_neighbour_lists(self.x, self.y, neighbours, self.metric)
+            self._neighbours[neighbours] = (
+                neighbour_lists,
+                self.distances(np.arange(len(self))[:, np.newaxis], neighbour_lists),
+            )
+        return self._neighbours[neighbours]
+
+def grid_neighbour_lists(
+        x: np.ndarray,
+        y: np.ndarray,
+        neighbours: int,
+        metric: Metric,
+        cities_per_cell: Optional[int] = None,
+    ) -> np.ndarray:
+    """
+    Find the k nearest neighbours of every city without computing all N^2 distances
+    The cities are bucketed into a uniform grid. The cities of a cell rank the cities of the
+    surrounding window of cells, and a result is kept once its k-th distance is within the lower bound
+    of the metric at the edge of the window, so no city outside could be nearer.
+    The other cities of the cell try again with a window one cell wider
+    :param x: np.ndarray - (N,) x coordinates
+    :param y: np.ndarray - (N,) y coordinates
+    :param neighbours: int - the number of neighbours per city
+    :param metric: Metric - a metric with a lower bound
+    :param cities_per_cell: int - the average number of cities per grid cell, derived from k if not given
+    :return: np.ndarray - (N, k) int32 cities, each row sorted from nearest to furthest
+    """
+    dimension = len(x)
+    neighbours = min(neighbours, dimension - 1)
+    if cities_per_cell is None:
+        cities_per_cell = neighbours + 1
+
+    # square cells over the bounding box
+    x_min, y_min = x.min(), y.min()
+    extent = max(x.max() - x_min, y.max() - y_min, np.finfo(np.float64).tiny)
+    grid_size = max(1, int(math.sqrt(dimension / cities_per_cell)))
+    cell_width = extent / grid_size
+    cell_x = np.minimum(((x - x_min) / cell_width).astype(np.int64), grid_size - 1)
+    cell_y = np.minimum(((y - y_min) / cell_width).astype(np.int64), grid_size - 1)
+
+    # the cities of cell c are order[starts[c]:starts[c + 1]]
+    cells = cell_x * grid_size + cell_y
+    order = np.argsort(cells, kind='stable')
+    starts = np.searchsorted(cells[order], np.arange(grid_size * grid_size + 1))
+
+    neighbour_lists = np.empty((dimension, neighbours), dtype=np.int32)
+    for cell in np.unique(cells):
+        column, row = divmod(int(cell), grid_size)
+        queries = order[starts[cell]:starts[cell + 1]]
+        radius = 1
+
+        while len(queries):
+            first_column, last_column = max(column - radius, 0), min(column + radius, grid_size - 1)
+            first_row, last_row = max(row - radius, 0), min(row + radius, grid_size - 1)
+            candidates = np.concatenate([
+                order[starts[c * grid_size + first_row]:starts[c * grid_size + last_row + 1]]
+                for c in range(first_column, last_column + 1)
+            ])
+            covers_grid = first_column == 0 and first_row == 0 and \
+                last_column == grid_size - 1 and last_row == grid_size - 1
+            if len(candidates) <= neighbours and not covers_grid:
+                radius += 1
+                continue
+
+            block = metric.distance(
+                x[queries, np.newaxis], y[queries, np.newaxis], x[candidates], y[candidates]
+            )
+            # a city is never its own neighbour
+            block[queries[:, np.newaxis] == candidates] = np.inf
+
+            nearest = np.argpartition(block, neighbours - 1, axis=1)[:, :neighbours]
+            nearest_distances = np.take_along_axis(block, nearest, axis=1)
+
+            # distance to the edge of the window, a side on the edge of the grid has nothing beyond it
+            margin = np.full(len(queries), np.inf)
+            if first_column > 0:
+                margin = np.minimum(margin, x[queries] - (x_min + first_column * cell_width))
+            if last_column < grid_size - 1:
+                margin = np.minimum(margin, x_min + (last_column + 1) * cell_width - x[queries])
+            if first_row > 0:
+                margin = np.minimum(margin, y[queries] - (y_min + first_row * cell_width))
+            if last_row < grid_size - 1:
+                margin = np.minimum(margin, y_min + (last_row + 1) * cell_width - y[queries])
+
+            found = nearest_distances.max(axis=1) <= metric.lower_bound(margin)
+            ranked = np.argsort(nearest_distances[found], axis=1, kind='stable')
+            neighbour_lists[queries[found]] = candidates[np.take_along_axis(nearest[found], ranked, axis=1)]
+
+            queries = queries[~found]
+            radius += 1
+
+    return neighbour_lists
+
+def implicit_problem_distance_matrix(
+        problem: Dict[str, Any],
+        row_cache_size: int = 64,
+        metric: Optional[str] = None,
+    ) -> ImplicitDistanceMatrix:
+    """
+    Get the implicit distance matrix of a problem loaded by parsers.tsp_parser.load_tsp_file
+    :param problem: Dict[str, Any] - the loaded problem
+    :param row_cache_size: int - the number of full rows kept
+    :param metric: str - overrides the EDGE_WEIGHT_TYPE of the file
+    :return: ImplicitDistanceMatrix
+    """
+    if problem.get('cities') is None:
+        raise ValueError("The implicit distance mode needs city coordinates")
+    return ImplicitDistanceMatrix(
+        problem['cities'],
+        row_cache_size=row_cache_size,
+        metric=metric or problem['edge_weight_type'],
+    )
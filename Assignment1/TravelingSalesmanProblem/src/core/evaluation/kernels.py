@@ -0,0 +1,24 @@
+import numpy as np
+
+"""
+Loop kernels of the compiled backend, see core.backend
+They are plain Python that Numba can compile, and are only compiled when the
+numba backend is selected.
+"""
+
+def tour_lengths_kernel(
+        paths: np.ndarray,
+        distance_matrix: np.ndarray,
+    ) -> np.ndarray:
+    tours, chromosome_length = paths.shape
+    total_distances = np.empty(tours, dtype=np.float64)
+
+    for tour in range(tours):
+        total_distance = 0.0
+        for i in range(chromosome_length - 1):
+            total_distance += distance_matrix[paths[tour, i], paths[tour, i + 1]]
+        # Add the distance from the last city back to the first city
+        total_distance += distance_matrix[paths[tour, chromosome_length - 1], paths[tour, 0]]
+        total_distances[tour] = total_distance
+
+    return total_distances
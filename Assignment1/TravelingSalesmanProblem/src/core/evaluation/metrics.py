@@ -0,0 +1,105 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+"""
+Distance functions of the TSPLIB edge weight types
+Every metric takes the coordinates of two arrays of cities and returns the distance of each pair,
+vectorised over any broadcast shape. The TSPLIB metrics round to integers, so their matrices are
+stored as int32 and tour lengths are summed exactly, which makes the results comparable with the
+published optima. EUCLIDEAN is the plain float distance the genetic algorithm used before.
+Definitions follow the TSPLIB 95 documentation (Reinelt, 1995).
+"""
+
+# earth radius and pi as fixed by TSPLIB for GEO instances
+GEO_RADIUS = 6378.388
+GEO_PI = 3.141592
+
+@dataclass(frozen=True)
+class Metric:
+    name: str
+    # distance(x1, y1, x2, y2) -> distances
+    distance: Callable[[np.ndarray, np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+    dtype: type
+    # smallest distance to a city at least the given straight-line distance away,
+    # None when the metric does not grow with the distance in the plane (GEO)
+    lower_bound: Optional[Callable[[np.ndarray], np.ndarray]] = None
+
+def _nint(distances: np.ndarray) -> np.ndarray:
+    # nearest integer as TSPLIB defines it, (int) (x + 0.5)
+    return np.floor(distances + 0.5)
+
+def _att(squared_distances: np.ndarray) -> np.ndarray:
+    # pseudo-Euclidean distance, rounded up whenever the nearest integer is below it
+    distances = np.sqrt(squared_distances / 10.0)
+    rounded = _nint(distances)
+    return np.where(rounded < distances, rounded + 1, rounded)
+
+def _radians(coordinates: np.ndarray) -> np.ndarray:
+    # GEO coordinates are DDD.MM, degrees and minutes
+    degrees = np.trunc(coordinates)
+    minutes = coordinates - degrees
+    return GEO_PI * (degrees + 5.0 * minutes / 3.0) / 180.0
+
+def euclidean_distance(x1, y1, x2, y2) -> np.ndarray:
+    return np.hypot(x1 - x2, y1 - y2)
+
+def euc_2d_distance(x1, y1, x2, y2) -> np.ndarray:
+    return _nint(np.hypot(x1 - x2, y1 - y2))
+
+def ceil_2d_distance(x1, y1, x2, y2) -> np.ndarray:
+    return np.ceil(np.hypot(x1 - x2, y1 - y2))
+
+def att_distance(x1, y1, x2, y2) -> np.ndarray:
+    return _att((x1 - x2)**2 + (y1 - y2)**2)
+
+def geo_distance(x1, y1, x2, y2) -> np.ndarray:
+    # x is the latitude and y the longitude
+    latitude1, longitude1 = _radians(x1), _radians(y1)
+    latitude2, longitude2 = _radians(x2), _radians(y2)
+    q1 = np.cos(longitude1 - longitude2)
+    q2 = np.cos(latitude1 - latitude2)
+    q3 = np.cos(latitude1 + latitude2)
+    cosine = np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)
+    return np.trunc(GEO_RADIUS * np.arccos(cosine) + 1.0)
+
+METRICS: Dict[str, Metric] = {
+    'EUCLIDEAN': Metric('EUCLIDEAN', euclidean_distance, np.float64, lambda d: d),
+    'EUC_2D': Metric('EUC_2D', euc_2d_distance, np.int32, _nint),
+    'CEIL_2D': Metric('CEIL_2D', ceil_2d_distance, np.int32, np.ceil),
+    'ATT': Metric('ATT', att_distance, np.int32, lambda d: _att(d * d)),
+    'GEO': Metric('GEO', geo_distance, np.int32),
+}
+
+def get_metric(name: str) -> Metric:
+    """
+    Get a metric by its TSPLIB edge weight type
+    :param name: str - e.g. 'EUC_2D', or 'EUCLIDEAN' for unrounded distances
+    :return: Metric
+    """
+    if name.upper() not in METRICS:
+        raise ValueError(f"Unsupported edge weight type {name}, expected one of {list(METRICS)}")
+    return METRICS[name.upper()]
+
+def metric_dtype(metric: Metric, cities: np.ndarray) -> np.dtype:
+    """
+    Get the dtype of the distances between the given cities
+    An integer metric falls back to int64 when the bounding box is too wide for int32,
+    with room for the sums of a few edges that the move deltas add up
+    :param metric: Metric
+    :param cities: np.ndarray - (N, 2) coordinates
+    :return: np.dtype
+    """
+    dtype = np.dtype(metric.dtype)
+    if dtype.kind == 'i' and metric.lower_bound is not None:
+        extent = np.ptp(cities, axis=0)
+        if 4 * (np.hypot(extent[0], extent[1]) + 1) >= np.iinfo(dtype).max:
+            return np.dtype(np.int64)
+    return dtype
+
+def accumulator_dtype(dtype: np.dtype) -> type:
+    """
+    Get the dtype tour lengths are summed in, int64 for integer distances so they stay exact
+    """
+    return np.int64 if np.dtype(dtype).kind in 'iu' else np.float64
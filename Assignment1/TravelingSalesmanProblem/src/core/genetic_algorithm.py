@@ -1,18 +1,28 @@
 import time
-from typing import List, Dict, Any
-import copy
+import logging
+from typing import List, Dict, Any, Optional, Set
 import numpy as np
 
 from parsers.tsp_parser import load_tsp_file
 from utils.plotting import plot_distance_over_time, plot_fitness_over_time, plot_path
-from utils.common import np_to_python, write_to_json
+from utils.common import np_to_python, write_to_json, normalise_enum_keys
 from utils.generate import generate_initial_population
-from core.evaluation.distance import generate_distance_matrix
-from core.selection.selection_algorithm import tournament_selection, roulette_wheel_selection
-from core.crossover.crossover import apply_crossover, CrossoverType
+from utils.cache import ArrayCache, cached
+from core.evaluation.distance import generate_problem_distance_matrix, generate_neighbour_lists, problem_metric
+from core.evaluation.implicit_distance import implicit_problem_distance_matrix
+from core.evaluation.fitness import calculate_fitness_of_population
+from core.selection.selection_algorithm import tournament_selection, roulette_wheel_selection, \
+    stochastic_universal_sampling
+from core.crossover.crossover import apply_crossover, CrossoverType, EDGE_CROSSOVER_OPERATORS
 from core.mutation.mutation import apply_mutation, MutationType
-from core.models.population import Population, Individual
+from core.local_search.local_search import apply_local_search
+from core.models.population import Population
+from core.models.genome_index import GenomeIndex, hash_genomes
+from core.backend import get_backend, Backend
+from core.seeding.seeding import SeedingType
+from core.operator_selection import OperatorSelection, improvement_credit, ADAPTIVE_METHODS
 
+logger = logging.getLogger("Genetic Algorithm")
 
 """
 Steps
@@ -24,6 +34,213 @@ Steps
 6. Construct a new population
 """
 
+def improve_elites(
+        population: Population,
+        genome_index: GenomeIndex,
+        elites_size: int,
+        distance_matrix: np.ndarray,
+        neighbours: np.ndarray,
+        locally_optimal: Set[int],
+        hot_loops: Backend,
+        debug: bool = False,
+    ):
+    """
+    Apply the 2-opt / Or-opt local search to every elite that was not searched before
+    An improved elite replaces its row unless the improved path already exists
+    :param population: Population - the sorted population, updated in place
+    :param genome_index: GenomeIndex - the hashes of the population, kept in sync
+    :param elites_size: int - the number of elites
+    :param distance_matrix: np.ndarray - the distance matrix
+    :param neighbours: np.ndarray - the candidate lists of the local search
+    :param locally_optimal: Set[int] - hashes of the paths already searched, updated in place
+    :param hot_loops: Backend - the backend running the local search
+    :param debug: bool - cross-check the improved distances against a full re-evaluation
+    """
+    improved = False
+    for index in range(elites_size):
+        if population.hashes[index] in locally_optimal:
+            continue
+        path = population.paths[index].copy()
+        distance = population.distances[index:index+1].copy()
+        apply_local_search(
+            path[np.newaxis, :],
+            distance,
+            np.array([0]),
+            distance_matrix,
+            neighbours,
+            debug=debug,
+            local_search_kernel=hot_loops.local_search_kernel
+        )
+        path_hash = hash_genomes(path)[0]
+        locally_optimal.add(path_hash)
+        if path_hash in genome_index:
+            # unchanged, or the improved path already exists
+            continue
+        genome_index.replace(population.hashes[index], path_hash)
+        population.set_row(
+            index,
+            path,
+            distance[0],
+            calculate_fitness_of_population(distance)[0],
+            path_hash
+        )
+        improved = True
+    if improved:
+        population.sort()
+
+def next_generation(
+        population: Population,
+        genome_index: GenomeIndex,
+        distance_matrix: np.ndarray,
+        hot_loops: Backend,
+        chance_of_crossover: int,
+        chance_of_mutation: int,
+        elites_size: int,
+        crossover_type: Dict[CrossoverType, int],
+        selection_type: str,
+        mutation_type: Dict[MutationType, int],
+        local_search: Optional[str] = None,
+        neighbours: Optional[np.ndarray] = None,
+        verbose: int = 0,
+        rng: Optional[np.random.Generator] = None,
+        crossover_selection: Optional[OperatorSelection] = None,
+        mutation_selection: Optional[OperatorSelection] = None,
+    ) -> Population:
+    """
+    Breed one generation: select parents, apply crossover, mutation and the optional local search,
+    and replace the worst individuals with the new offspring while keeping the elites
+    The arguments follow run
+    :param population: Population - the sorted population, updated in place and sorted again
+    :param genome_index: GenomeIndex - the hashes of the population, kept in sync
+    :param distance_matrix: np.ndarray - the distance matrix
+    :param hot_loops: Backend - the backend running the hot loops
+    :param rng: np.random.Generator - the random number generator, a fresh one if not given
+    :param crossover_selection: OperatorSelection - adapts the crossover weights, overrides crossover_type
+    :param mutation_selection: OperatorSelection - adapts the mutation weights, overrides mutation_type
+    :return: Population - the population
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    if crossover_selection is not None:
+        crossover_type = crossover_selection.weights()
+    if mutation_selection is not None:
+        mutation_type = mutation_selection.weights()
+
+    no_selects_parents = int( len(population) * 0.8)
+
+    if selection_type == 'roulette':
+        parent_indices: np.ndarray = roulette_wheel_selection(
+            population=population,
+            selects=int(no_selects_parents),
+            rng=rng
+        )
+    elif selection_type == 'sus':
+        parent_indices: np.ndarray = stochastic_universal_sampling(
+            population=population,
+            selects=int(no_selects_parents),
+            rng=rng
+        )
+    else: # tournament
+        parent_indices: np.ndarray = tournament_selection(
+            population=population,
+            selects=int(no_selects_parents),
+            tournament_size=3,
+            rng=rng
+        )
+
+    if verbose > 0:
+        print(f'Parents selected: {len(parent_indices)}')
+
+    # gathering the selected rows gives the offspring matrix its own copy of the paths,
+    # crossover and mutation then work on it in place
+    rng.shuffle(parent_indices)
+    offspring = population.paths[parent_indices]
+    offspring_distances = population.distances[parent_indices]
+    # operator index of every offspring row, for the adaptive operator selection
+    adaptive = crossover_selection is not None or mutation_selection is not None
+    applied = np.full(len(offspring), -1, dtype=np.int64) if adaptive else None
+
+    if crossover_selection is not None:
+        # the better parent of every pair, the reference of the crossover credit
+        pairs = len(offspring) // 2
+        parent_distances = offspring_distances.copy()
+        parent_distances[:2 * pairs] = np.repeat(
+            np.minimum(offspring_distances[0:2 * pairs:2], offspring_distances[1:2 * pairs:2]), 2
+        )
+
+    offspring, crossed = apply_crossover(
+        offspring,
+        crossover_type,
+        chance_of_crossover,
+        crossover_operators=hot_loops.crossover_operators,
+        rng=rng,
+        distance_matrix=distance_matrix,
+        neighbours=neighbours,
+        applied=applied,
+    )
+
+    # score the children of this generation as one batch,
+    # parents that were not crossed over keep their known distance
+    if crossed.any():
+        offspring_distances[crossed] = hot_loops.tour_lengths(offspring[crossed], distance_matrix)
+
+    if crossover_selection is not None:
+        crossover_selection.update(applied, improvement_credit(parent_distances, offspring_distances))
+
+    # mutation updates the distances incrementally
+    if mutation_selection is not None:
+        unmutated_distances = offspring_distances.copy()
+    offspring = apply_mutation(
+        offspring,
+        offspring_distances,
+        mutation_type,
+        chance_of_mutation,
+        distance_matrix,
+        debug=verbose > 1,
+        mutation_kernel=hot_loops.mutation_kernel,
+        rng=rng,
+        applied=applied,
+    )
+
+    if mutation_selection is not None:
+        mutation_selection.update(applied, improvement_credit(unmutated_distances, offspring_distances))
+
+    if local_search == 'offspring':
+        apply_local_search(
+            offspring,
+            offspring_distances,
+            np.arange(len(offspring)),
+            distance_matrix,
+            neighbours,
+            debug=verbose > 1,
+            local_search_kernel=hot_loops.local_search_kernel
+        )
+    offspring_fitness = calculate_fitness_of_population(offspring_distances)
+
+    # replace the worst individuals with the offspring
+    # the elites are the first rows of the sorted population and are never written,
+    # so they survive without being copied out and back in
+    replaced = min(len(offspring), len(population) - elites_size)
+    offspring_hashes = hash_genomes(offspring)
+    for index, path in enumerate(offspring[:replaced]):
+        if offspring_hashes[index] in genome_index:
+            # if the path already exists, we skip it
+            continue
+        genome_index.replace(population.hashes[-(index+1)], offspring_hashes[index])
+        population.set_row(
+            -(index+1),
+            path,
+            offspring_distances[index],
+            offspring_fitness[index],
+            offspring_hashes[index]
+        )
+
+    # sort again
+    population.sort()
+
+    return population
+
 def run(
         population_size: int = 100,
         generations: int = 1_000,
@@ -44,33 +261,104 @@ def run(
         },
         write_results: bool = False,
         plot_graphs: bool = False,
-        output_file: str = 'results.json'
+        output_file: str = 'results.json',
+        backend: str = 'numpy',
+        backend_cache: bool = True,
+        local_search: Optional[str] = None,
+        local_search_neighbours: int = 10,
+        seed: Optional[int] = None,
+        rng: Optional[np.random.Generator] = None,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: int = 1 << 31,
+        metric: Optional[str] = None,
+        distance_mode: str = 'dense',
+        seeding: Optional[Dict[SeedingType, int]] = None,
+        adaptive_operators: Optional[str] = None,
     ):
 
-    assert selection_type in ['tournament', 'roulette'], 'Invalid selection type'
+    assert selection_type in ['tournament', 'roulette', 'sus'], 'Invalid selection type'
+    assert distance_mode in ['dense', 'implicit'], 'Invalid distance mode'
+    assert adaptive_operators in [None] + ADAPTIVE_METHODS, 'Invalid adaptive operator selection'
+    assert local_search in [None, 'elites', 'offspring'], 'Invalid local search'
+    crossover_type = normalise_enum_keys(crossover_type, CrossoverType)
+    seeding = normalise_enum_keys(seeding, SeedingType)
     assert sum(crossover_type.values()) == 100, 'Crossover type values must add up to 100'
     assert sum(mutation_type.values()) == 100, 'Mutation type values must add up to 100'
 
     start_time = time.time()
 
+    # every random draw of the run comes from this generator,
+    # so a run with the same seed gives the same result
+    if rng is None:
+        rng = np.random.default_rng(seed)
+
+    if distance_mode == 'implicit' and backend != 'numpy':
+        # the compiled kernels index a real matrix
+        logger.warning('The implicit distance mode runs on the numpy backend')
+        backend = 'numpy'
+
+    # the crossover and mutation weights move with the improvement each operator produces,
+    # starting from crossover_type and mutation_type
+    crossover_selection: Optional[OperatorSelection] = None
+    mutation_selection: Optional[OperatorSelection] = None
+    if adaptive_operators is not None:
+        crossover_selection = OperatorSelection(crossover_type, method=adaptive_operators)
+        mutation_selection = OperatorSelection(mutation_type, method=adaptive_operators)
+
+    # implementation of the evaluation, crossover and mutation hot loops
+    hot_loops: Backend = get_backend(backend, cache=backend_cache)
+
     problem = load_tsp_file(file_path)
 
+    # arrays derived from the instance are memory-mapped from the cache directory when one is given
+    cache = ArrayCache(cache_dir, cache_max_bytes) if cache_dir is not None else None
+    metric = problem_metric(problem, metric)
+    cache_key = cache.instance_key(file_path, metric) if cache is not None else None
+
     # 2d array of city distances, where the index defines the city
-    distance_matrix: np.ndarray = generate_distance_matrix(problem['dimensions'], problem['cities'])
+    # the implicit mode computes the distances from the coordinates instead of storing them
+    if distance_mode == 'implicit':
+        distance_matrix = implicit_problem_distance_matrix(problem, metric=metric)
+    else:
+        distance_matrix: np.ndarray = cached(
+            cache,
+            cache_key,
+            'distance_matrix',
+            lambda: generate_problem_distance_matrix(problem, metric=metric)
+        )
+
+    # candidate lists of the 2-opt / Or-opt local search, the seeding heuristics and the edge crossovers
+    neighbours: Optional[np.ndarray] = None
+    if local_search is not None or seeding or any(t in EDGE_CROSSOVER_OPERATORS for t in crossover_type):
+        neighbours = cached(
+            cache,
+            cache_key,
+            f'neighbours_{local_search_neighbours}',
+            lambda: generate_neighbour_lists(distance_matrix, local_search_neighbours)
+        )
+    # hashes of the elites that are already locally optimal, so they are not searched again
+    locally_optimal = set()
 
     # Generate the initial population
     population: Population = generate_initial_population(
         population_size=population_size,
         dimensions=problem['dimensions'],
-        distance_matrix=distance_matrix
+        distance_matrix=distance_matrix,
+        rng=rng,
+        seeding=seeding,
+        neighbours=neighbours,
+        cities=problem['cities'],
     )
 
     # sort the population by distance, from shortest to longest
-    population.individuals.sort(key=lambda x: x.distance, reverse=False)
+    population.sort()
+
+    # hashes of every path in the population, kept in sync on each replacement
+    genome_index = GenomeIndex(population.hashes)
 
     early_stoppage = {
         'counter': 0,
-        'individual': population.individuals[0]
+        'distance': population.distances[0]
     }
 
     tracker: List[Dict[str, Any]] = []
@@ -79,74 +367,70 @@ def run(
     # Selection Step
     for g in range(generations):
         if 'generation' in generation_tracker:
-            if generation_tracker['best_distance'] == population.individuals[0].distance:
+            if generation_tracker['best_distance'] == population.distances[0]:
                 pass
             else:
                 generation_tracker['generation'] = g+1
-                generation_tracker['best_fitness'] = population.individuals[0].fitness
-                generation_tracker['best_distance'] = population.individuals[0].distance
-                generation_tracker['average_distance'] = np.mean([ind.distance for ind in population.individuals])
+                generation_tracker['best_fitness'] = population.fitness[0]
+                generation_tracker['best_distance'] = population.distances[0]
+                generation_tracker['average_distance'] = np.mean(population.distances)
                 tracker.append(generation_tracker)
 
         generation_tracker = {
             'generation': g+1,
-            'best_fitness': population.individuals[0].fitness,
-            'best_distance': population.individuals[0].distance,
-            'average_distance': np.mean([ind.distance for ind in population.individuals]),
+            'best_fitness': population.fitness[0],
+            'best_distance': population.distances[0],
+            'average_distance': np.mean(population.distances),
         }
 
         if verbose > 0:
-            print(f'Population size: {len(population.individuals)}')
-
-        elites = copy.deepcopy(population.individuals[:elites_size]) # get the best individuals
+            print(f'Population size: {len(population)}')
+
+        if local_search == 'elites':
+            improve_elites(
+                population,
+                genome_index,
+                elites_size,
+                distance_matrix,
+                neighbours,
+                locally_optimal,
+                hot_loops,
+                debug=verbose > 1
+            )
 
-        if elites[0].distance == early_stoppage['individual'].distance:
+        if population.distances[0] == early_stoppage['distance']:
             early_stoppage['counter'] += 1
         else:
             early_stoppage['counter'] = 0
-            early_stoppage['individual'] = population.individuals[0]
+            early_stoppage['distance'] = population.distances[0]
 
         if early_stoppage['counter'] > early_stop:
             print(f'Early stopping at generation {g}')
             break
 
-        no_selects_parents = int( len(population.individuals) * 0.8)
-
-        if selection_type == 'roulette':
-            parents: List[Individual] = roulette_wheel_selection(
-                population=population,
-                selects=int(no_selects_parents)
-            )
-        else: # tournament
-            parents: List[Individual] = tournament_selection(
-                population=population,
-                selects=int(no_selects_parents),
-                tournament_size=3
-            )
-
-        if verbose > 0:
-            print(f'Parents selected: {len(parents)}')
-
-        # Perform crossover on the parents to create new offspring `Individuals`
-        offspring = apply_crossover(parents, crossover_type, chance_of_crossover)
-        offspring = apply_mutation(offspring, mutation_type, chance_of_mutation, distance_matrix)
-
-        # replace the worst individuals with the offspring
-        for index, individual in enumerate(offspring):
-            if tuple(individual.path) in set(tuple(ind.path) for ind in population.individuals):
-                # if the path already exists, we skip it
-                continue
-            population.individuals[-(index+1)] = individual
-
-        population.individuals[0:elites_size] = elites
-
-        # sort again
-        population.individuals.sort(key=lambda x: x.distance, reverse=False)
-
-        average_distance = np.mean([ind.distance for ind in population.individuals])
+        next_generation(
+            population,
+            genome_index,
+            distance_matrix,
+            hot_loops,
+            chance_of_crossover=chance_of_crossover,
+            chance_of_mutation=chance_of_mutation,
+            elites_size=elites_size,
+            crossover_type=crossover_type,
+            selection_type=selection_type,
+            mutation_type=mutation_type,
+            local_search=local_search,
+            neighbours=neighbours,
+            verbose=verbose,
+            rng=rng,
+            crossover_selection=crossover_selection,
+            mutation_selection=mutation_selection,
+        )
+
+        average_distance = np.mean(population.distances)
         print(f'Generation: {g}, '
-              f'Best fitness: {population.individuals[0].fitness}, '
-              f'Best distance: {population.individuals[0].distance:.2f}, '
+              f'Best fitness: {population.fitness[0]}, '
+              f'Best distance: {population.distances[0]:.2f}, '
               f'Avg. Distance: {average_distance:.2f}')
 
 
@@ -154,13 +438,14 @@ def run(
     time_taken = end_time - start_time
 
     if plot_graphs:
-        plot_path(path=population.individuals[0].path, cities=problem['cities'])
+        if problem['cities'] is not None:
+            plot_path(path=population.paths[0], cities=problem['cities'])
         plot_fitness_over_time(tracker)
         plot_distance_over_time(tracker)
 
     run_tracker = {
         'highlights': tracker,
-        'best_individual': population.individuals[0].to_dict(),
+        'best_individual': population[0].to_dict(),
         'time_taken': time_taken,
         'options': {
             'generations': generations,
@@ -178,9 +463,26 @@ def run(
             'file_path': file_path,
             'elites_size': elites_size,
             'verbose': verbose,
+            'backend': hot_loops.name.value,
+            'local_search': local_search,
+            'local_search_neighbours': local_search_neighbours,
+            'seed': seed,
+            'cache_dir': cache_dir,
+            'metric': metric,
+            'distance_mode': distance_mode,
+            'seeding': {
+                k.name: v for k, v in (seeding or {}).items()
+            },
+            'adaptive_operators': adaptive_operators,
         }
     }
 
+    if adaptive_operators is not None:
+        run_tracker['operator_statistics'] = {
+            'crossover': crossover_selection.statistics(),
+            'mutation': mutation_selection.statistics(),
+        }
+
 
     run_tracker = np_to_python(run_tracker)
 
@@ -188,6 +490,7 @@ def run(
         write_to_json(run_tracker, output_file)
 
     return {
-        'best_individual': population.individuals[0].to_dict(),
+        'best_individual': population[0].to_dict(),
         'time_taken': time_taken,
+        'operator_statistics': run_tracker.get('operator_statistics'),
     }
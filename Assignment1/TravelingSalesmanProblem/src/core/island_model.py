@@ -0,0 +1,452 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+import numpy as np
+
+from parsers.tsp_parser import load_tsp_file
+from utils.plotting import plot_distance_over_time, plot_fitness_over_time, plot_path
+from utils.common import np_to_python, write_to_json, normalise_enum_keys
+from utils.generate import generate_initial_population
+from utils.cache import ArrayCache, cached
+from core.seeding.seeding import SeedingType
+from core.evaluation.distance import generate_problem_distance_matrix, generate_neighbour_lists, problem_metric
+from core.crossover.crossover import CrossoverType, EDGE_CROSSOVER_OPERATORS
+from core.mutation.mutation import MutationType
+from core.models.population import Population
+from core.models.genome_index import GenomeIndex
+from core.backend import get_backend
+from core.genetic_algorithm import improve_elites, next_generation
+from core.operator_selection import OperatorSelection, ADAPTIVE_METHODS
+
+"""
+Island model genetic algorithm
+Several populations (islands) evolve in separate worker processes. The distance matrix is
+written once to shared memory and every worker maps it instead of receiving a copy.
+Every migration interval the islands come back to the main process, the best individuals of
+each island migrate to its neighbours on the topology, replacing their worst individuals,
+and the islands are sent out again for the next interval.
+Islands only talk at migrations, so the work scales with the number of cores
+as long as the interval is long enough to hide the transfer of the populations.
+"""
+
+TOPOLOGIES = ['ring', 'fully_connected', 'random']
+
+# state of a worker process, set once by _attach_worker
+_worker: Dict[str, Any] = {}
+
+@dataclass
+class Island:
+    index: int
+    # child stream of the run generator, travels with the island between the processes
+    rng: np.random.Generator
+    population: Optional[Population] = None
+    locally_optimal: Set[int] = field(default_factory=set)
+    early_stop_counter: int = 0
+    stopped: bool = False
+    # every island adapts its own operator weights, see core.operator_selection
+    crossover_selection: Optional[OperatorSelection] = None
+    mutation_selection: Optional[OperatorSelection] = None
+
+def _attach_worker(
+        shared_memory_name: str,
+        shape: Tuple[int, int],
+        dtype: str,
+        neighbours: Optional[np.ndarray],
+        cities: Optional[np.ndarray],
+        options: Dict[str, Any],
+    ):
+    """
+    Map the shared distance matrix and prepare the backend of a worker process
+    """
+    # the workers share the resource tracker of the main process, which unlinks the segment
+    shared_memory = SharedMemory(name=shared_memory_name)
+
+    distance_matrix = np.ndarray(shape, dtype=dtype, buffer=shared_memory.buf)
+    _worker['shared_memory'] = shared_memory
+    _worker['distance_matrix'] = distance_matrix
+    _worker['options'] = options
+    _worker['hot_loops'] = get_backend(options['backend'], cache=options['backend_cache'])
+    _worker['neighbours'] = neighbours
+    _worker['cities'] = cities
+
+def _evolve_island(
+        island: Island,
+        generations: int,
+    ) -> Island:
+    """
+    Evolve one island for a number of generations inside a worker process
+    :param island: Island - the island, its population is generated on the first interval
+    :param generations: int - the number of generations to run
+    :return: Island - the evolved island
+    """
+    distance_matrix = _worker['distance_matrix']
+    options = _worker['options']
+
+    if island.population is None:
+        island.population = generate_initial_population(
+            population_size=options['population_size'],
+            dimensions=len(distance_matrix),
+            distance_matrix=distance_matrix,
+            rng=island.rng,
+            seeding=options['seeding'],
+            neighbours=_worker['neighbours'],
+            cities=_worker['cities'],
+        )
+        island.population.sort()
+
+    population = island.population
+    genome_index = GenomeIndex(population.hashes)
+
+    for _ in range(generations):
+        if options['local_search'] == 'elites':
+            improve_elites(
+                population,
+                genome_index,
+                options['elites_size'],
+                distance_matrix,
+                _worker['neighbours'],
+                island.locally_optimal,
+                _worker['hot_loops']
+            )
+
+        best_distance = population.distances[0]
+        next_generation(
+            population,
+            genome_index,
+            distance_matrix,
+            _worker['hot_loops'],
+            chance_of_crossover=options['chance_of_crossover'],
+            chance_of_mutation=options['chance_of_mutation'],
+            elites_size=options['elites_size'],
+            crossover_type=options['crossover_type'],
+            selection_type=options['selection_type'],
+            mutation_type=options['mutation_type'],
+            local_search=options['local_search'],
+            neighbours=_worker['neighbours'],
+            rng=island.rng,
+            crossover_selection=island.crossover_selection,
+            mutation_selection=island.mutation_selection,
+        )
+
+        if population.distances[0] == best_distance:
+            island.early_stop_counter += 1
+        else:
+            island.early_stop_counter = 0
+        if island.early_stop_counter > options['early_stop']:
+            island.stopped = True
+            break
+
+    return island
+
+def migration_sources(
+        islands: int,
+        topology: str,
+        rng: np.random.Generator,
+    ) -> List[List[int]]:
+    """
+    Get the islands each island receives migrants from
+    :param islands: int - the number of islands
+    :param topology: str - 'ring', 'fully_connected' or 'random'
+    :param rng: np.random.Generator - draws the sources of the random topology
+    :return: List[List[int]] - the source islands of every island
+    """
+    if islands < 2:
+        return [[] for _ in range(islands)]
+    if topology == 'ring':
+        return [[(index - 1) % islands] for index in range(islands)]
+    if topology == 'fully_connected':
+        return [[source for source in range(islands) if source != index] for index in range(islands)]
+
+    # random: a different source island each migration
+    sources = rng.integers(0, islands - 1, size=islands)
+    sources += sources >= np.arange(islands)
+    return [[int(source)] for source in sources]
+
+def migrate(
+        islands: List[Island],
+        migrants: int,
+        elites_size: int,
+        topology: str,
+        rng: np.random.Generator,
+    ):
+    """
+    Copy the best individuals of every island over the worst individuals of its neighbours
+    Migrants that already live on the receiving island are skipped
+    :param islands: List[Island] - the islands, their populations are sorted and updated in place
+    :param migrants: int - the number of individuals each island sends
+    :param elites_size: int - the number of best individuals of every island that are never replaced
+    :param topology: str - 'ring', 'fully_connected' or 'random'
+    :param rng: np.random.Generator - draws the sources of the random topology
+    """
+    # every island sends the migrants it had before this migration
+    emigrants = [
+        (
+            island.population.paths[:migrants].copy(),
+            island.population.distances[:migrants].copy(),
+            island.population.fitness[:migrants].copy(),
+            island.population.hashes[:migrants].copy(),
+        )
+        for island in islands
+    ]
+
+    # never overwrite the island's own elites, nor the migrants it sends
+    protected = max(elites_size, migrants)
+    for island, sources in zip(islands, migration_sources(len(islands), topology, rng)):
+        population = island.population
+        genome_index = GenomeIndex(population.hashes)
+        row = len(population) - 1
+        for source in sources:
+            paths, distances, fitness, hashes = emigrants[source]
+            for index in range(len(paths)):
+                if row < protected:
+                    break
+                if hashes[index] in genome_index:
+                    continue
+                genome_index.replace(population.hashes[row], hashes[index])
+                population.set_row(row, paths[index], distances[index], fitness[index], hashes[index])
+                row -= 1
+        population.sort()
+
+def run_islands(
+        islands: int = 4,
+        migration_interval: int = 50,
+        migrants: int = 2,
+        topology: str = 'ring',
+        workers: Optional[int] = None,
+        seed: Optional[int] = None,
+        rng: Optional[np.random.Generator] = None,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: int = 1 << 31,
+        metric: Optional[str] = None,
+        seeding: Optional[Dict[SeedingType, int]] = None,
+        adaptive_operators: Optional[str] = None,
+        population_size: int = 100,
+        generations: int = 1_000,
+        chance_of_crossover: int = 95,
+        chance_of_mutation: int = 6,
+        elites_size: int = 5,
+        file_path: str = 'tsp/berlin52.tsp',
+        verbose: int = 0,
+        early_stop: int = 1000,
+        crossover_type: Dict[CrossoverType, int] = {
+            CrossoverType.OX: 50, CrossoverType.PMX: 50
+            },
+        selection_type: str = 'tournament',
+        mutation_type: Dict[MutationType, int] = {
+            MutationType.SWAP: 50,
+            MutationType.SCRAMBLE: 25,
+            MutationType.INVERSION: 25
+        },
+        write_results: bool = False,
+        plot_graphs: bool = False,
+        output_file: str = 'results.json',
+        backend: str = 'numpy',
+        backend_cache: bool = True,
+        local_search: Optional[str] = None,
+        local_search_neighbours: int = 10,
+    ):
+    """
+    Run the genetic algorithm as an island model, the arguments after cache_max_bytes follow
+    core.genetic_algorithm.run and apply to every island
+    :param islands: int - the number of populations
+    :param migration_interval: int - the number of generations between migrations
+    :param migrants: int - the number of best individuals each island sends per migration
+    :param topology: str - 'ring', 'fully_connected' or 'random'
+    :param workers: int - the number of worker processes, one per island up to the number of cores if not given
+    :param seed: int - seed of the run generator, drawn from the OS if not given
+    :param rng: np.random.Generator - the run generator, overrides seed
+    :param cache_dir: str - directory caching the distance matrix and neighbour lists, see utils.cache
+    :param cache_max_bytes: int - the size limit of the cache directory
+    :param metric: str - overrides the EDGE_WEIGHT_TYPE of the file, 'EUCLIDEAN' for unrounded distances
+    :param seeding: Dict[SeedingType, int] - the percentage of each island built by each seeding heuristic,
+        keys may also be given by name or value, see utils.common.normalise_enum_keys
+    :param adaptive_operators: str - 'probability_matching' or 'bandit' to adapt the operator weights
+        of every island on its own, see core.operator_selection
+    :return: Dict[str, Any] - the best individual over all islands and the time taken
+    """
+
+    assert topology in TOPOLOGIES, 'Invalid topology'
+    assert selection_type in ['tournament', 'roulette', 'sus'], 'Invalid selection type'
+    assert local_search in [None, 'elites', 'offspring'], 'Invalid local search'
+    crossover_type = normalise_enum_keys(crossover_type, CrossoverType)
+    seeding = normalise_enum_keys(seeding, SeedingType)
+    assert sum(crossover_type.values()) == 100, 'Crossover type values must add up to 100'
+    assert sum(mutation_type.values()) == 100, 'Mutation type values must add up to 100'
+    assert migration_interval > 0, 'Migration interval must be positive'
+    assert adaptive_operators in [None] + ADAPTIVE_METHODS, 'Invalid adaptive operator selection'
+
+    start_time = time.time()
+
+    problem = load_tsp_file(file_path)
+    cache = ArrayCache(cache_dir, cache_max_bytes) if cache_dir is not None else None
+    metric = problem_metric(problem, metric)
+    cache_key = cache.instance_key(file_path, metric) if cache is not None else None
+    distance_matrix: np.ndarray = cached(
+        cache,
+        cache_key,
+        'distance_matrix',
+        lambda: generate_problem_distance_matrix(problem, metric=metric)
+    )
+
+    # the neighbour lists are small, every worker gets its own copy
+    neighbours: Optional[np.ndarray] = None
+    if local_search is not None or seeding or any(t in EDGE_CROSSOVER_OPERATORS for t in crossover_type):
+        neighbours = cached(
+            cache,
+            cache_key,
+            f'neighbours_{local_search_neighbours}',
+            lambda: generate_neighbour_lists(distance_matrix, local_search_neighbours)
+        )
+
+    # every island evolves with its own child stream of the run generator,
+    # the run generator itself draws the migrations
+    if rng is None:
+        rng = np.random.default_rng(seed)
+    island_list = [Island(index=index, rng=island_rng) for index, island_rng in enumerate(rng.spawn(islands))]
+    if adaptive_operators is not None:
+        for island in island_list:
+            island.crossover_selection = OperatorSelection(crossover_type, method=adaptive_operators)
+            island.mutation_selection = OperatorSelection(mutation_type, method=adaptive_operators)
+
+    options = {
+        'population_size': population_size,
+        'chance_of_crossover': chance_of_crossover,
+        'chance_of_mutation': chance_of_mutation,
+        'elites_size': elites_size,
+        'early_stop': early_stop,
+        'crossover_type': crossover_type,
+        'selection_type': selection_type,
+        'mutation_type': mutation_type,
+        'backend': backend,
+        'backend_cache': backend_cache,
+        'local_search': local_search,
+        'local_search_neighbours': local_search_neighbours,
+        'seeding': seeding,
+    }
+
+    if workers is None:
+        workers = min(islands, os.cpu_count() or 1)
+
+    tracker: List[Dict[str, Any]] = []
+    best_distance = np.inf
+    generation = 0
+
+    shared_memory = SharedMemory(create=True, size=distance_matrix.nbytes)
+    try:
+        shared_distance_matrix = np.ndarray(distance_matrix.shape, dtype=distance_matrix.dtype, buffer=shared_memory.buf)
+        shared_distance_matrix[:] = distance_matrix
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_attach_worker,
+            initargs=(shared_memory.name, distance_matrix.shape, distance_matrix.dtype.str, neighbours, problem['cities'], options),
+        ) as executor:
+            while generation < generations:
+                interval = min(migration_interval, generations - generation)
+                running = [island for island in island_list if not island.stopped]
+                if not running:
+                    print(f'Early stopping at generation {generation}')
+                    break
+
+                evolved = executor.map(_evolve_island, running, [interval] * len(running))
+                for island in evolved:
+                    island_list[island.index] = island
+                generation += interval
+
+                migrate(island_list, migrants, elites_size, topology, rng)
+
+                best_island = min(island_list, key=lambda island: island.population.distances[0])
+                average_distance = np.mean([island.population.distances for island in island_list])
+                if best_island.population.distances[0] != best_distance:
+                    best_distance = best_island.population.distances[0]
+                    tracker.append({
+                        'generation': generation,
+                        'best_fitness': best_island.population.fitness[0],
+                        'best_distance': best_distance,
+                        'average_distance': average_distance,
+                    })
+
+                if verbose > 0:
+                    for island in island_list:
+                        print(f'Island: {island.index}, Best distance: {island.population.distances[0]:.2f}')
+                print(f'Generation: {generation}, '
+                      f'Best fitness: {best_island.population.fitness[0]}, '
+                      f'Best distance: {best_distance:.2f}, '
+                      f'Avg. Distance: {average_distance:.2f}')
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+
+    end_time = time.time()
+    time_taken = end_time - start_time
+
+    best_individual = min(island_list, key=lambda island: island.population.distances[0]).population[0]
+
+    if plot_graphs:
+        if problem['cities'] is not None:
+            plot_path(path=best_individual.path, cities=problem['cities'])
+        plot_fitness_over_time(tracker)
+        plot_distance_over_time(tracker)
+
+    run_tracker = {
+        'highlights': tracker,
+        'best_individual': best_individual.to_dict(),
+        'time_taken': time_taken,
+        'options': {
+            'islands': islands,
+            'migration_interval': migration_interval,
+            'migrants': migrants,
+            'topology': topology,
+            'workers': workers,
+            'seed': seed,
+            'generations': generations,
+            'population_size': population_size,
+            'early_stop': early_stop,
+            'chance_of_mutation': chance_of_mutation,
+            'chance_of_crossover': chance_of_crossover,
+            'selection_type': selection_type,
+            'crossover_type': {
+                k.name: v for k, v in crossover_type.items()
+            },
+            'mutation_type': {
+                k.name: v for k, v in mutation_type.items()
+            },
+            'file_path': file_path,
+            'elites_size': elites_size,
+            'verbose': verbose,
+            'backend': backend,
+            'local_search': local_search,
+            'local_search_neighbours': local_search_neighbours,
+            'cache_dir': cache_dir,
+            'metric': metric,
+            'seeding': {
+                k.name: v for k, v in (seeding or {}).items()
+            },
+            'adaptive_operators': adaptive_operators,
+        }
+    }
+
+    if adaptive_operators is not None:
+        run_tracker['operator_statistics'] = [
+            {
+                'island': island.index,
+                'crossover': island.crossover_selection.statistics(),
+                'mutation': island.mutation_selection.statistics(),
+            }
+            for island in island_list
+        ]
+
+    run_tracker = np_to_python(run_tracker)
+
+    if write_results:
+        write_to_json(run_tracker, output_file)
+
+    return {
+        'best_individual': best_individual.to_dict(),
+        'time_taken': time_taken,
+        'operator_statistics': run_tracker.get('operator_statistics'),
+    }
@@ -0,0 +1,229 @@
+from typing import Callable, Optional
+
+import numpy as np
+
+from core.evaluation.distance import calculate_total_distance_of_paths
+
+"""
+2-opt and Or-opt local search, used to improve the elites or the offspring of the
+genetic algorithm (memetic mode).
+Moves are only searched between a city and its k nearest neighbours, and a queue of
+don't-look bits keeps a city out of the search until one of its tour edges changes,
+so a pass over an improved tour costs O(N * k) instead of O(N^2).
+The kernel is written as plain loops over numpy arrays so the numba backend can compile it,
+see core.backend.
+"""
+
+# smallest length change counted as an improvement, guards against float round-off loops
+EPSILON = 1e-9
+
+def two_opt_or_opt(
+        path: np.ndarray,
+        distance_matrix: np.ndarray,
+        neighbours: np.ndarray,
+        max_segment: int = 3,
+    ) -> float:
+    """
+    Improve a tour with 2-opt and Or-opt moves until neither finds an improvement
+    For each active city a 2-opt move is tried first, joining the city to one of its neighbours,
+    then an Or-opt move, relocating the segment of 1 to max_segment cities starting at the city
+    next to one of the neighbours of either segment end
+    :param path: np.ndarray - the tour, improved in place
+    :param distance_matrix: np.ndarray - the distance matrix, assumed symmetric
+    :param neighbours: np.ndarray - (N, k) candidate lists, sorted from nearest to furthest
+    :param max_segment: int - the longest segment moved by Or-opt
+    :return: float - the change in tour length, zero or negative
+    """
+    n = path.shape[0]
+    improvement = 0.0
+    if n < 5:
+        return improvement
+    k = neighbours.shape[1]
+
+    position = np.empty(n, dtype=np.int64)
+    for i in range(n):
+        position[path[i]] = i
+
+    # circular queue of the cities whose don't-look bit is off
+    queue = np.empty(n, dtype=np.int64)
+    queued = np.ones(n, dtype=np.bool_)
+    for i in range(n):
+        queue[i] = path[i]
+    head = 0
+    size = n
+
+    touched = np.empty(6, dtype=np.int64)
+    segment = np.empty(max_segment, dtype=path.dtype)
+    rest = np.empty(n, dtype=path.dtype)
+
+    def reverse(i, j):
+        # reverse the positions i..j walking forward, or the complement when it is shorter,
+        # both give the same cyclic tour
+        length = (j - i) % n + 1
+        if 2 * length > n:
+            i, j = (j + 1) % n, (i - 1) % n
+            length = n - length
+        for _ in range(length // 2):
+            city_i = path[i]
+            city_j = path[j]
+            path[i] = city_j
+            path[j] = city_i
+            position[city_j] = i
+            position[city_i] = j
+            i = (i + 1) % n
+            j = (j - 1) % n
+
+    while size > 0:
+        a = queue[head]
+        head = (head + 1) % n
+        size -= 1
+        queued[a] = False
+        moved = False
+        touched_size = 0
+
+        # 2-opt: replace the edges (a, b) and (c, d) with (a, c) and (b, d),
+        # b and d follow a and c in the same direction
+        for step in range(2):
+            if moved:
+                break
+            direction = 1 if step == 0 else -1
+            b = path[(position[a] + direction) % n]
+            d_ab = distance_matrix[a, b]
+            for j in range(k):
+                c = neighbours[a, j]
+                d_ac = distance_matrix[a, c]
+                if d_ac >= d_ab:
+                    break
+                d = path[(position[c] + direction) % n]
+                if c == b or d == a:
+                    continue
+                delta = d_ac + distance_matrix[b, d] - d_ab - distance_matrix[c, d]
+                if delta < -EPSILON:
+                    if direction == 1:
+                        reverse(position[b], position[c])
+                    else:
+                        reverse(position[c], position[b])
+                    improvement += delta
+                    touched[0] = a
+                    touched[1] = b
+                    touched[2] = c
+                    touched[3] = d
+                    touched_size = 4
+                    moved = True
+                    break
+
+        # Or-opt: move the segment s1..s2 starting at a between c and its tour neighbour e,
+        # with one of the segment ends next to c
+        for length in range(1, max_segment + 1):
+            if moved or length + 3 > n:
+                break
+            start = position[a]
+            s1 = a
+            s2 = path[(start + length - 1) % n]
+            p = path[(start - 1) % n]
+            nx = path[(start + length) % n]
+            removal_gain = distance_matrix[p, s1] + distance_matrix[s2, nx] - distance_matrix[p, nx]
+            if removal_gain <= EPSILON:
+                continue
+
+            for side in range(1 if length == 1 else 2):
+                if moved:
+                    break
+                end = s1 if side == 0 else s2
+                other = s2 if side == 0 else s1
+                for j in range(k):
+                    if moved:
+                        break
+                    c = neighbours[end, j]
+                    d_ec = distance_matrix[end, c]
+                    if d_ec >= removal_gain:
+                        break
+                    if (position[c] - start) % n < length:
+                        continue
+                    for step in range(2):
+                        direction = 1 if step == 0 else -1
+                        e = path[(position[c] + direction) % n]
+                        if (position[e] - start) % n < length:
+                            continue
+                        delta = d_ec + distance_matrix[other, e] - distance_matrix[c, e] - removal_gain
+                        if delta >= -EPSILON:
+                            continue
+
+                        # the remaining cities from nx round to p, then the segment is
+                        # inserted after x, oriented so that end sits next to c
+                        for i in range(length):
+                            segment[i] = path[(start + i) % n]
+                        for i in range(n - length):
+                            rest[i] = path[(start + length + i) % n]
+                        x = c if direction == 1 else e
+                        flip = (direction == 1) == (side == 1)
+                        insert_at = (position[x] - start - length) % n + 1
+
+                        for i in range(insert_at):
+                            path[i] = rest[i]
+                        for i in range(length):
+                            path[insert_at + i] = segment[length - 1 - i] if flip else segment[i]
+                        for i in range(insert_at, n - length):
+                            path[i + length] = rest[i]
+                        for i in range(n):
+                            position[path[i]] = i
+
+                        improvement += delta
+                        touched[0] = p
+                        touched[1] = nx
+                        touched[2] = s1
+                        touched[3] = s2
+                        touched[4] = c
+                        touched[5] = e
+                        touched_size = 6
+                        moved = True
+                        break
+
+        if moved:
+            # the cities at the ends of the changed edges are searched again
+            for t in range(touched_size):
+                city = touched[t]
+                if not queued[city]:
+                    queue[(head + size) % n] = city
+                    size += 1
+                    queued[city] = True
+
+    return improvement
+
+def apply_local_search(
+        paths: np.ndarray,
+        distances: np.ndarray,
+        rows: np.ndarray,
+        distance_matrix: np.ndarray,
+        neighbours: np.ndarray,
+        max_segment: int = 3,
+        debug: bool = False,
+        local_search_kernel: Optional[Callable] = None,
+    ) -> np.ndarray:
+    """
+    Apply 2-opt and Or-opt local search to some rows of a path matrix
+    Each row is improved in place and its distance is updated with the length change
+    reported by the search
+    :param paths: np.ndarray - (paths, N) matrix of the tours
+    :param distances: np.ndarray - the current distance of each tour, updated in place
+    :param rows: np.ndarray - the rows to improve
+    :param distance_matrix: np.ndarray - the distance matrix
+    :param neighbours: np.ndarray - (N, k) candidate lists, see core.evaluation.distance.generate_neighbour_lists
+    :param max_segment: int - the longest segment moved by Or-opt
+    :param debug: bool - if set, cross-check every updated distance against a full re-evaluation
+    :param local_search_kernel: Callable - compiled two_opt_or_opt, see core.backend
+    :return: np.ndarray - the change in tour length of each of the rows
+    """
+    kernel = local_search_kernel or two_opt_or_opt
+
+    deltas = np.zeros(len(rows), dtype=np.float64)
+    for index, row in enumerate(rows):
+        deltas[index] = kernel(paths[row], distance_matrix, neighbours, max_segment)
+    distances[rows] += deltas
+
+    if debug and len(rows):
+        full_distances = calculate_total_distance_of_paths(paths[rows], distance_matrix)
+        assert np.allclose(distances[rows], full_distances), \
+            'Local search distances are out of sync with a full re-evaluation'
+
+    return deltas
@@ -0,0 +1,79 @@
+from typing import Dict, Iterable
+
+import numpy as np
+
+"""
+Population-wide index of genome hashes
+
+Genomes are hashed Zobrist style, every (position, gene) pair is mapped to a
+pseudo random 64 bit key and the keys of a genome are XOR-ed together.
+The keys are derived with the splitmix64 finaliser instead of a lookup table,
+so hashing needs no memory per position and a whole population of genomes is
+hashed with a handful of vectorised operations.
+
+Two different genomes share a hash with a probability of about 2^-64,
+which the index accepts in exchange for O(1) membership checks.
+"""
+
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def _splitmix64(values: np.ndarray) -> np.ndarray:
+    values = values + _GOLDEN_GAMMA
+    values = (values ^ (values >> np.uint64(30))) * _MIX_1
+    values = (values ^ (values >> np.uint64(27))) * _MIX_2
+    return values ^ (values >> np.uint64(31))
+
+
+def hash_genomes(genomes) -> np.ndarray:
+    """
+    Hash every genome of a batch
+    :param genomes: (genomes, length) array of non negative integer genes, a single genome is also accepted
+    :return: np.ndarray - the uint64 hash of each genome
+    """
+    genomes = np.asarray(genomes)
+    if genomes.ndim == 1:
+        genomes = genomes[np.newaxis, :]
+
+    positions = np.arange(genomes.shape[1], dtype=np.uint64)
+    keys = _splitmix64((positions << np.uint64(32)) | genomes.astype(np.uint64))
+    return np.bitwise_xor.reduce(keys, axis=1)
+
+
+class GenomeIndex:
+    """
+    Multiset of the genome hashes present in a population
+    Kept up to date on every insert and evict, so checking whether an offspring
+    already exists in the population costs O(1) instead of a scan of the population
+    """
+
+    def __init__(self, genome_hashes: Iterable[int] = ()):
+        self._counts: Dict[int, int] = {}
+        for genome_hash in genome_hashes:
+            self.add(genome_hash)
+
+    def add(self, genome_hash: int):
+        genome_hash = int(genome_hash)
+        self._counts[genome_hash] = self._counts.get(genome_hash, 0) + 1
+
+    def remove(self, genome_hash: int):
+        genome_hash = int(genome_hash)
+        count = self._counts.get(genome_hash, 0)
+        if count == 0:
+            raise KeyError(f'Genome hash {genome_hash} is not in the index')
+        if count == 1:
+            del self._counts[genome_hash]
+        else:
+            self._counts[genome_hash] = count - 1
+
+    def replace(self, old_hash: int, new_hash: int):
+        self.remove(old_hash)
+        self.add(new_hash)
+
+    def __contains__(self, genome_hash) -> bool:
+        return int(genome_hash) in self._counts
+
+    def __len__(self) -> int:
+        return sum(self._counts.values())
@@ -1,43 +1,132 @@
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 
 import numpy as np
 
+from core.models.genome_index import hash_genomes
+
+PATH_DTYPE = np.int32
+
 class Individual:
+    """
+    A lightweight view of one row of a Population
+    Reads and writes go straight through to the population arrays, no tour is copied
+    """
+
+    __slots__ = ('_population', '_index')
 
     def __init__(
-            self, path: List[int],
-            distance: np.float64,
-            fitness: np.float64
+            self,
+            population: 'Population',
+            index: int
         ):
-        self.path = path
-        self.distance = distance
-        self.fitness = fitness
+        self._population = population
+        self._index = index
+
+    @property
+    def path(self) -> np.ndarray:
+        return self._population.paths[self._index]
+
+    @property
+    def distance(self) -> np.float64:
+        return self._population.distances[self._index]
+
+    @distance.setter
+    def distance(self, value: np.float64):
+        self._population.distances[self._index] = value
+
+    @property
+    def fitness(self) -> np.float64:
+        return self._population.fitness[self._index]
+
+    @fitness.setter
+    def fitness(self, value: np.float64):
+        self._population.fitness[self._index] = value
 
     def __eq__(self, other):
         if isinstance(other, Individual):
-            return self.path == other.path
+            return np.array_equal(self.path, other.path)
         return False
 
     def __hash__(self):
-        return hash(tuple(self.path))
+        return hash(self.path.tobytes())
 
     def to_dict(self) -> Dict[str, Any]:
         return {
-            'path': self.path,
+            'path': self.path.tolist(),
             'distance': self.distance,
             'fitness': self.fitness
         }
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Individual':
-        return cls(
-            path=data['path'],
-            distance=data['distance'],
-            fitness=data['fitness']
+        population = Population.from_paths(
+            paths=[data['path']],
+            distances=[data['distance']],
+            fitness=[data['fitness']]
         )
+        return population[0]
 
 @dataclass
 class Population:
-    individuals: List[Individual] # defines the individuals in the population
+    """
+    Struct-of-arrays population
+    Row i of each array describes the i-th individual of the population
+    """
+    paths: np.ndarray # (population_size, dimensions) matrix, one tour per row
+    distances: np.ndarray # total distance of each tour
+    fitness: np.ndarray # fitness of each tour
+    hashes: np.ndarray # hash of each tour, see core.models.genome_index
+
+    @classmethod
+    def from_paths(
+            cls,
+            paths,
+            distances: Optional[List[np.float64]] = None,
+            fitness: Optional[List[np.float64]] = None
+        ) -> 'Population':
+        paths = np.ascontiguousarray(paths, dtype=PATH_DTYPE)
+        if distances is None:
+            distances = np.zeros(len(paths), dtype=np.float64)
+        if fitness is None:
+            fitness = np.zeros(len(paths), dtype=np.float64)
+        return cls(
+            paths=paths,
+            distances=np.asarray(distances, dtype=np.float64),
+            fitness=np.asarray(fitness, dtype=np.float64),
+            hashes=hash_genomes(paths)
+        )
+
+    @property
+    def individuals(self) -> List[Individual]:
+        return [Individual(self, i) for i in range(len(self))]
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __getitem__(self, index: int) -> Individual:
+        return Individual(self, index)
+
+    def sort(self):
+        """
+        Sort the population by distance, from shortest to longest
+        """
+        order = np.argsort(self.distances, kind='stable')
+        self.paths = self.paths[order]
+        self.distances = self.distances[order]
+        self.fitness = self.fitness[order]
+        self.hashes = self.hashes[order]
+
+    def set_row(
+            self,
+            index: int,
+            path: np.ndarray,
+            distance: np.float64,
+            fitness: np.float64,
+            path_hash: np.uint64
+        ):
+        self.paths[index] = path
+        self.distances[index] = distance
+        self.fitness[index] = fitness
+        self.hashes[index] = path_hash
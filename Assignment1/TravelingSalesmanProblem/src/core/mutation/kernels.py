@@ -0,0 +1,102 @@
+import numpy as np
+
+"""
+Loop kernels of the compiled backend, see core.backend
+They are plain Python that Numba can compile, and are only compiled when the
+numba backend is selected. Every random draw is made by the caller, so the
+kernels themselves are deterministic.
+"""
+
+# operator codes understood by mutate_kernel
+SWAP = 0
+SCRAMBLE = 1
+INVERSION = 2
+
+def mutate_kernel(
+        offspring: np.ndarray,
+        distances: np.ndarray,
+        rows: np.ndarray,
+        operators: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        uniforms: np.ndarray,
+        distance_matrix: np.ndarray,
+    ):
+    """
+    Mutate the given rows in place and update their distances with the length change
+    For a swap, starts and ends hold the two positions to swap,
+    otherwise they hold the [start, end) slice.
+    A scramble consumes one uniform per shuffled gene from uniforms, in row order
+    """
+    chromosome_length = offspring.shape[1]
+    uniform_index = 0
+
+    def edge(path, position):
+        # length of the edge leaving the given position, the last edge wraps to the first city
+        return distance_matrix[path[position % chromosome_length], path[(position + 1) % chromosome_length]]
+
+    for mutation in range(rows.shape[0]):
+        path = offspring[rows[mutation]]
+        start = starts[mutation]
+        end = ends[mutation]
+        delta = 0.0
+
+        if operators[mutation] == SWAP:
+            # the edges entering and leaving both genes, adjacent genes share an edge
+            positions = np.empty(4, dtype=np.int64)
+            positions[0] = (start - 1) % chromosome_length
+            positions[1] = start
+            positions[2] = (end - 1) % chromosome_length
+            positions[3] = end
+            for i in range(4):
+                duplicate = False
+                for j in range(i):
+                    if positions[j] == positions[i]:
+                        duplicate = True
+                if not duplicate:
+                    delta -= edge(path, positions[i])
+
+            gene = path[start]
+            path[start] = path[end]
+            path[end] = gene
+
+            for i in range(4):
+                duplicate = False
+                for j in range(i):
+                    if positions[j] == positions[i]:
+                        duplicate = True
+                if not duplicate:
+                    delta += edge(path, positions[i])
+
+        elif operators[mutation] == SCRAMBLE:
+            for position in range(start - 1, end):
+                delta -= edge(path, position)
+
+            # Fisher-Yates shuffle of the slice
+            for i in range(end - 1, start, -1):
+                j = start + int(uniforms[uniform_index] * (i - start + 1))
+                uniform_index += 1
+                gene = path[i]
+                path[i] = path[j]
+                path[j] = gene
+
+            for position in range(start - 1, end):
+                delta += edge(path, position)
+
+        else: # INVERSION
+            if 2 <= end - start < chromosome_length - 1:
+                delta -= edge(path, start - 1) + edge(path, end - 1)
+
+            i = start
+            j = end - 1
+            while i < j:
+                gene = path[i]
+                path[i] = path[j]
+                path[j] = gene
+                i += 1
+                j -= 1
+
+            if 2 <= end - start < chromosome_length - 1:
+                delta += edge(path, start - 1) + edge(path, end - 1)
+
+        distances[rows[mutation]] += delta
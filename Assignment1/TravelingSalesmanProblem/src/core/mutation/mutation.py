@@ -1,49 +1,111 @@
 from enum import Enum
-from typing import Dict, List
-import random
+from typing import Dict, Callable, Optional
 import numpy as np
 
-from core.mutation.mutation_algorithm import swap_mutation, inversion_mutation, scramble_mutation
-from core.evaluation.distance import calculate_total_distance
-from core.evaluation.fitness import calculate_fitness
-from core.models.population import Individual
+from core.mutation.mutation_algorithm import swap_mutation, inversion_mutation, scramble_mutation, \
+    draw_swap_points, draw_slices
+from core.mutation import kernels
+from core.evaluation.distance import calculate_total_distance_of_paths
 
 class MutationType(Enum):
     SWAP = 'swap'
     SCRAMBLE = 'scramble'
     INVERSION = 'inversion'
 
+# operator code of each mutation type, as understood by the compiled mutation kernel
+MUTATION_CODES: Dict[MutationType, int] = {
+    MutationType.SWAP: kernels.SWAP,
+    MutationType.SCRAMBLE: kernels.SCRAMBLE,
+    MutationType.INVERSION: kernels.INVERSION,
+}
+
 def apply_mutation(
-        offspring: List[Individual],
+        offspring: np.ndarray,
+        distances: np.ndarray,
         mutation_type: Dict[MutationType ,int],
         chance_of_mutation: int,
-        distance_matrix: np.ndarray
-    ) -> List[Individual]:
+        distance_matrix: np.ndarray,
+        debug: bool = False,
+        mutation_kernel: Optional[Callable] = None,
+        rng: Optional[np.random.Generator] = None,
+        applied: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
     """
     Apply mutation to the offspring
-    :param offspring: List[Individual] - the offspring to mutate
+    Which rows mutate, with which operator and at which positions is drawn for the whole batch at once.
+    Each selected row is mutated in place and its distance is updated with the length change
+    reported by the operator, instead of re-evaluating the whole tour
+    :param offspring: np.ndarray - (offspring, N) matrix of the paths to mutate
+    :param distances: np.ndarray - the current distance of each offspring, updated in place
     :param mutation_type: Dict[MutationType, int] - the mutation type and their probabilities
     :param chance_of_mutation: int - the chance of mutation
     :param distance_matrix: np.ndarray - the distance matrix
-    :return: List[Individual] - the mutated offspring
+    :param debug: bool - if set, cross-check every incremental update against a full re-evaluation
+    :param mutation_kernel: Callable - compiled kernel that applies every mutation, see core.backend
+    :param rng: np.random.Generator - the random number generator, a fresh one if not given
+    :param applied: np.ndarray - filled in place with the index in mutation_type of the operator
+        applied to every row, -1 for the rows that were not mutated
+    :return: np.ndarray - the mutated offspring
     """
+    if rng is None:
+        rng = np.random.default_rng()
 
     total = sum(mutation_type.values())
     mutation_probabilities = [value / total for value in mutation_type.values()]
+    mutation_codes = np.array([MUTATION_CODES[mutation] for mutation in mutation_type.keys()])
+
+    # same chance as random.randint(0, 100) < chance_of_mutation for every row
+    rows = np.flatnonzero(rng.integers(0, 101, size=len(offspring)) < chance_of_mutation)
+    if applied is not None:
+        applied[:] = -1
+    if rows.size == 0:
+        return offspring
+
+    operators = rng.choice(len(mutation_codes), size=len(rows), p=mutation_probabilities)
+    codes = mutation_codes[operators]
+    if applied is not None:
+        applied[rows] = operators
+
+    # for a swap, starts and ends hold the two positions to swap, otherwise the [start, end) slice
+    chromosome_length = offspring.shape[1]
+    starts = np.empty(len(rows), dtype=np.int64)
+    ends = np.empty(len(rows), dtype=np.int64)
+    is_swap = codes == kernels.SWAP
+    swap_points = draw_swap_points(int(is_swap.sum()), chromosome_length, rng)
+    starts[is_swap], ends[is_swap] = swap_points[:, 0], swap_points[:, 1]
+    starts[~is_swap], ends[~is_swap] = draw_slices(int((~is_swap).sum()), chromosome_length, rng)
 
-    for index, individual in enumerate(offspring):
+    # every scramble shuffles with one uniform per gene but the first, in row order,
+    # drawn the same way for both backends so a seed gives the same result on either
+    is_scramble = codes == kernels.SCRAMBLE
+    uniforms = rng.random(int(np.maximum(ends[is_scramble] - starts[is_scramble] - 1, 0).sum()))
 
-        if random.randint(0, 100) < chance_of_mutation:
-            mutation = np.random.choice(list(mutation_type.keys()), size=1, p=mutation_probabilities)[0]
+    if mutation_kernel is not None:
+        mutation_kernel(offspring, distances, rows, codes, starts, ends, uniforms, distance_matrix)
+    else:
+        uniform_index = 0
+        for row, code, start, end in zip(rows, codes, starts, ends):
+            path = offspring[row]
+            if code == kernels.SWAP:
+                delta = swap_mutation(path, distance_matrix, np.array([start, end]))
+            elif code == kernels.INVERSION:
+                delta = inversion_mutation(path, distance_matrix, start, end)
+            else:
+                shuffled = max(end - start - 1, 0)
+                delta = scramble_mutation(
+                    path,
+                    distance_matrix,
+                    start,
+                    end,
+                    uniforms=uniforms[uniform_index:uniform_index + shuffled]
+                )
+                uniform_index += shuffled
 
-            if mutation == MutationType.SWAP:
-                offspring[index] = swap_mutation(individual)
-            elif mutation == MutationType.INVERSION:
-                offspring[index] = inversion_mutation(individual)
-            elif mutation == MutationType.SCRAMBLE:
-                offspring[index] = scramble_mutation(individual)
+            distances[row] += delta
 
-        offspring[index].distance = calculate_total_distance(offspring[index].path, distance_matrix)
-        offspring[index].fitness = calculate_fitness(offspring[index].distance)
+    if debug:
+        full_distances = calculate_total_distance_of_paths(offspring[rows], distance_matrix)
+        assert np.allclose(distances[rows], full_distances), \
+            'Incremental mutation distances are out of sync with a full re-evaluation'
 
     return offspring
@@ -1,65 +1,174 @@
+from typing import Optional, Tuple
+
 import numpy as np
 
-from core.models.population import Individual
+
+def _edges_length(
+        path: np.ndarray,
+        positions: np.ndarray,
+        distance_matrix: np.ndarray,
+    ) -> np.float64:
+    """
+    Sum the length of the edges starting at the given positions of the tour
+    Edge k joins path[k] to path[k + 1], the last edge wraps back to the first city
+    :param path: np.ndarray - the tour
+    :param positions: np.ndarray - the unique start positions of the edges
+    :param distance_matrix: np.ndarray - the distance matrix
+    :return: np.float64 - the total length of those edges
+    """
+    chromosome_length = len(path)
+    return np.float64(distance_matrix[path[positions], path[(positions + 1) % chromosome_length]].sum())
+
+
+def draw_swap_points(
+        mutations: int,
+        chromosome_length: int,
+        rng: Optional[np.random.Generator] = None,
+    ) -> np.ndarray:
+    """
+    Draw two distinct positions for every swap mutation at once
+    :param mutations: int - the number of mutations
+    :param chromosome_length: int - the length of the chromosome
+    :param rng: np.random.Generator - the random number generator, a fresh one if not given
+    :return: np.ndarray - (mutations, 2) matrix of positions
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    first = rng.integers(0, chromosome_length, size=mutations)
+    second = rng.integers(0, chromosome_length - 1, size=mutations)
+    # skipping over the first position keeps every ordered pair equally likely
+    second += second >= first
+    return np.stack((first, second), axis=1)
+
+
+def draw_slices(
+        mutations: int,
+        chromosome_length: int,
+        rng: Optional[np.random.Generator] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Draw the [start, end) slice of every scramble or inversion mutation at once
+    :param mutations: int - the number of mutations
+    :param chromosome_length: int - the length of the chromosome
+    :param rng: np.random.Generator - the random number generator, a fresh one if not given
+    :return: Tuple[np.ndarray, np.ndarray] - the start and end of each slice
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    random_subset = rng.integers(0, chromosome_length, size=(mutations, 2))
+    return random_subset.min(axis=1), random_subset.max(axis=1)
 
 
 def swap_mutation(
-        individual: Individual,
-    ) -> Individual:
+        path: np.ndarray,
+        distance_matrix: np.ndarray,
+        mutation_points: Optional[np.ndarray] = None,
+        rng: Optional[np.random.Generator] = None,
+    ) -> np.float64:
     """
     Swap mutation
     This function randomly selects two genes in the individual and swaps their positions
+    At most four edges change, so the length change is computed from those alone
     O(1) time complexity
-    :param individual: List[int] - the individual to mutate
-    :return: List[int] - the mutated individual
+    :param path: np.ndarray - the path to mutate, mutated in place
+    :param distance_matrix: np.ndarray - the distance matrix
+    :param mutation_points: np.ndarray - the two positions to swap, drawn if not given
+    :param rng: np.random.Generator - draws the positions, a fresh one if not given
+    :return: np.float64 - the change in tour length caused by the mutation
     """
-    chromosome_length = len(individual.path)
-    mutation_points = np.random.choice(chromosome_length, 2, replace=False)
+    chromosome_length = len(path)
+    if mutation_points is None:
+        mutation_points = draw_swap_points(1, chromosome_length, rng)[0]
+
+    # the edges entering and leaving both genes, adjacent genes share an edge
+    positions = np.unique(np.concatenate((mutation_points - 1, mutation_points)) % chromosome_length)
+    before = _edges_length(path, positions, distance_matrix)
+
+    path[mutation_points[0]], path[mutation_points[1]] = \
+        path[mutation_points[1]], path[mutation_points[0]]
 
-    individual.path[mutation_points[0]], individual.path[mutation_points[1]] = \
-        individual.path[mutation_points[1]], individual.path[mutation_points[0]]
-    return individual
+    return _edges_length(path, positions, distance_matrix) - before
 
 
 def scramble_mutation(
-        individual: Individual,
-    ):
+        path: np.ndarray,
+        distance_matrix: np.ndarray,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        rng: Optional[np.random.Generator] = None,
+        uniforms: Optional[np.ndarray] = None,
+    ) -> np.float64:
     """
     Scramble mutation
     This function randomly selects a subset of genes in the individual and shuffles their positions
-    O(n) time complexity
-    :param individual: List[int] - the individual to mutate
-    :return: List[int] - the mutated individual
+    Only the k + 1 edges touching the shuffled subset change
+    The shuffle is the Fisher-Yates shuffle of core.mutation.kernels.mutate_kernel, driven by the same
+    uniforms, so both backends scramble a slice the same way
+    O(k) time complexity
+    :param path: np.ndarray - the path to mutate, mutated in place
+    :param distance_matrix: np.ndarray - the distance matrix
+    :param start: int - the start of the slice, drawn together with end if not given
+    :param end: int - the end of the slice, exclusive
+    :param rng: np.random.Generator - the random number generator, a fresh one if not given
+    :param uniforms: np.ndarray - end - start - 1 uniforms in [0, 1) driving the shuffle, drawn if not given
+    :return: np.float64 - the change in tour length caused by the mutation
     """
 
-    chromosome_length = len(individual.path)
-    random_subet = np.random.randint(0, chromosome_length, 2)
-    start, end = min(random_subet), max(random_subet)
+    chromosome_length = len(path)
+    if start is None or end is None:
+        starts, ends = draw_slices(1, chromosome_length, rng)
+        start, end = starts[0], ends[0]
 
-    subset = individual.path[start:end]
-    np.random.shuffle(subset)
-    individual.path[start:end] = subset
+    positions = np.unique(np.arange(start - 1, end) % chromosome_length)
+    before = _edges_length(path, positions, distance_matrix)
 
-    return individual
+    if uniforms is None:
+        if rng is None:
+            rng = np.random.default_rng()
+        uniforms = rng.random(max(end - start - 1, 0))
+
+    # Fisher-Yates shuffle of the slice, gene i swaps with a gene at or before it
+    for uniform, i in zip(uniforms, range(end - 1, start, -1)):
+        j = start + int(uniform * (i - start + 1))
+        path[i], path[j] = path[j], path[i]
+
+    return _edges_length(path, positions, distance_matrix) - before
 
 
 def inversion_mutation(
-        individual: Individual,
-    ):
+        path: np.ndarray,
+        distance_matrix: np.ndarray,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        rng: Optional[np.random.Generator] = None,
+    ) -> np.float64:
     """
     Inversion mutation
     This function randomly selects a subset of genes in the individual and reverses their order
-    O(n) time complexity
-    :param individual: List[int] - the individual to mutate
-    :return: List[int] - the mutated individual
+    On a symmetric instance only the two edges at the ends of the subset change,
+    the edges inside it are walked in the other direction with the same length
+    O(n) time complexity for the reversal, O(1) for the length change
+    :param path: np.ndarray - the path to mutate, mutated in place
+    :param distance_matrix: np.ndarray - the distance matrix, assumed symmetric
+    :param start: int - the start of the slice, drawn together with end if not given
+    :param end: int - the end of the slice, exclusive
+    :param rng: np.random.Generator - the random number generator, a fresh one if not given
+    :return: np.float64 - the change in tour length caused by the mutation
     """
 
-    chromosome_length = len(individual.path)
-    random_subet = np.random.randint(0, chromosome_length, 2)
-    start, end = min(random_subet), max(random_subet)
+    chromosome_length = len(path)
+    if start is None or end is None:
+        starts, ends = draw_slices(1, chromosome_length, rng)
+        start, end = starts[0], ends[0]
+
+    if end - start < 2 or end - start >= chromosome_length - 1:
+        # reversing a single gene, or the whole tour bar one city, gives the same tour length
+        path[start:end] = path[start:end][::-1]
+        return np.float64(0.0)
+
+    positions = np.array([start - 1, end - 1]) % chromosome_length
+    before = _edges_length(path, positions, distance_matrix)
 
-    subset = individual.path[start:end]
-    subset = subset[::-1]
-    individual.path[start:end] = subset
+    path[start:end] = path[start:end][::-1]
 
-    return individual
+    return _edges_length(path, positions, distance_matrix) - before
@@ -0,0 +1,118 @@
+from enum import Enum
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+"""
+Adaptive operator selection
+The crossover_type and mutation_type weights of a run are fixed for every generation.
+OperatorSelection moves them online instead: every offspring credits its operator with its
+relative improvement, max(0, (before - after) / before), where before is the better parent for a
+crossover and the tour before the change for a mutation. Each operator keeps a quality, the
+exponential moving average of the mean credit of its offspring per generation, and the weights
+of the next generation follow from the qualities:
+- probability_matching: every operator gets min_probability, the rest is shared in proportion to the qualities
+- bandit: every operator gets min_probability, the rest goes to the operator with the best upper
+  confidence bound (UCB1) of its quality, normalised by the best quality
+Every operator keeps min_probability, so an operator that pays off later in the search is still tried.
+"""
+
+ADAPTIVE_METHODS = ['probability_matching', 'bandit']
+
+class OperatorSelection:
+    def __init__(
+            self,
+            weights: Dict[Enum, float],
+            method: str = 'probability_matching',
+            adaptation_rate: float = 0.3,
+            min_probability: Optional[float] = None,
+            exploration: float = 0.5,
+        ):
+        """
+        :param weights: Dict[Enum, float] - the operators and their initial weights
+        :param method: str - 'probability_matching' or 'bandit'
+        :param adaptation_rate: float - weight of the newest credit in the moving average of the quality
+        :param min_probability: float - the probability every operator keeps, 0.2 / operators if not given
+        :param exploration: float - the weight of the confidence bound of the bandit
+        """
+        assert method in ADAPTIVE_METHODS, 'Invalid adaptive operator selection method'
+
+        self.operators = list(weights.keys())
+        self.method = method
+        self.adaptation_rate = adaptation_rate
+        self.min_probability = 0.2 / len(self.operators) if min_probability is None else min_probability
+        self.exploration = exploration
+
+        total = sum(weights.values())
+        self.probabilities = np.array([weight / total for weight in weights.values()], dtype=np.float64)
+        self.quality = np.zeros(len(self.operators), dtype=np.float64)
+
+        # totals over the run, for the statistics
+        self.uses = np.zeros(len(self.operators), dtype=np.int64)
+        self.improvements = np.zeros(len(self.operators), dtype=np.int64)
+        self.credit = np.zeros(len(self.operators), dtype=np.float64)
+        self.updates = 0
+
+    def weights(self) -> Dict[Enum, float]:
+        """
+        Get the weights of the next generation, in the format of crossover_type and mutation_type
+        """
+        return dict(zip(self.operators, self.probabilities))
+
+    def update(self, applied: np.ndarray, credit: np.ndarray):
+        """
+        Credit the operators with the offspring of one generation and move the weights
+        :param applied: np.ndarray - the operator index of every offspring, -1 if no operator was applied
+        :param credit: np.ndarray - the credit of every offspring
+        """
+        for operator in range(len(self.operators)):
+            rows = applied == operator
+            count = int(rows.sum())
+            if count == 0:
+                continue
+            self.uses[operator] += count
+            self.improvements[operator] += int((credit[rows] > 0).sum())
+            self.credit[operator] += credit[rows].sum()
+            self.quality[operator] += self.adaptation_rate * (credit[rows].mean() - self.quality[operator])
+
+        self.updates += 1
+        if self.quality.max() <= 0:
+            # no operator has improved anything yet, keep the current weights
+            return
+
+        adaptive_share = 1.0 - len(self.operators) * self.min_probability
+        if self.method == 'probability_matching':
+            self.probabilities = self.min_probability + adaptive_share * self.quality / self.quality.sum()
+        else:
+            bounds = self.quality / self.quality.max() + self.exploration * np.sqrt(
+                2 * np.log(max(self.uses.sum(), 1)) / np.maximum(self.uses, 1)
+            )
+            bounds[self.uses == 0] = np.inf
+            self.probabilities = np.full(len(self.operators), self.min_probability)
+            self.probabilities[np.argmax(bounds)] += adaptive_share
+
+    def statistics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the statistics of every operator
+        :return: Dict[str, Dict[str, Any]] - by operator name, the number of offspring it produced,
+            how many of them improved, their mean credit, the current quality and the current probability
+        """
+        return {
+            operator.name: {
+                'uses': int(self.uses[index]),
+                'improvements': int(self.improvements[index]),
+                'mean_credit': float(self.credit[index] / max(self.uses[index], 1)),
+                'quality': float(self.quality[index]),
+                'probability': float(self.probabilities[index]),
+            }
+            for index, operator in enumerate(self.operators)
+        }
+
+def improvement_credit(before: np.ndarray, after: np.ndarray) -> np.ndarray:
+    """
+    Get the relative improvement of every offspring, 0 when it got longer
+    :param before: np.ndarray - the reference distances
+    :param after: np.ndarray - the distances of the offspring
+    :return: np.ndarray
+    """
+    return np.maximum(before - after, 0.0) / np.maximum(before, np.finfo(np.float64).tiny)
@@ -0,0 +1,69 @@
+from enum import Enum
+from typing import Dict, Optional
+
+import numpy as np
+
+from core.models.population import PATH_DTYPE
+from core.seeding.seeding_algorithm import nearest_neighbour_tours, greedy_edge_tour, space_filling_curve_tour, \
+    christofides_tour
+
+class SeedingType(Enum):
+    NEAREST_NEIGHBOUR = 'nearest_neighbour'
+    GREEDY = 'greedy'
+    SPACE_FILLING_CURVE = 'space_filling_curve'
+    CHRISTOFIDES = 'christofides'
+
+# noise of the randomised copies of the greedy and Christofides tours, see core.seeding.seeding_algorithm
+SEEDING_NOISE = 0.1
+
+def generate_seed_paths(
+        seeding: Dict[SeedingType, int],
+        population_size: int,
+        distance_matrix: np.ndarray,
+        neighbours: np.ndarray,
+        cities: Optional[np.ndarray] = None,
+        rng: Optional[np.random.Generator] = None,
+    ) -> np.ndarray:
+    """
+    Build the seeded part of the initial population
+    Nearest-neighbour tours start from distinct random cities, space-filling curve tours rotate
+    the plane by a random angle. The first greedy and Christofides tours are the plain heuristic,
+    the others use randomised edge lengths
+    :param seeding: Dict[SeedingType, int] - the percentage of the population built by each heuristic,
+        the rest of the population is random
+    :param population_size: int - the size of the population
+    :param distance_matrix: np.ndarray - the distance matrix
+    :param neighbours: np.ndarray - (N, k) neighbour lists
+    :param cities: np.ndarray - (N, 2) coordinates, needed by the space-filling curve
+    :param rng: np.random.Generator - the random number generator, a fresh one if not given
+    :return: np.ndarray - (tours, N) seeded tours, possibly with duplicates
+    """
+    assert sum(seeding.values()) <= 100, 'Seeding values must add up to at most 100'
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    dimension = len(neighbours)
+    paths = [np.empty((0, dimension), dtype=PATH_DTYPE)]
+
+    for seeding_type, percentage in seeding.items():
+        tours = population_size * percentage // 100
+        if tours == 0:
+            continue
+
+        if seeding_type == SeedingType.NEAREST_NEIGHBOUR:
+            starts = rng.choice(dimension, size=tours, replace=tours > dimension)
+            paths.append(nearest_neighbour_tours(starts, distance_matrix, neighbours))
+        elif seeding_type == SeedingType.SPACE_FILLING_CURVE:
+            if cities is None:
+                raise ValueError("The space-filling curve seeding needs city coordinates")
+            rotations = np.concatenate([[0.0], rng.uniform(0, 2 * np.pi, tours - 1)])
+            paths.append(np.array([space_filling_curve_tour(cities, rotation) for rotation in rotations]))
+        else:
+            heuristic = greedy_edge_tour if seeding_type == SeedingType.GREEDY else christofides_tour
+            paths.append(np.array([
+                heuristic(distance_matrix, neighbours, noise=SEEDING_NOISE if tour else 0.0, rng=rng)
+                for tour in range(tours)
+            ]))
+
+    return np.concatenate(paths).astype(PATH_DTYPE)
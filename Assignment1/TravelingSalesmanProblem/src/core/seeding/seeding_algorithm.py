@@ -0,0 +1,348 @@
+from typing import List, Tuple, Optional
+
+import numpy as np
+
+from core.models.population import PATH_DTYPE
+
+"""
+Construction heuristics for the initial population
+Every heuristic works from the k-nearest-neighbour lists of core.evaluation.distance, so they need
+O(N * k) distances instead of the full matrix and also run on the implicit distance matrix.
+The randomised heuristics take a noise level, the candidate edge lengths are scaled by a random
+factor in [1, 1 + noise) so repeated calls give different tours of similar quality.
+"""
+
+# upper bound on the number of distances computed per block when a search leaves the neighbour lists
+_BLOCK_ELEMENTS = 1 << 22
+
+def _find(parent: List[int], city: int) -> int:
+    # root of the set of a city, with path halving
+    while parent[city] != city:
+        parent[city] = parent[parent[city]]
+        city = parent[city]
+    return city
+
+def candidate_edges(
+        distance_matrix: np.ndarray,
+        neighbours: np.ndarray,
+        noise: float = 0.0,
+        rng: Optional[np.random.Generator] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the undirected edges of the neighbour lists, from shortest to longest
+    :param distance_matrix: np.ndarray - the distance matrix
+    :param neighbours: np.ndarray - (N, k) neighbour lists
+    :param noise: float - the edge lengths are scaled by a random factor in [1, 1 + noise)
+    :param rng: np.random.Generator - draws the noise
+    :return: Tuple[np.ndarray, np.ndarray] - the two cities of every edge, in order of length
+    """
+    dimension, k = neighbours.shape
+    first = np.repeat(np.arange(dimension, dtype=np.int64), k)
+    second = neighbours.ravel().astype(np.int64)
+    # an edge found from both of its cities is kept once
+    keys = np.unique(np.minimum(first, second) * dimension + np.maximum(first, second))
+    first, second = np.divmod(keys, dimension)
+
+    lengths = np.asarray(distance_matrix[first, second], dtype=np.float64)
+    if noise > 0:
+        if rng is None:
+            rng = np.random.default_rng()
+        lengths = lengths * (1.0 + noise * rng.random(len(lengths)))
+
+    order = np.argsort(lengths, kind='stable')
+    return first[order], second[order]
+
+def nearest_neighbour_tours(
+        starts: np.ndarray,
+        distance_matrix: np.ndarray,
+        neighbours: np.ndarray,
+    ) -> np.ndarray:
+    """
+    Build a nearest-neighbour tour from each start city
+    The tours are built in lockstep, each step picks the first unvisited city of the neighbour
+    list of every tour at once. A tour whose neighbours are all visited scans the unvisited cities instead
+    :param starts: np.ndarray - the first city of every tour
+    :param distance_matrix: np.ndarray - the distance matrix
+    :param neighbours: np.ndarray - (N, k) neighbour lists, sorted from nearest to furthest
+    :return: np.ndarray - (len(starts), N) tours
+    """
+    tours = len(starts)
+    dimension = len(neighbours)
+    paths = np.empty((tours, dimension), dtype=PATH_DTYPE)
+    visited = np.zeros((tours, dimension), dtype=bool)
+    rows = np.arange(tours)
+
+    current = np.asarray(starts, dtype=np.int64)
+    paths[:, 0] = current
+    visited[rows, current] = True
+
+    for step in range(1, dimension):
+        candidates = neighbours[current]
+        free = ~visited[rows[:, np.newaxis], candidates]
+        first_free = free.argmax(axis=1)
+        found = free[rows, first_free]
+        following = candidates[rows, first_free].astype(np.int64)
+
+        for tour in np.flatnonzero(~found):
+            # the neighbourhood is exhausted, take the nearest of all unvisited cities
+            unvisited = np.flatnonzero(~visited[tour])
+            following[tour] = unvisited[np.argmin(distance_matrix[current[tour], unvisited])]
+
+        current = following
+        paths[:, step] = current
+        visited[rows, current] = True
+
+    return paths
+
+def _join_fragments(
+        fragments: List[np.ndarray],
+        distance_matrix: np.ndarray,
+        start: int = 0,
+    ) -> np.ndarray:
+    """
+    Chain path fragments into one tour, always moving to the nearest free fragment end
+    :param fragments: List[np.ndarray] - disjoint paths covering every city
+    :param distance_matrix: np.ndarray - the distance matrix
+    :param start: int - the fragment the tour starts with
+    :return: np.ndarray - the tour
+    """
+    heads = np.array([fragment[0] for fragment in fragments], dtype=np.int64)
+    tails = np.array([fragment[-1] for fragment in fragments], dtype=np.int64)
+    free = np.ones(len(fragments), dtype=bool)
+
+    tour = [fragments[start]]
+    free[start] = False
+    end = tails[start]
+
+    for _ in range(len(fragments) - 1):
+        remaining = np.flatnonzero(free)
+        to_heads = np.asarray(distance_matrix[end, heads[remaining]], dtype=np.float64)
+        to_tails = np.asarray(distance_matrix[end, tails[remaining]], dtype=np.float64)
+        nearest_head, nearest_tail = to_heads.argmin(), to_tails.argmin()
+
+        if to_heads[nearest_head] <= to_tails[nearest_tail]:
+            index = remaining[nearest_head]
+            tour.append(fragments[index])
+            end = tails[index]
+        else:
+            # entered at its tail, so the fragment is walked backwards
+            index = remaining[nearest_tail]
+            tour.append(fragments[index][::-1])
+            end = heads[index]
+        free[index] = False
+
+    return np.concatenate(tour).astype(PATH_DTYPE)
+
+def greedy_edge_tour(
+        distance_matrix: np.ndarray,
+        neighbours: np.ndarray,
+        noise: float = 0.0,
+        rng: Optional[np.random.Generator] = None,
+    ) -> np.ndarray:
+    """
+    Build a tour with the greedy edge heuristic
+    Candidate edges are added from shortest to longest unless they give a city a third edge
+    or close a cycle. Only neighbour list edges are tried, the fragments left are chained
+    by their nearest ends
+    :param distance_matrix: np.ndarray - the distance matrix
+    :param neighbours: np.ndarray - (N, k) neighbour lists
+    :param noise: float - randomises the order of the edges, see candidate_edges
+    :param rng: np.random.Generator - draws the noise
+    :return: np.ndarray - the tour
+    """
+    dimension = len(neighbours)
+    first, second = candidate_edges(distance_matrix, neighbours, noise, rng)
+
+    parent = list(range(dimension))
+    degree = [0] * dimension
+    links = [[] for _ in range(dimension)]
+    for a, b in zip(first.tolist(), second.tolist()):
+        if degree[a] == 2 or degree[b] == 2:
+            continue
+        root_a, root_b = _find(parent, a), _find(parent, b)
+        if root_a == root_b:
+            continue
+        parent[root_a] = root_b
+        degree[a] += 1
+        degree[b] += 1
+        links[a].append(b)
+        links[b].append(a)
+
+    # walk every fragment from one of its ends, a city without edges is a fragment of its own
+    fragments = []
+    walked = np.zeros(dimension, dtype=bool)
+    for city in range(dimension):
+        if degree[city] == 2 or walked[city]:
+            continue
+        fragment = [city]
+        walked[city] = True
+        previous, current = city, city
+        while True:
+            following = [c for c in links[current] if c != previous]
+            if not following or walked[following[0]]:
+                break
+            previous, current = current, following[0]
+            fragment.append(current)
+            walked[current] = True
+        fragments.append(np.array(fragment, dtype=np.int64))
+
+    return _join_fragments(fragments, distance_matrix)
+
+def hilbert_indices(x: np.ndarray, y: np.ndarray, order: int = 16) -> np.ndarray:
+    """
+    Get the position of every point along a Hilbert curve over their bounding box
+    :param x: np.ndarray - x coordinates
+    :param y: np.ndarray - y coordinates
+    :param order: int - the curve visits a 2^order x 2^order grid
+    :return: np.ndarray - the position of each point on the curve
+    """
+    side = 1 << order
+
+    def quantise(values: np.ndarray) -> np.ndarray:
+        low, extent = values.min(), np.ptp(values)
+        if extent == 0:
+            return np.zeros(len(values), dtype=np.int64)
+        return np.minimum(((values - low) / extent * side).astype(np.int64), side - 1)
+
+    x, y = quantise(x), quantise(y)
+    indices = np.zeros(len(x), dtype=np.int64)
+
+    step = side // 2
+    while step > 0:
+        right = (x & step) > 0
+        top = (y & step) > 0
+        indices += step * step * ((3 * right) ^ top)
+
+        # rotate the quadrant so the curve inside it starts at its entry corner
+        flip = ~top & right
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        swap = ~top
+        x, y = np.where(swap, y, x), np.where(swap, x, y)
+        step //= 2
+
+    return indices
+
+def space_filling_curve_tour(
+        cities: np.ndarray,
+        rotation: float = 0.0,
+    ) -> np.ndarray:
+    """
+    Visit the cities in the order of a Hilbert curve
+    :param cities: np.ndarray - (N, 2) coordinates
+    :param rotation: float - angle in radians the plane is rotated by first, each angle gives another curve
+    :return: np.ndarray - the tour
+    """
+    cosine, sine = np.cos(rotation), np.sin(rotation)
+    x = cities[:, 0] * cosine - cities[:, 1] * sine
+    y = cities[:, 0] * sine + cities[:, 1] * cosine
+    return np.argsort(hilbert_indices(x, y), kind='stable').astype(PATH_DTYPE)
+
+def _connect_components(
+        parent: List[int],
+        edges: List[Tuple[int, int]],
+        distance_matrix: np.ndarray,
+    ):
+    """
+    Connect the trees of a spanning forest by their shortest edges, updating parent and edges in place
+    Each round links the smallest tree to its nearest city outside of it
+    """
+    dimension = len(parent)
+    while True:
+        roots = np.array([_find(parent, city) for city in range(dimension)])
+        labels, sizes = np.unique(roots, return_counts=True)
+        if len(labels) == 1:
+            return
+
+        inside = np.flatnonzero(roots == labels[sizes.argmin()])
+        outside = np.flatnonzero(roots != labels[sizes.argmin()])
+        block_rows = max(1, _BLOCK_ELEMENTS // len(outside))
+
+        best = (np.inf, -1, -1)
+        for start in range(0, len(inside), block_rows):
+            block = inside[start:start + block_rows]
+            lengths = np.asarray(distance_matrix[block[:, np.newaxis], outside[np.newaxis, :]], dtype=np.float64)
+            row, column = np.unravel_index(lengths.argmin(), lengths.shape)
+            if lengths[row, column] < best[0]:
+                best = (lengths[row, column], int(block[row]), int(outside[column]))
+
+        _, a, b = best
+        parent[_find(parent, a)] = _find(parent, b)
+        edges.append((a, b))
+
+def christofides_tour(
+        distance_matrix: np.ndarray,
+        neighbours: np.ndarray,
+        noise: float = 0.0,
+        rng: Optional[np.random.Generator] = None,
+    ) -> np.ndarray:
+    """
+    Build a tour with a light version of the Christofides heuristic
+    1. Minimum spanning tree over the neighbour list edges (Kruskal), trees left apart are linked
+       by their shortest edges
+    2. Greedy matching of the odd-degree cities instead of a minimum perfect matching
+    3. Euler circuit of the tree and the matching, shortcut to the first visit of every city
+    :param distance_matrix: np.ndarray - the distance matrix
+    :param neighbours: np.ndarray - (N, k) neighbour lists
+    :param noise: float - randomises the order of the edges, see candidate_edges
+    :param rng: np.random.Generator - draws the noise and the start of the circuit
+    :return: np.ndarray - the tour
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    dimension = len(neighbours)
+    first, second = candidate_edges(distance_matrix, neighbours, noise, rng)
+
+    # 1. spanning tree
+    parent = list(range(dimension))
+    edges: List[Tuple[int, int]] = []
+    for a, b in zip(first.tolist(), second.tolist()):
+        root_a, root_b = _find(parent, a), _find(parent, b)
+        if root_a != root_b:
+            parent[root_a] = root_b
+            edges.append((a, b))
+    if len(edges) < dimension - 1:
+        _connect_components(parent, edges, distance_matrix)
+
+    # 2. greedy matching, on the neighbour list edges first, then between the cities left
+    degree = np.zeros(dimension, dtype=np.int64)
+    np.add.at(degree, np.array(edges, dtype=np.int64).ravel(), 1)
+    unmatched = degree % 2 == 1
+    for a, b in zip(first.tolist(), second.tolist()):
+        if unmatched[a] and unmatched[b]:
+            unmatched[a] = unmatched[b] = False
+            edges.append((a, b))
+
+    left = np.flatnonzero(unmatched)
+    while len(left):
+        lengths = np.asarray(distance_matrix[left[0], left[1:]], dtype=np.float64)
+        partner = 1 + lengths.argmin()
+        edges.append((int(left[0]), int(left[partner])))
+        left = np.delete(left, [0, partner])
+
+    # 3. Euler circuit (Hierholzer), every city now has an even degree
+    adjacency = [[] for _ in range(dimension)]
+    for index, (a, b) in enumerate(edges):
+        adjacency[a].append((b, index))
+        adjacency[b].append((a, index))
+    used = bytearray(len(edges))
+    pointer = [0] * dimension
+
+    stack = [int(rng.integers(dimension))]
+    circuit = []
+    while stack:
+        city = stack[-1]
+        while pointer[city] < len(adjacency[city]) and used[adjacency[city][pointer[city]][1]]:
+            pointer[city] += 1
+        if pointer[city] == len(adjacency[city]):
+            circuit.append(stack.pop())
+        else:
+            following, index = adjacency[city][pointer[city]]
+            used[index] = 1
+            stack.append(following)
+
+    # keep the first visit of every city
+    circuit = np.array(circuit, dtype=np.int64)
+    _, first_visits = np.unique(circuit, return_index=True)
+    return circuit[np.sort(first_visits)].astype(PATH_DTYPE)
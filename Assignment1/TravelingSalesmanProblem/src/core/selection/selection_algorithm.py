@@ -1,7 +1,8 @@
-from typing import List
+from typing import Optional
+
 import numpy as np
 
-from core.models.population import Population, Individual
+from core.models.population import Population
 
 """
 source: https://www.tutorialspoint.com/genetic_algorithms/genetic_algorithms_parent_selection.htm
@@ -10,45 +11,100 @@ source: https://www.tutorialspoint.com/genetic_algorithms/genetic_algorithms_par
 def roulette_wheel_selection(
         population: Population,
         selects: int = 2,
-    ) -> List[int]:
+        rng: Optional[np.random.Generator] = None,
+    ) -> np.ndarray:
     """
     Roulette wheel selection
     This function creates a roulette wheel based on the fitness of the population
     Individuals with higher fitness have a higher chance of being selected
-    :param population_fitness: List[np.float64] - the fitness of each individual in the population
-    :return: Tuple[int, int] - the indices of the selected individuals
+    :param population: Population - the population to select from
+    :param selects: int - the number of individuals to select
+    :param rng: np.random.Generator - the random number generator, a fresh one if not given
+    :return: np.ndarray - the indices of the selected individuals
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    selection_probabilities = population.fitness / np.sum(population.fitness)
+    return rng.choice(len(population), size=selects, p=selection_probabilities)
+
+def stochastic_universal_sampling(
+        population: Population,
+        selects: int = 2,
+        rng: Optional[np.random.Generator] = None,
+    ) -> np.ndarray:
+    """
+    Stochastic universal sampling
+    A roulette wheel with `selects` evenly spaced pointers that is spun once,
+    each individual is selected close to its expected number of times,
+    without the spread of spinning the wheel `selects` times
+    :param population: Population - the population to select from
+    :param selects: int - the number of individuals to select
+    :param rng: np.random.Generator - the random number generator, a fresh one if not given
+    :return: np.ndarray - the indices of the selected individuals, in wheel order
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    cumulative_fitness = np.cumsum(population.fitness)
+    step = cumulative_fitness[-1] / selects
+    pointers = rng.uniform(0, step) + step * np.arange(selects)
+
+    selected_indices = np.searchsorted(cumulative_fitness, pointers, side='right')
+    return np.minimum(selected_indices, len(population) - 1)
+
+def draw_tournaments(
+        population_size: int,
+        selects: int,
+        tournament_size: int,
+        rng: Optional[np.random.Generator] = None,
+    ) -> np.ndarray:
+    """
+    Draw every tournament at once
+    Each row holds `tournament_size` distinct indices, rows that drew a repeated index
+    are drawn again, which keeps every tournament a uniform sample without replacement
+    :param population_size: int - the number of individuals to draw from
+    :param selects: int - the number of tournaments
+    :param tournament_size: int - the size of each tournament
+    :param rng: np.random.Generator - the random number generator, a fresh one if not given
+    :return: np.ndarray - (selects, tournament_size) matrix of indices
     """
+    if rng is None:
+        rng = np.random.default_rng()
+    if tournament_size > population_size:
+        raise ValueError('Tournament size cannot be larger than the population')
 
-    population_fitness = [individual.fitness for individual in population.individuals]
-    total_fitness = np.sum(population_fitness)
-    selection_probabilities = [fitness / total_fitness for fitness in population_fitness]
-    selected_indices = np.random.choice(len(population_fitness), size=selects, p=selection_probabilities)
+    if 2 * tournament_size > population_size:
+        # repeats would be too frequent for redrawing, rank random keys instead
+        random_keys = rng.random((selects, population_size))
+        return np.argsort(random_keys, axis=1)[:, :tournament_size]
 
-    selected_individuals = [population.individuals[i] for i in selected_indices]
-    return selected_individuals
+    tournaments = rng.integers(0, population_size, size=(selects, tournament_size))
+    while True:
+        ordered = np.sort(tournaments, axis=1)
+        repeated = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+        if not repeated.any():
+            return tournaments
+        tournaments[repeated] = rng.integers(0, population_size, size=(repeated.sum(), tournament_size))
 
 def tournament_selection(
         population: Population,
         selects: int = 2,
         tournament_size: int = 2,
-    ) -> List[Individual]:
+        rng: Optional[np.random.Generator] = None,
+    ) -> np.ndarray:
     """
     Tournament selection
     This function selects the best individual from a random subset of the population
-    :param population_fitness: List[np.float64] - the fitness of each individual in the population
+    All tournaments are drawn as one (selects, tournament_size) index matrix
+    and reduced with an argmax over the fitness vector
+    :param population: Population - the population to select from
     :param selects: int - the number of individuals to select
     :param tournament_size: int - the size of the tournament
-    :param seed: int - random seed
-    :return: List[int] - the list of the selected individuals
+    :param rng: np.random.Generator - the random number generator, a fresh one if not given
+    :return: np.ndarray - the indices of the selected individuals
     """
 
-    selected_individuals_index: List[np.int64] = []
-
-    for _ in range(selects):
-        tournament_indices = np.random.choice(len(population.individuals), size=tournament_size, replace=False)
-        tournament_fitness = [population.individuals[i].fitness for i in tournament_indices]
-        best_index = tournament_indices[np.argmax(tournament_fitness)]
-        selected_individuals_index.append(best_index)
-
-    selected_individuals = [population.individuals[i] for i in selected_individuals_index]
-    return selected_individuals
+    tournaments = draw_tournaments(len(population), selects, tournament_size, rng)
+    winners = np.argmax(population.fitness[tournaments], axis=1)
+    return tournaments[np.arange(selects), winners]
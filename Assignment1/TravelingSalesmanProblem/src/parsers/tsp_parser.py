@@ -1,59 +1,210 @@
 import os
 import logging
-from typing import List, Dict, Any, Tuple
+import itertools
+from typing import Dict, Any, Optional, TextIO
 
 import numpy as np
 
 logging.basicConfig(level=logging.INFO, format='%(name)s - %(message)s')
 logger = logging.getLogger("TSP Parser")
 
+# number of lines handed to numpy per block, bounds the temporary memory on large instances
+_CHUNK_LINES = 1 << 16
+
+"""
+Steps to read tsp file format (TSPLIB)
+1. Read the specification lines `KEYWORD : VALUE` until the first section keyword,
+   the keywords can come in any order. Only symmetric problems (TYPE : TSP) are supported,
+   the operators and the local search assume d(a, b) == d(b, a)
+2. DIMENSION gives the number of cities
+3. NODE_COORD_SECTION (or DISPLAY_DATA_SECTION) holds `index x y` for every city,
+   the lines are parsed in blocks straight into an (N, 2) array
+4. EDGE_WEIGHT_SECTION holds an explicit distance matrix in the layout given by EDGE_WEIGHT_FORMAT,
+   the numbers are parsed line by line into a flat array until the layout is full, so the following
+   section is read as usual, and scattered into the (N, N) matrix
+5. Stop at EOF
+"""
+
+COORDINATE_SECTIONS = ['NODE_COORD_SECTION', 'DISPLAY_DATA_SECTION']
+
+# number of values in the EDGE_WEIGHT_SECTION of each format, for N cities
+EDGE_WEIGHT_FORMATS = {
+    'FULL_MATRIX': lambda n: n * n,
+    'UPPER_ROW': lambda n: n * (n - 1) // 2,
+    'LOWER_ROW': lambda n: n * (n - 1) // 2,
+    'UPPER_COL': lambda n: n * (n - 1) // 2,
+    'LOWER_COL': lambda n: n * (n - 1) // 2,
+    'UPPER_DIAG_ROW': lambda n: n * (n + 1) // 2,
+    'LOWER_DIAG_ROW': lambda n: n * (n + 1) // 2,
+    'UPPER_DIAG_COL': lambda n: n * (n + 1) // 2,
+    'LOWER_DIAG_COL': lambda n: n * (n + 1) // 2,
+}
+
+def _read_coordinates(f: TextIO, dimensions: int) -> np.ndarray:
+    """
+    Read the `index x y` lines of a coordinate section
+    :param f: TextIO - the file, positioned after the section keyword
+    :param dimensions: int - the number of cities
+    :return: np.ndarray - (dimensions, 2) coordinates, row i holds the city with index i + 1
+    """
+    cities = np.empty((dimensions, 2), dtype=np.float64)
+    seen = np.zeros(dimensions, dtype=bool)
+
+    read = 0
+    while read < dimensions:
+        lines = list(itertools.islice(f, min(_CHUNK_LINES, dimensions - read)))
+        if not lines:
+            break
+        block = np.loadtxt(lines, dtype=np.float64, ndmin=2)
+        indices = block[:, 0].astype(np.int64) - 1
+        if indices.min() < 0 or indices.max() >= dimensions:
+            raise ValueError("City index out of range")
+        cities[indices] = block[:, 1:3]
+        seen[indices] = True
+        # blank lines hold no city, so only the parsed rows count
+        read += len(block)
+
+    assert seen.all(), "Number of cities does not match dimensions"
+    return cities
+
+def _is_number(token: str) -> bool:
+    try:
+        float(token)
+    except ValueError:
+        return False
+    return True
+
+def _read_edge_weights(f: TextIO, dimensions: int, edge_weight_format: str) -> np.ndarray:
+    """
+    Read an explicit distance matrix
+    :param f: TextIO - the file, positioned after the section keyword
+    :param dimensions: int - the number of cities
+    :param edge_weight_format: str - the TSPLIB layout of the values
+    :return: np.ndarray - the symmetric (dimensions, dimensions) distance matrix,
+        a FULL_MATRIX that is not symmetric raises ValueError
+    """
+    if edge_weight_format not in EDGE_WEIGHT_FORMATS:
+        raise ValueError(f"Unsupported edge weight format {edge_weight_format}")
+
+    count = EDGE_WEIGHT_FORMATS[edge_weight_format](dimensions)
+    values = np.empty(count, dtype=np.float64)
+
+    # the values run over lines freely, so they are read line by line until count values are in,
+    # which leaves the file at the next keyword for load_tsp_file
+    read = 0
+    for line in f:
+        tokens = line.split()
+        if not tokens:
+            continue
+        if not _is_number(tokens[0]):
+            # the next keyword came before all the values, the section is short
+            break
+        if read + len(tokens) > count:
+            raise ValueError("Number of edge weights does not match dimensions")
+        values[read:read + len(tokens)] = np.array(tokens, dtype=np.float64)
+        read += len(tokens)
+        if read == count:
+            break
+
+    assert read == count, "Number of edge weights does not match dimensions"
+
+    if edge_weight_format == 'FULL_MATRIX':
+        edge_weights = values.reshape(dimensions, dimensions)
+        if not np.array_equal(edge_weights, edge_weights.T):
+            raise ValueError("Asymmetric edge weights are not supported")
+        return edge_weights
+
+    # on a symmetric matrix, the column formats list the values in the order of the opposite row format
+    rows_format = {
+        'UPPER_COL': 'LOWER_ROW',
+        'LOWER_COL': 'UPPER_ROW',
+        'UPPER_DIAG_COL': 'LOWER_DIAG_ROW',
+        'LOWER_DIAG_COL': 'UPPER_DIAG_ROW',
+    }.get(edge_weight_format, edge_weight_format)
+
+    diagonal = 0 if 'DIAG' in rows_format else 1
+    if rows_format.startswith('UPPER'):
+        rows, columns = np.triu_indices(dimensions, diagonal)
+    else:
+        rows, columns = np.tril_indices(dimensions, -diagonal)
+
+    edge_weights = np.zeros((dimensions, dimensions), dtype=np.float64)
+    edge_weights[rows, columns] = values
+    edge_weights[columns, rows] = values
+    return edge_weights
 
 def load_tsp_file(file_path: str) -> Dict[str, Any]:
     """
     Load a TSP file
     :param file_path: str
-    :return: Dict[str, Any], containing the problem name, dimensions and cities
+    :return: Dict[str, Any], containing the problem name, dimensions, the (N, 2) array of cities
+        (None if the file has no coordinates), the edge weight type and format,
+        and the explicit (N, N) edge weights (None unless EDGE_WEIGHT_TYPE is EXPLICIT)
     """
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File {file_path} not found")
 
+    if os.path.getsize(file_path) == 0:
+        raise ValueError("No data in file")
+
+    specification: Dict[str, str] = {}
+    cities: Optional[np.ndarray] = None
+    edge_weights: Optional[np.ndarray] = None
+
     with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
 
-    if not lines:
-        raise ValueError("No data in file")
+            keyword, _, value = line.partition(':')
+            keyword = keyword.strip().upper()
 
-    """
-    Steps to read tsp file format
-    1. Read the first line to get the problem name
-    2. Can ignore line 2 and 3
-    3. Dimensions on line 4 can be used to determine the number of cities
-    4. Line 5 can be skipped (for now I think)
-    5. Ensure this is "NODE_COORD_SECTION"
-    6. Read the coordinates of each city until "EOF" is reached
-    """
+            if keyword == 'EOF':
+                break
 
-    problem_name = lines[0].strip().split(":")[1].strip()
-    logger.info('Detected problem name: %s', problem_name)
+            if keyword in COORDINATE_SECTIONS or keyword == 'EDGE_WEIGHT_SECTION':
+                if 'DIMENSION' not in specification:
+                    raise ValueError("DIMENSION must come before the data sections")
+                problem_type = specification.get('TYPE', 'TSP').upper()
+                if problem_type != 'TSP':
+                    raise ValueError(f"Unsupported problem type {problem_type}, only symmetric TSP is supported")
+                dimensions = int(specification['DIMENSION'])
 
-    dimensions = int(lines[3].strip().split(':')[1])
-    logger.info('Detected dimensions: %d', dimensions)
+                if keyword == 'EDGE_WEIGHT_SECTION':
+                    edge_weights = _read_edge_weights(
+                        f,
+                        dimensions,
+                        specification.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX')
+                    )
+                else:
+                    section_cities = _read_coordinates(f, dimensions)
+                    # node coordinates take precedence over display data
+                    if keyword == 'NODE_COORD_SECTION' or cities is None:
+                        cities = section_cities
+                continue
 
-    cities: List[Tuple[np.float64, np.float64]] = []
+            if keyword.endswith('_SECTION'):
+                raise ValueError(f"Unsupported section {keyword}")
 
-    for line in lines[6: ]:
-        if 'EOF' in line:
-            break
+            specification[keyword] = value.strip()
+
+    if 'DIMENSION' not in specification:
+        raise ValueError("No DIMENSION in file")
+    if cities is None and edge_weights is None:
+        raise ValueError("No city coordinates or edge weights in file")
 
-        # Read the coordinates of each city
-        # Each line has index, x, y, We can ignore the index
-        _, x, y = line.strip().split(' ')
-        cities.append((np.float64(x), np.float64(y)))
+    problem_name = specification.get('NAME', os.path.splitext(os.path.basename(file_path))[0])
+    logger.info('Detected problem name: %s', problem_name)
 
-    assert len(cities) == dimensions, "Number of cities does not match dimensions"
+    dimensions = int(specification['DIMENSION'])
+    logger.info('Detected dimensions: %d', dimensions)
 
     return {
         'name': problem_name,
         'dimensions': dimensions,
-        'cities': cities
+        'cities': cities,
+        'edge_weight_type': specification.get('EDGE_WEIGHT_TYPE', 'EUC_2D').upper(),
+        'edge_weight_format': specification.get('EDGE_WEIGHT_FORMAT'),
+        'edge_weights': edge_weights,
     }
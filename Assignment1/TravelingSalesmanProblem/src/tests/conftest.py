@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the modules import each other from src, as when the experiments are run from there
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
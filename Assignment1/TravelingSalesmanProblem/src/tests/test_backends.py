@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from core.genetic_algorithm import run
+from core.mutation.mutation import MutationType
+
+pytest.importorskip('numba')
+
+BERLIN52 = os.path.join(os.path.dirname(__file__), '..', '..', 'tsp', 'berlin52.tsp')
+
+@pytest.mark.parametrize('mutation_type', [
+    {MutationType.SWAP: 50, MutationType.SCRAMBLE: 25, MutationType.INVERSION: 25},
+    {MutationType.SCRAMBLE: 100},
+])
+def test_seeded_run_is_the_same_on_both_backends(mutation_type):
+    options = {
+        'population_size': 40,
+        'generations': 60,
+        'chance_of_mutation': 30,
+        'mutation_type': mutation_type,
+        'file_path': BERLIN52,
+        'seed': 1,
+    }
+
+    numpy_result = run(backend='numpy', **options)
+    numba_result = run(backend='numba', **options)
+
+    assert numpy_result['best_individual']['distance'] == numba_result['best_individual']['distance']
+    assert numpy_result['best_individual']['path'] == numba_result['best_individual']['path']
@@ -0,0 +1,36 @@
+import numpy as np
+
+from core.crossover.edge_crossover import _merge_subtours, _links_to_path, batch_edge_assembly_crossover
+from core.evaluation.distance import generate_neighbour_lists
+
+def _distance_matrix(rng: np.random.Generator, cities: int) -> np.ndarray:
+    coordinates = rng.uniform(0, 100, size=(cities, 2))
+    return np.linalg.norm(coordinates[:, np.newaxis] - coordinates[np.newaxis, :], axis=2)
+
+def test_many_subtours_are_merged_into_one_tour():
+    rng = np.random.default_rng(0)
+    distance_matrix = _distance_matrix(rng, 60)
+    # twenty triangles of random cities
+    links = np.empty((60, 2), dtype=np.int64)
+    for triangle in rng.permutation(60).reshape(20, 3):
+        links[triangle, 0] = np.roll(triangle, 1)
+        links[triangle, 1] = np.roll(triangle, -1)
+
+    _merge_subtours(links, distance_matrix, generate_neighbour_lists(distance_matrix, 5))
+
+    path = _links_to_path(links, 0)
+    assert sorted(path.tolist()) == list(range(60))
+    # every link is an edge of the tour
+    assert all(sorted(links[city].tolist()) == sorted([path[index - 1], path[(index + 1) % 60]])
+               for index, city in enumerate(path))
+
+def test_children_are_tours():
+    rng = np.random.default_rng(1)
+    distance_matrix = _distance_matrix(rng, 80)
+    parents1 = np.stack([rng.permutation(80) for _ in range(6)])
+    parents2 = np.stack([rng.permutation(80) for _ in range(6)])
+
+    children1, children2 = batch_edge_assembly_crossover(parents1, parents2, distance_matrix, rng=rng)
+
+    for child in np.concatenate([children1, children2]):
+        assert sorted(child.tolist()) == list(range(80))
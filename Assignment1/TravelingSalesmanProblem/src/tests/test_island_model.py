@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from core.island_model import Island, migrate
+from core.models.population import Population
+
+def _island(index: int, rng: np.random.Generator, population_size: int = 6, dimensions: int = 8) -> Island:
+    paths = np.stack([rng.permutation(dimensions) for _ in range(population_size)])
+    distances = rng.uniform(100, 200, size=population_size)
+    population = Population.from_paths(paths, distances, 1 / distances)
+    population.sort()
+    return Island(index=index, rng=rng, population=population)
+
+@pytest.mark.parametrize('migrants', [1, 2, 4])
+def test_migration_never_replaces_the_elites(migrants):
+    rng = np.random.default_rng(0)
+    elites_size = 3
+    islands = [_island(index, rng) for index in range(5)]
+    elites = [set(island.population.hashes[:elites_size].tolist()) for island in islands]
+    before = [set(island.population.hashes.tolist()) for island in islands]
+
+    migrate(islands, migrants, elites_size, 'fully_connected', rng)
+
+    for island, island_elites, island_before in zip(islands, elites, before):
+        after = set(island.population.hashes.tolist())
+        assert island_elites <= after
+        # the rows below the elites took in migrants
+        assert after - island_before
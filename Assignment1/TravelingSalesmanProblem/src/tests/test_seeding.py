@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from core.genetic_algorithm import run
+from core.island_model import run_islands
+from core.crossover.crossover import CrossoverType
+from core.seeding.seeding import SeedingType
+from utils.common import normalise_enum_keys
+
+BERLIN52 = os.path.join(os.path.dirname(__file__), '..', '..', 'tsp', 'berlin52.tsp')
+
+def test_enum_keys_are_normalised_by_name_or_value():
+    assert normalise_enum_keys(None, SeedingType) is None
+    assert normalise_enum_keys({'NEAREST_NEIGHBOUR': 10, 'greedy': 5, SeedingType.GREEDY: 5}, SeedingType) == {
+        SeedingType.NEAREST_NEIGHBOUR: 10,
+        SeedingType.GREEDY: 10,
+    }
+    assert normalise_enum_keys({'space_filling_curve': 5}, SeedingType) == {SeedingType.SPACE_FILLING_CURVE: 5}
+    assert normalise_enum_keys({'PMX': 50, 'ox': 50}, CrossoverType) == {CrossoverType.PMX: 50, CrossoverType.OX: 50}
+
+def test_unknown_enum_key_names_the_enum():
+    with pytest.raises(ValueError, match='Unknown crossover type XO'):
+        normalise_enum_keys({'XO': 100}, CrossoverType)
+
+def test_seeding_given_by_name_runs():
+    by_name = run(population_size=20, generations=2, file_path=BERLIN52, seed=1, seeding={'NEAREST_NEIGHBOUR': 10})
+    by_type = run(population_size=20, generations=2, file_path=BERLIN52, seed=1, seeding={SeedingType.NEAREST_NEIGHBOUR: 10})
+    assert by_name['best_individual'] == by_type['best_individual']
+
+@pytest.mark.parametrize('run_ga', [run, run_islands])
+def test_unknown_seeding_type_is_rejected_before_the_run(run_ga):
+    with pytest.raises(ValueError, match='Unknown seeding type'):
+        run_ga(file_path=BERLIN52, seeding={'NEAREST': 10})
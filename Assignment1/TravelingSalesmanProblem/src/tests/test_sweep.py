@@ -0,0 +1,28 @@
+import os
+
+from utils.sweep import sweep, load_results
+
+BERLIN52 = os.path.join(os.path.dirname(__file__), '..', '..', 'tsp', 'berlin52.tsp')
+
+GRID = {'chance_of_crossover': [50, 90]}
+OPTIONS = {'population_size': 10, 'generations': 2, 'file_path': BERLIN52}
+
+def test_resume_only_reuses_runs_of_the_same_options_and_seed(tmp_path, capsys):
+    results_file = str(tmp_path / 'sweep.jsonl')
+
+    first = sweep(GRID, repeats=2, options=OPTIONS, seed=0, workers=1, results_file=results_file)
+    assert len(load_results(results_file)) == 4
+
+    resumed = sweep(GRID, repeats=2, options=OPTIONS, seed=0, workers=1, results_file=results_file)
+    assert resumed == first
+    assert len(load_results(results_file)) == 4
+
+    capsys.readouterr()
+    sweep(GRID, repeats=2, options={**OPTIONS, 'generations': 3}, seed=0, workers=1, results_file=results_file)
+    assert 'Ignoring 4 runs' in capsys.readouterr().out
+    assert len(load_results(results_file)) == 8
+
+    capsys.readouterr()
+    sweep(GRID, repeats=2, options=OPTIONS, seed=1, workers=1, results_file=results_file)
+    assert 'Ignoring 8 runs' in capsys.readouterr().out
+    assert len(load_results(results_file)) == 12
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from parsers.tsp_parser import load_tsp_file
+
+UPPER_ROW_WITH_DISPLAY_DATA = """NAME : explicit4
+TYPE : TSP
+DIMENSION : 4
+EDGE_WEIGHT_TYPE : EXPLICIT
+EDGE_WEIGHT_FORMAT : UPPER_ROW
+DISPLAY_DATA_TYPE : TWOD_DISPLAY
+EDGE_WEIGHT_SECTION
+ 1 2
+ 3
+ 4 5
+ 6
+DISPLAY_DATA_SECTION
+1 0.0 0.0
+2 1.0 0.0
+3 1.0 1.0
+4 0.0 1.0
+EOF
+"""
+
+def _write(tmp_path, content: str) -> str:
+    path = tmp_path / 'problem.tsp'
+    path.write_text(content)
+    return str(path)
+
+def test_section_after_edge_weights_is_read(tmp_path):
+    problem = load_tsp_file(_write(tmp_path, UPPER_ROW_WITH_DISPLAY_DATA))
+
+    expected = np.array([
+        [0, 1, 2, 3],
+        [1, 0, 4, 5],
+        [2, 4, 0, 6],
+        [3, 5, 6, 0],
+    ], dtype=np.float64)
+    np.testing.assert_array_equal(problem['edge_weights'], expected)
+    assert problem['cities'] is not None
+    np.testing.assert_array_equal(problem['cities'][2], [1.0, 1.0])
+
+def test_short_edge_weight_section_stops_at_next_keyword(tmp_path):
+    content = UPPER_ROW_WITH_DISPLAY_DATA.replace(' 4 5\n 6\n', ' 4 5\n')
+    with pytest.raises(AssertionError, match='Number of edge weights'):
+        load_tsp_file(_write(tmp_path, content))
+
+def test_long_edge_weight_section_is_rejected(tmp_path):
+    content = UPPER_ROW_WITH_DISPLAY_DATA.replace(' 6\n', ' 6 7\n')
+    with pytest.raises(ValueError, match='Number of edge weights'):
+        load_tsp_file(_write(tmp_path, content))
+
+FULL_MATRIX = """NAME : full3
+TYPE : {problem_type}
+DIMENSION : 3
+EDGE_WEIGHT_TYPE : EXPLICIT
+EDGE_WEIGHT_FORMAT : FULL_MATRIX
+EDGE_WEIGHT_SECTION
+ 0 1 2
+ {d10} 0 3
+ 2 3 0
+EOF
+"""
+
+def test_symmetric_full_matrix_is_read(tmp_path):
+    problem = load_tsp_file(_write(tmp_path, FULL_MATRIX.format(problem_type='TSP', d10=1)))
+    np.testing.assert_array_equal(problem['edge_weights'], [[0, 1, 2], [1, 0, 3], [2, 3, 0]])
+
+def test_asymmetric_full_matrix_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match='Asymmetric'):
+        load_tsp_file(_write(tmp_path, FULL_MATRIX.format(problem_type='TSP', d10=5)))
+
+def test_atsp_type_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match='Unsupported problem type ATSP'):
+        load_tsp_file(_write(tmp_path, FULL_MATRIX.format(problem_type='ATSP', d10=5)))
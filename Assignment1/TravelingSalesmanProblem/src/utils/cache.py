@@ -0,0 +1,141 @@
+import os
+import hashlib
+import logging
+import tempfile
+from typing import Callable, List, Tuple, Optional
+
+import numpy as np
+
+logger = logging.getLogger("Cache")
+
+"""
+On-disk cache of the arrays derived from a TSP instance (distance matrix, neighbour lists)
+Every array is a .npy file named after a content hash of the instance file and the metric,
+so an edited instance never reuses a stale matrix. Cached arrays are memory-mapped read-only,
+the pages are shared by every process that maps the same file.
+Each hit touches the file, and once the directory grows past its size limit the files
+used least recently are deleted first.
+"""
+
+# bytes of the instance file hashed per read
+_HASH_BLOCK = 1 << 20
+
+def file_hash(file_path: str) -> str:
+    """
+    Hash the content of a file
+    :param file_path: str
+    :return: str - the sha256 hex digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ArrayCache:
+    def __init__(self, cache_dir: str, max_bytes: int = 1 << 31):
+        """
+        :param cache_dir: str - the cache directory, created if missing
+        :param max_bytes: int - the size the directory is trimmed to after every new array
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def instance_key(self, file_path: str, metric: str) -> str:
+        """
+        Get the key of the arrays derived from an instance file with a metric
+        """
+        return f'{file_hash(file_path)[:32]}-{metric}'
+
+    def path(self, key: str, name: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}-{name}.npy')
+
+    def get(self, key: str, name: str, build: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Get a cached array, building and storing it on a miss
+        :param key: str - the instance key, see instance_key
+        :param name: str - the name of the array, e.g. 'distance_matrix'
+        :param build: Callable[[], np.ndarray] - computes the array on a miss
+        :return: np.ndarray - a read-only memory map of the cached array
+        """
+        path = self.path(key, name)
+        try:
+            array = np.load(path, mmap_mode='r')
+            # the access time of a hit, for the least recently used eviction
+            os.utime(path)
+            logger.info('Loaded %s from cache', name)
+        except (FileNotFoundError, ValueError):
+            array = build()
+            self._store(path, array)
+            self.evict(keep=path)
+            array = np.load(path, mmap_mode='r')
+
+        # a plain ndarray view of the map, compiled kernels do not take the np.memmap subclass
+        return np.asarray(array)
+
+    def _store(self, path: str, array: np.ndarray):
+        # written to a temporary file and renamed, so other processes never map a partial file
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """
+        :return: List[Tuple[float, int, str]] - the last use, size and path of every cached array, oldest first
+        """
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith('.npy'):
+                continue
+            path = os.path.join(self.cache_dir, file_name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # evicted by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self, keep: str = ''):
+        """
+        Delete the least recently used arrays until the directory fits in max_bytes
+        :param keep: str - a path that is never deleted, the array just stored
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                # processes that already mapped the file keep their pages
+                os.remove(path)
+                logger.info('Evicted %s from cache', os.path.basename(path))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+def cached(
+        cache: Optional[ArrayCache],
+        key: Optional[str],
+        name: str,
+        build: Callable[[], np.ndarray],
+    ) -> np.ndarray:
+    """
+    Get an array through the cache, or build it when caching is disabled
+    :param cache: ArrayCache - the cache, None to always build the array
+    :param key: str - the instance key, see ArrayCache.instance_key
+    :param name: str - the name of the array
+    :param build: Callable[[], np.ndarray] - computes the array
+    :return: np.ndarray
+    """
+    if cache is None:
+        return build()
+    return cache.get(key, name, build)
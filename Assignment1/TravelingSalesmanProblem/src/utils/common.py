@@ -1,6 +1,12 @@
+import re
 import json
+from enum import Enum
+from typing import Dict, Optional, Type, TypeVar, Union
+
 import numpy as np
 
+E = TypeVar('E', bound=Enum)
+
 def np_to_python(d):
     """
     Convert NumPy data types to regular Python data types
@@ -18,6 +24,36 @@ def np_to_python(d):
 
     return d  # Return the data as-is if it's not a numpy type
 
+def normalise_enum_keys(
+        mapping: Optional[Dict[Union[E, str], int]],
+        enum_type: Type[E],
+    ) -> Optional[Dict[E, int]]:
+    """
+    Get the keys of a configuration such as the crossover type weights as members of an enum
+    :param mapping: Dict[Union[Enum, str], int] - keys given as members, or by name or value in any case,
+        e.g. {'PMX': 50, 'ox': 50}, the values of keys naming the same member are added up
+    :param enum_type: Type[Enum] - the enum of the keys
+    :return: Dict[Enum, int], None if no mapping is given
+    """
+    if mapping is None:
+        return None
+
+    # e.g. 'CrossoverType' -> 'crossover type'
+    label = re.sub(r'(?<!^)(?=[A-Z])', ' ', enum_type.__name__).lower()
+    members = {}
+    for member in enum_type:
+        members[member.name.upper()] = member
+        members[str(member.value).upper()] = member
+
+    normalised = {}
+    for key, value in mapping.items():
+        if not isinstance(key, enum_type):
+            if str(key).upper() not in members:
+                raise ValueError(f"Unknown {label} {key}")
+            key = members[str(key).upper()]
+        normalised[key] = normalised.get(key, 0) + value
+    return normalised
+
 def write_to_json(data, file_path):
     """
     Write data to a JSON file
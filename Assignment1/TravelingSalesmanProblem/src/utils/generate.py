@@ -1,46 +1,66 @@
-import random
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 import numpy as np
 
-from core.models.population import Population, Individual
-from core.evaluation.fitness import calculate_fitness
-from core.evaluation.distance import calculate_total_distance
+from core.models.population import Population, Individual, PATH_DTYPE
+from core.models.genome_index import GenomeIndex, hash_genomes
+from core.evaluation.fitness import evaluate_paths
+from core.seeding.seeding import SeedingType, generate_seed_paths
 
 def generate_initial_population(
         population_size: int,
         dimensions: int,
         distance_matrix: np.ndarray,
-        individuals: Optional[List[Individual]] = None
+        individuals: Optional[List[Individual]] = None,
+        rng: Optional[np.random.Generator] = None,
+        seeding: Optional[Dict[SeedingType, int]] = None,
+        neighbours: Optional[np.ndarray] = None,
+        cities: Optional[np.ndarray] = None,
     ) -> Population:
 
     """
     Generate a random population with unique paths.
     Calculate the distance and fitness for each of these individuals
+    The seeded paths come first, see core.seeding.seeding.generate_seed_paths.
+    The missing paths are drawn as one batch of permutations, duplicates are drawn again
     """
+    if rng is None:
+        rng = np.random.default_rng()
 
-    if individuals is None:
-        individuals = []
-    unique_paths = set(tuple(ind.path) for ind in individuals)
+    paths: List[np.ndarray] = [] if individuals is None else [ind.path for ind in individuals]
+    unique_paths = GenomeIndex(hash_genomes(paths)) if paths else GenomeIndex()
 
+    seeded_individuals = 0
     generated_individuals = 0
 
-    while len(individuals) < population_size:
-        individual = Individual(
-            path=random.sample(range(dimensions), dimensions),
-            distance=0,
-            fitness=0
-        )
+    if seeding:
+        seeds = generate_seed_paths(seeding, population_size, distance_matrix, neighbours, cities, rng)
+        for path, path_hash in zip(seeds, hash_genomes(seeds)):
+            if path_hash not in unique_paths and len(paths) < population_size:
+                paths.append(path)
+                seeded_individuals += 1
+                unique_paths.add(path_hash)
 
-        individual.distance = calculate_total_distance(individual.path, distance_matrix)
-        individual.fitness = calculate_fitness(individual.distance)
+    while len(paths) < population_size:
+        missing = population_size - len(paths)
+        candidates = rng.permuted(np.tile(np.arange(dimensions, dtype=PATH_DTYPE), (missing, 1)), axis=1)
+        candidate_hashes = hash_genomes(candidates)
 
         # we need to check if the individual with that path already exists
         # if it does, we skip it
-        if tuple(individual.path) not in unique_paths:
-            individuals.append(individual)
-            generated_individuals += 1
-            unique_paths.add(tuple(individual.path))
+        for path, path_hash in zip(candidates, candidate_hashes):
+            if path_hash not in unique_paths:
+                paths.append(path)
+                generated_individuals += 1
+                unique_paths.add(path_hash)
 
-    print(f'Generated {generated_individuals} unique individuals')
-    return Population(individuals=individuals)
+    population = Population.from_paths(np.array(paths, dtype=PATH_DTYPE).reshape(len(paths), dimensions))
+
+    # score every path in one batch
+    population.distances, population.fitness = evaluate_paths(population.paths, distance_matrix)
+
+    if seeded_individuals:
+        print(f'Generated {generated_individuals} unique individuals and {seeded_individuals} seeded individuals')
+    else:
+        print(f'Generated {generated_individuals} unique individuals')
+    return population
@@ -0,0 +1,226 @@
+import io
+import os
+import json
+import hashlib
+import itertools
+import contextlib
+from enum import Enum
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from core import genetic_algorithm
+from utils.common import np_to_python
+
+"""
+Parameter sweep over genetic_algorithm.run
+Every cell of the grid is run a number of times in a process pool. Each run gets a seed derived
+from the sweep seed, the cell and the repeat, so a sweep gives the same table however the runs
+are scheduled. Finished runs are appended to a JSON lines file, an interrupted sweep started
+again with the same file only runs the missing ones. Every line records a hash of the shared
+options and the sweep seed, and the seed of its run, a run is only reused when both still match.
+"""
+
+def _describe(value: Any) -> Any:
+    """
+    Convert a run option to a JSON value, enums are written by name
+    """
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, dict):
+        return {_describe(k): _describe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_describe(v) for v in value]
+    return np_to_python(value)
+
+def cell_key(cell: Dict[str, Any]) -> str:
+    """
+    Get the key identifying a cell of the grid in the results file
+    :param cell: Dict[str, Any] - the swept run options of the cell
+    :return: str - the cell as a JSON string with sorted keys
+    """
+    return json.dumps(_describe(cell), sort_keys=True)
+
+def options_key(options: Dict[str, Any], seed: int) -> str:
+    """
+    Get the key identifying the shared options and the seed of a sweep in the results file
+    :param options: Dict[str, Any] - the run options shared by every cell
+    :param seed: int - the sweep seed
+    :return: str - the SHA-256 of the options and the seed as a JSON string with sorted keys
+    """
+    description = json.dumps({'options': _describe(options), 'seed': seed}, sort_keys=True)
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+def grid_cells(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Expand a parameter grid into its cells
+    :param grid: Dict[str, List[Any]] - the values of each swept run option
+    :return: List[Dict[str, Any]] - every combination of the values, the last option varying fastest
+    """
+    names = list(grid.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+def run_seed(seed: int, cell_index: int, repeat: int) -> int:
+    """
+    Get the seed of one run of the sweep
+    """
+    return int(np.random.SeedSequence([seed, cell_index, repeat]).generate_state(1)[0])
+
+def _run_cell(options: Dict[str, Any], quiet: bool) -> float:
+    """
+    Run the genetic algorithm once inside a worker process
+    :return: float - the distance of the best individual
+    """
+    if quiet:
+        with contextlib.redirect_stdout(io.StringIO()):
+            info = genetic_algorithm.run(**options)
+    else:
+        info = genetic_algorithm.run(**options)
+    return float(info['best_individual']['distance'])
+
+def load_results(results_file: str) -> List[Dict[str, Any]]:
+    """
+    Load the finished runs of a sweep
+    :param results_file: str - the JSON lines file of the sweep
+    :return: List[Dict[str, Any]] - every finished run, an incomplete last line is ignored
+    """
+    results = []
+    if not os.path.exists(results_file):
+        return results
+    with open(results_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError:
+                # the sweep was interrupted while writing this line
+                continue
+    return results
+
+def _end_last_line(results_file: str):
+    # an interrupted write leaves a partial line, new results must start on a line of their own
+    if not os.path.exists(results_file) or os.path.getsize(results_file) == 0:
+        return
+    with open(results_file, 'rb+') as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b'\n':
+            f.write(b'\n')
+
+def summarise(distances: List[float]) -> Dict[str, float]:
+    """
+    Aggregate the best distances of the runs of a cell
+    """
+    return {
+        'runs': len(distances),
+        'min': float(np.min(distances)),
+        'max': float(np.max(distances)),
+        'mean': float(np.mean(distances)),
+        'std': float(np.std(distances)),
+    }
+
+def sweep(
+        grid: Dict[str, List[Any]],
+        repeats: int = 5,
+        options: Optional[Dict[str, Any]] = None,
+        seed: int = 0,
+        workers: Optional[int] = None,
+        results_file: Optional[str] = None,
+        quiet: bool = True,
+    ) -> Dict[str, Dict[str, Any]]:
+    """
+    Run genetic_algorithm.run for every cell of a parameter grid
+    :param grid: Dict[str, List[Any]] - the values of each swept run option
+    :param repeats: int - the number of runs per cell
+    :param options: Dict[str, Any] - run options shared by every cell
+    :param seed: int - the sweep seed, every run derives its own seed from it
+    :param workers: int - the number of worker processes, the number of cores if not given
+    :param results_file: str - JSON lines file of the finished runs, used to resume the sweep
+    :param quiet: bool - hide the output of the runs
+    :return: Dict[str, Dict[str, Any]] - the cell and the min, max, mean and std of the best distance,
+        for every cell key in grid order
+    """
+    options = options or {}
+    cells = grid_cells(grid)
+    keys = [cell_key(cell) for cell in cells]
+    sweep_key = options_key(options, seed)
+    cell_indices = {key: cell_index for cell_index, key in enumerate(keys)}
+
+    # best distance of every finished run, by cell key and repeat
+    distances: Dict[str, Dict[int, float]] = {key: {} for key in keys}
+    if results_file is not None:
+        stale = 0
+        for result in load_results(results_file):
+            if result['cell'] not in distances or result['repeat'] >= repeats:
+                continue
+            # runs of a sweep with other shared options or seeds are not reused
+            expected_seed = run_seed(seed, cell_indices[result['cell']], result['repeat'])
+            if result.get('options') != sweep_key or result.get('seed') != expected_seed:
+                stale += 1
+                continue
+            distances[result['cell']][result['repeat']] = result['distance']
+        _end_last_line(results_file)
+        finished = sum(len(runs) for runs in distances.values())
+        if finished:
+            print(f'Resuming sweep, {finished} runs already finished')
+        if stale:
+            print(f'Ignoring {stale} runs with other options or seeds')
+
+    table: Dict[str, Dict[str, Any]] = {}
+
+    def record(key: str, cell: Dict[str, Any]):
+        # add the cell to the table once all of its runs have finished
+        if len(distances[key]) == repeats:
+            runs = [distances[key][repeat] for repeat in range(repeats)]
+            table[key] = {'cell': _describe(cell), **summarise(runs)}
+
+    pending: List[Tuple[int, int]] = []
+    for cell_index, (cell, key) in enumerate(zip(cells, keys)):
+        pending.extend(
+            (cell_index, repeat) for repeat in range(repeats) if repeat not in distances[key]
+        )
+        record(key, cell)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for cell_index, repeat in pending:
+            run_options = {
+                **options,
+                **cells[cell_index],
+                'seed': run_seed(seed, cell_index, repeat),
+            }
+            futures[executor.submit(_run_cell, run_options, quiet)] = (cell_index, repeat, run_options['seed'])
+
+        for future in as_completed(futures):
+            cell_index, repeat, cell_seed = futures[future]
+            key = keys[cell_index]
+            distance = future.result()
+            distances[key][repeat] = distance
+
+            if results_file is not None:
+                with open(results_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({
+                        'cell': key,
+                        'repeat': repeat,
+                        'options': sweep_key,
+                        'seed': cell_seed,
+                        'distance': distance,
+                    }) + '\n')
+
+            print(f'Finished {cell_key(cells[cell_index])} run {repeat + 1}/{repeats}: {distance:.2f}')
+            record(key, cells[cell_index])
+
+    return {key: table[key] for key in keys}
+
+def print_table(table: Dict[str, Dict[str, Any]], name: str, option: str):
+    """
+    Print the aggregate of every cell of a sweep over a single run option
+    :param table: Dict[str, Dict[str, Any]] - the result of sweep
+    :param name: str - the label of the option, e.g. 'Crossover Rate'
+    :param option: str - the swept run option, e.g. 'chance_of_crossover'
+    """
+    for row in table.values():
+        print(f'{name}: {row["cell"][option]}')
+        print(f'Min: {row["min"]}')
+        print(f'Max: {row["max"]}')
+        print(f'Mean: {row["mean"]}')
+        print(f'Std: {row["std"]}')
@@ -1,8 +1,12 @@
-import random
+from typing import Optional
 
-def single_point_cx(parent1, parent2):
-    point = random.randint(1, len(parent1) - 1)
-    child1 = parent1[:point] + parent2[point:]
-    child2 = parent2[:point] + parent1[point:]
+import numpy as np
+
+def single_point_cx(parent1, parent2, rng: Optional[np.random.Generator] = None):
+    if rng is None:
+        rng = np.random.default_rng()
+    point = int(rng.integers(1, len(parent1)))
+    child1 = np.concatenate([parent1[:point], parent2[point:]])
+    child2 = np.concatenate([parent2[:point], parent1[point:]])
 
     return child1, child2
\ No newline at end of file
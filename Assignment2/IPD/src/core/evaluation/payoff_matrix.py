@@ -0,0 +1,165 @@
+from typing import Optional
+
+import numpy as np
+
+from core.evaluation.scoring import PAYOFF_TABLE, GROUP_PAYOFF
+
+"""
+Round-robin payoff matrix
+Actions are 0 or 1, so the payoff of one round is bilinear in the two actions:
+    T[a, b] = T[0, 0] + (T[1, 0] - T[0, 0]) * a + (T[0, 1] - T[0, 0]) * b + (T[1, 1] - T[1, 0] - T[0, 1] + T[0, 0]) * a * b
+Summed over the rounds, the payoff of agent i against agent j only needs the number of cooperations
+of each agent and the number of rounds both cooperate, which for every pair at once is the matrix
+product of the (P, R) action matrix with the transposed (Q, R) opponent matrix.
+The product runs through BLAS on float32 copies of the actions, exact for games shorter than 2^24 rounds,
+one tile of rows at a time, so the working memory stays at tile_size * Q floats next to the result.
+
+The group game of core.idp2 is linear in the number of cooperations of every round, the score of an agent
+in the game of two clusters follows from the product of the action matrix with the cooperation
+counts of the clusters in the same way.
+"""
+
+TILE_SIZE = 1024
+
+def _matrix_dtype(table: np.ndarray, rounds: int):
+    """
+    Get the smallest dtype holding the payoffs of a game of the given length
+    """
+    if not np.issubdtype(table.dtype, np.integer):
+        return np.float64
+    bound = int(np.abs(table).max()) * rounds
+    return np.int32 if bound < np.iinfo(np.int32).max else np.int64
+
+def _joint_cooperations(strategies: np.ndarray, opponents: np.ndarray, tile_size: int):
+    """
+    Yield the rows of every tile and the number of rounds each pair of the tile both cooperate
+    :param strategies: np.ndarray - (P, R) actions
+    :param opponents: np.ndarray - (Q, R) actions
+    :param tile_size: int - the number of rows per tile
+    """
+    opponents_t = opponents.astype(np.float32).T
+    for start in range(0, len(strategies), tile_size):
+        stop = min(start + tile_size, len(strategies))
+        yield start, stop, strategies[start:stop].astype(np.float32) @ opponents_t
+
+def payoff_matrix(
+        strategies: np.ndarray,
+        opponents: Optional[np.ndarray] = None,
+        payoff_table: Optional[np.ndarray] = None,
+        tile_size: int = TILE_SIZE,
+    ) -> np.ndarray:
+    """
+    Get the payoff of every strategy against every opponent
+    :param strategies: np.ndarray - (P, R) actions, 1 is cooperate and 0 is defect
+    :param opponents: np.ndarray - (Q, R) actions of the opponents, the strategies themselves if not given
+    :param payoff_table: np.ndarray - (2, 2) payoff of the row agent by (its action, the opponent action),
+        the first column of core.evaluation.scoring.PAYOFF_TABLE if not given
+    :param tile_size: int - the number of rows multiplied at once
+    :return: np.ndarray - (P, Q) total payoff of strategy i against opponent j,
+        the payoffs of the opponents are the transpose when opponents is not given
+    """
+    strategies = np.asarray(strategies)
+    opponents = strategies if opponents is None else np.asarray(opponents)
+    table = PAYOFF_TABLE[..., 0] if payoff_table is None else np.asarray(payoff_table)
+
+    rounds = min(strategies.shape[1], opponents.shape[1])
+    strategies, opponents = strategies[:, :rounds], opponents[:, :rounds]
+
+    dtype = _matrix_dtype(table, rounds)
+    table = table.astype(dtype)
+    own_weight = table[1, 0] - table[0, 0]
+    opponent_weight = table[0, 1] - table[0, 0]
+    joint_weight = table[1, 1] - table[1, 0] - table[0, 1] + table[0, 0]
+
+    own_cooperations = strategies.sum(axis=1, dtype=dtype)
+    # the part of the payoff that only depends on the opponent
+    opponent_payoffs = rounds * table[0, 0] + opponent_weight * opponents.sum(axis=1, dtype=dtype)
+
+    matrix = np.empty((len(strategies), len(opponents)), dtype=dtype)
+    for start, stop, joint in _joint_cooperations(strategies, opponents, tile_size):
+        matrix[start:stop] = opponent_payoffs
+        matrix[start:stop] += (own_weight * own_cooperations[start:stop])[:, np.newaxis]
+        matrix[start:stop] += joint_weight * joint.astype(dtype)
+    return matrix
+
+def mean_payoffs(matrix: np.ndarray, exclude_self: bool = False) -> np.ndarray:
+    """
+    Reduce a payoff matrix to the mean payoff of every row agent
+    :param matrix: np.ndarray - (P, Q) payoff matrix
+    :param exclude_self: bool - leave out the diagonal, the games of the agents against themselves
+    :return: np.ndarray - (P,) mean payoffs
+    """
+    if not exclude_self:
+        return matrix.mean(axis=1)
+    return (matrix.sum(axis=1) - np.diagonal(matrix)) / (matrix.shape[1] - 1)
+
+def group_pair_table() -> np.ndarray:
+    """
+    Get the (2, 2) payoff table of the group game of core.idp2 played by two agents
+    :return: np.ndarray - the payoff of the row agent by (its action, the other action)
+    """
+    table = np.zeros((2, 2), dtype=np.int64)
+    for action in (0, 1):
+        for other_action in (0, 1):
+            cooperations = action + other_action
+            payoff_per_cooperation, payoff_per_defection = GROUP_PAYOFF[action]
+            table[action, other_action] = payoff_per_cooperation * cooperations \
+                + payoff_per_defection * (2 - cooperations)
+    return table
+
+def cluster_game_matrix(
+        strategies: np.ndarray,
+        clusters: np.ndarray,
+        tile_size: int = TILE_SIZE,
+        rows: Optional[slice] = None,
+    ) -> np.ndarray:
+    """
+    Get the score of every agent in the group game of its cluster with every cluster, see core.idp2.play_game
+    With n agents and C cooperations in a round, a cooperating agent gets c1 * C + c2 * (n - C)
+    and a defecting agent gets d1 * C + d2 * (n - C), so over the rounds an agent with actions a gets
+        (d1 - d2) * sum(C) + d2 * n * R + (c1 - c2 - d1 + d2) * a . C + (c2 - d2) * n * sum(a)
+    where C adds the cooperation counts of the two clusters
+    :param strategies: np.ndarray - (P, R) actions of every agent
+    :param clusters: np.ndarray - (P,) cluster of every agent, from 0 to K - 1
+    :param tile_size: int - the number of rows multiplied at once
+    :param rows: slice - the agents to score, every agent if not given, so the rows can be split
+        over several processes
+    :return: np.ndarray - (P, K) total score of agent i in the game of its cluster with cluster k,
+        not divided by the number of players, the entry of its own cluster is not a game and is 0
+    """
+    strategies = np.asarray(strategies)
+    clusters = np.asarray(clusters)
+    clusters_count = int(clusters.max()) + 1
+    rounds = strategies.shape[1]
+
+    cluster_sizes = np.bincount(clusters, minlength=clusters_count)
+    # (K, R) number of cooperations of every cluster in every round, over every agent
+    cooperations = np.zeros((clusters_count, rounds), dtype=np.int64)
+    np.add.at(cooperations, clusters, strategies)
+
+    if rows is not None:
+        strategies, clusters = strategies[rows], clusters[rows]
+
+    cooperate, defect = GROUP_PAYOFF[1], GROUP_PAYOFF[0]
+    joint_weight = cooperate[0] - cooperate[1] - defect[0] + defect[1]
+
+    own_cooperations = strategies.sum(axis=1, dtype=np.int64)
+    # (K,) total cooperations of every cluster
+    cluster_cooperations = cooperations.sum(axis=1)
+
+    # (P, K) players and cooperations of the game of the cluster of every agent with every cluster
+    players = cluster_sizes[clusters][:, np.newaxis] + cluster_sizes
+    total_cooperations = cluster_cooperations[clusters][:, np.newaxis] + cluster_cooperations
+
+    matrix = np.empty((len(strategies), clusters_count), dtype=np.int64)
+    for start, stop, agent_cooperations in _joint_cooperations(strategies, cooperations, tile_size):
+        # a . C of the game, the agent against its own cluster and the other cluster
+        joint = agent_cooperations.astype(np.int64)
+        joint += joint[np.arange(stop - start), clusters[start:stop]][:, np.newaxis]
+        matrix[start:stop] = (defect[0] - defect[1]) * total_cooperations[start:stop] \
+            + defect[1] * players[start:stop] * rounds \
+            + joint_weight * joint \
+            + (cooperate[1] - defect[1]) * players[start:stop] * own_cooperations[start:stop, np.newaxis]
+
+    matrix[np.arange(len(strategies)), clusters] = 0
+    return matrix
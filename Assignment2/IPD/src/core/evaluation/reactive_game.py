@@ -0,0 +1,100 @@
+from typing import Optional
+
+import numpy as np
+
+from core.evaluation.scoring import PAYOFF_TABLE
+from core.models.reactive_genome import table_size, initial_states
+
+"""
+Simulation of reactive strategies
+Every round depends on the previous ones, so the rounds are played one after another,
+but each round is played by all the games at once: one gather from the lookup tables,
+one gather from the payoff table and a shift of the history indices.
+The games index the genomes instead of copying them, so a round robin of P genomes
+keeps P genomes and a few (P * P,) vectors in memory
+"""
+
+def _simulate(
+        genomes: np.ndarray,
+        rows: np.ndarray,
+        opponents: np.ndarray,
+        opponent_rows: np.ndarray,
+        memory: int,
+        rounds: int,
+        return_actions: bool,
+    ):
+    """
+    Play game g as genomes[rows[g]] against opponents[opponent_rows[g]], see play_reactive_games
+    """
+    size = table_size(memory)
+    mask = size - 1
+    tables = genomes[:, :size]
+    opponent_tables = opponents[:, :size]
+    states = initial_states(genomes, memory)[rows]
+    opponent_states = initial_states(opponents, memory)[opponent_rows]
+
+    games = len(rows)
+    scores = np.zeros((games, 2), dtype=np.int64)
+    if return_actions:
+        actions = np.empty((games, rounds), dtype=genomes.dtype)
+        opponent_actions = np.empty((games, rounds), dtype=genomes.dtype)
+
+    for game_round in range(rounds):
+        action = tables[rows, states].astype(np.int64)
+        opponent_action = opponent_tables[opponent_rows, opponent_states].astype(np.int64)
+        scores += PAYOFF_TABLE[action, opponent_action]
+
+        # each player sees the joint move from its own side
+        states = ((states << 2) | (action << 1) | opponent_action) & mask
+        opponent_states = ((opponent_states << 2) | (opponent_action << 1) | action) & mask
+
+        if return_actions:
+            actions[:, game_round] = action
+            opponent_actions[:, game_round] = opponent_action
+
+    if return_actions:
+        return scores, actions, opponent_actions
+    return scores
+
+def play_reactive_games(
+        genomes: np.ndarray,
+        opponents: np.ndarray,
+        memory: int,
+        rounds: int,
+        return_actions: bool = False,
+    ):
+    """
+    Play games between memory-n genomes, game g is genomes[g] against opponents[g]
+    :param genomes: np.ndarray - (G, 4^n + 2n) genomes, a single genome is played in every game
+    :param opponents: np.ndarray - (G, 4^n + 2n) genomes of the opponents, a single genome is played in every game
+    :param memory: int - the number of rounds remembered
+    :param rounds: int - the number of rounds of every game
+    :param return_actions: bool - also return the actions played
+    :return: np.ndarray - (G, 2) total payoff of both players,
+        with return_actions also the (G, rounds) actions of both players
+    """
+    genomes = np.atleast_2d(genomes)
+    opponents = np.atleast_2d(opponents)
+    games = max(len(genomes), len(opponents))
+    rows = np.arange(games) if len(genomes) > 1 else np.zeros(games, dtype=np.int64)
+    opponent_rows = np.arange(games) if len(opponents) > 1 else np.zeros(games, dtype=np.int64)
+    return _simulate(genomes, rows, opponents, opponent_rows, memory, rounds, return_actions)
+
+def reactive_payoff_matrix(
+        genomes: np.ndarray,
+        memory: int,
+        rounds: int,
+        opponents: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+    """
+    Play every genome against every opponent, all the games at once
+    :param genomes: np.ndarray - (P, 4^n + 2n) genomes
+    :param memory: int - the number of rounds remembered
+    :param rounds: int - the number of rounds of every game
+    :param opponents: np.ndarray - (Q, 4^n + 2n) genomes of the opponents, the genomes themselves if not given
+    :return: np.ndarray - (P, Q) total payoff of genome i against opponent j
+    """
+    opponents = genomes if opponents is None else opponents
+    rows, opponent_rows = np.meshgrid(np.arange(len(genomes)), np.arange(len(opponents)), indexing='ij')
+    scores = _simulate(genomes, rows.ravel(), opponents, opponent_rows.ravel(), memory, rounds, False)
+    return scores[:, 0].reshape(len(genomes), len(opponents))
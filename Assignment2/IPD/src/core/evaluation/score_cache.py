@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from core.evaluation.scoring import score_games
+from core.models.genome_index import hash_genomes
+from core.strategy.strategy import Strategy, get_strategy
+
+"""
+Cache of the scores against the fixed strategies
+The response of a fixed strategy only depends on the strategy it plays against, so the score of a
+strategy against it never changes. Elites, survivors and offspring that repeat a known strategy
+are looked up by the hash of their strategy (see core.models.genome_index) instead of playing again.
+Every entry holds the scores of one strategy against each fixed strategy it met, the entries are
+evicted least recently used first once there are max_entries of them.
+The random strategy draws new actions for every game, its games are always played
+"""
+
+# strategies whose games are played on every call
+UNCACHED_STRATEGIES = [Strategy.RANDOM]
+
+class StrategyScoreCache:
+    def __init__(self, max_entries: int = 100_000):
+        """
+        :param max_entries: int - the number of strategies kept
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Tuple[int, int], Dict[Strategy, int]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def score(
+            self,
+            strategy: np.ndarray,
+            other_strategy: Strategy,
+            rounds_per_game: int = 100,
+            rng: Optional[np.random.Generator] = None,
+            genome_hash: Optional[int] = None,
+        ) -> int:
+        """
+        Get the score of a strategy against a fixed strategy, see core.idp.play
+        :param strategy: np.ndarray - the actions of the agent
+        :param other_strategy: Strategy - the fixed strategy
+        :param rounds_per_game: int - the number of rounds
+        :param rng: np.random.Generator - draws the moves of the random strategy
+        :param genome_hash: int - the hash of the strategy, computed if not given
+        :return: int - the score of the agent
+        """
+        if other_strategy in UNCACHED_STRATEGIES:
+            return self._play(strategy, other_strategy, rounds_per_game, rng)
+
+        if genome_hash is None:
+            genome_hash = hash_genomes(strategy)[0]
+        key = (int(genome_hash), rounds_per_game)
+
+        scores = self._entries.get(key)
+        if scores is not None:
+            self._entries.move_to_end(key)
+            if other_strategy in scores:
+                self.hits += 1
+                return scores[other_strategy]
+        else:
+            scores = {}
+            self._entries[key] = scores
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        self.misses += 1
+        scores[other_strategy] = self._play(strategy, other_strategy, rounds_per_game, rng)
+        return scores[other_strategy]
+
+    @staticmethod
+    def _play(
+            strategy: np.ndarray,
+            other_strategy: Strategy,
+            rounds_per_game: int,
+            rng: Optional[np.random.Generator],
+        ) -> int:
+        other_actions = get_strategy(other_strategy, rounds_per_game, strategy, rng)
+        return int(score_games(strategy, other_actions)[0])
+
+    def statistics(self) -> Dict[str, float]:
+        """
+        Get the hits, misses, hit rate and number of entries of the cache
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,61 @@
+import numpy as np
+
+from core.models.action import Action
+
+"""
+Game scoring
+A game is scored from the two action arrays at once: the joint action of every round
+indexes a (2, 2, 2) payoff table, and the payoffs are summed over the rounds.
+Any leading dimensions are kept, so a batch of games is scored by the same few operations
+"""
+
+PAYOFF = {
+    (1,1): (3, 3), # both agents cooperate
+    (1,0): (0, 5), # agent 2 defects
+    (0,1): (5, 0), # agent 1 defects
+    (0,0): (1, 1), # both agents defect
+}
+
+# PAYOFF_TABLE[agent1_action, agent2_action] = (agent1_payoff, agent2_payoff)
+PAYOFF_TABLE = np.zeros((2, 2, 2), dtype=np.int64)
+for (agent1_action, agent2_action), payoff in PAYOFF.items():
+    PAYOFF_TABLE[agent1_action, agent2_action] = payoff
+
+# payoff of one round of a group game, see core.idp2.get_payoff:
+# GROUP_PAYOFF[action] = (payoff per cooperation, payoff per defection) of the round
+GROUP_PAYOFF = {
+    1: (2, -2), # the agent cooperates
+    0: (6, -1), # the agent defects
+}
+
+def score_games(strategy1: np.ndarray, strategy2: np.ndarray) -> np.ndarray:
+    """
+    Score games between two action arrays
+    Rounds past the end of the shorter strategy are not played
+    :param strategy1: np.ndarray - (..., rounds) actions of the first agent
+    :param strategy2: np.ndarray - (..., rounds) actions of the second agent, broadcast against strategy1
+    :return: np.ndarray - (..., 2) total payoff of each agent
+    """
+    rounds = min(np.shape(strategy1)[-1], np.shape(strategy2)[-1])
+    strategy1 = np.asarray(strategy1)[..., :rounds]
+    strategy2 = np.asarray(strategy2)[..., :rounds]
+    return PAYOFF_TABLE[strategy1, strategy2].sum(axis=-2)
+
+def score_group_games(strategies: np.ndarray) -> np.ndarray:
+    """
+    Score one game played by a whole group at once, see core.idp2.get_payoff
+    In every round a cooperating agent gets 2 * C - 2 * D and a defecting agent gets 6 * C - D,
+    where C and D count the cooperations and defections of the round
+    :param strategies: np.ndarray - (agents, rounds) actions of every agent
+    :return: np.ndarray - the total payoff of every agent
+    """
+    strategies = np.asarray(strategies)
+    cooperation_count = strategies.sum(axis=0, dtype=np.int64)
+    defection_count = len(strategies) - cooperation_count
+    cooperate, defect = GROUP_PAYOFF[Action.COOPERATE.value], GROUP_PAYOFF[Action.DEFECT.value]
+    payoffs = np.where(
+        strategies == Action.COOPERATE.value,
+        cooperate[0] * cooperation_count + cooperate[1] * defection_count,
+        defect[0] * cooperation_count + defect[1] * defection_count,
+    )
+    return payoffs.sum(axis=1)
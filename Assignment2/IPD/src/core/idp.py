@@ -6,80 +6,126 @@ Game rules
 3. If both players defect, they each get 1 point.
 4. If one player cooperates and the other defects, the cooperator gets 0 points and the defector gets 5 points.
 """
-import random
-import copy
+from typing import List, Optional, Tuple
 
 import numpy as np
 
-from core.models.agent import Agent
-from core.models.action import Action
+from core.models.agent import Agent, stack_strategies
+from core.models.genome_index import GenomeIndex, hash_genomes
+from core.models.reactive_genome import random_reactive_genomes, table_size
+from core.evaluation.scoring import PAYOFF, score_games
+from core.evaluation.reactive_game import play_reactive_games
+from core.evaluation.score_cache import StrategyScoreCache
 from core.utils.generate import generate_from_strategy, generate_random_strategy, generate_agents
 from core.utils import plot
 from core.strategy.strategy import Strategy, get_strategy
-from core.selection.selection_algorithm import tournament_selection
+from core.strategy.reactive_strategy import reactive_strategy
+from core.selection.selection_algorithm import tournament_selection, draw_tournaments
 from core.crossover.crossover_algorithm import single_point_cx
-from core.mutation.mutation_algorithm import scramble_mutation, swap_mutation
-
-PAYOFF = {
-    (1,1): (3, 3), # both agents cooperate
-    (1,0): (0, 5), # agent 2 defects
-    (0,1): (5, 0), # agent 1 defects
-    (0,0): (1, 1), # both agents defect
-}
-
-def update_scores(agent1_action, agent2_action, agent1_score, agent2_score):
-    payoff = PAYOFF[(agent1_action.value, agent2_action.value)]
-    agent1_score += payoff[0]
-    agent2_score += payoff[1]
-
-    return agent1_score, agent2_score
+from core.mutation.mutation_algorithm import scramble_mutation, swap_mutation, bit_flip_mutation
 
 def play_game(agent1: Agent, agent2: Agent):
-    agent1 = copy.deepcopy(agent1)
-    agent1_score = 0
-    agent2_score = 0
-
-    for _ in range(len(agent1.strategy)): # rounds of game
-        agent1_action = agent1.next_action()
-        agent2_action = agent2.next_action()
-        agent1_score, agent2_score = update_scores(agent1_action, agent2_action, agent1_score, agent2_score)
-
-    return agent1_score, agent2_score
-
-def play(agent1_strategy: list = None, agent2_strat: Strategy = Strategy.ALWAYS_COOPERATE, rounds_per_game: int = 100) -> int:
+    """
+    Play the strategies of two agents against each other, every round is scored at once
+    (see core.evaluation.scoring). The strategies are only read, so the agents are played by reference
+    """
+    agent1_score, agent2_score = score_games(agent1.strategy, agent2.strategy)
+    return int(agent1_score), int(agent2_score)
+
+def play(
+        agent1_strategy: Optional[np.ndarray] = None,
+        agent2_strat: Strategy = Strategy.ALWAYS_COOPERATE,
+        rounds_per_game: int = 100,
+        rng: Optional[np.random.Generator] = None,
+) -> int:
     if agent1_strategy is None:
-        agent1_strategy = generate_random_strategy(rounds_per_game)
-
-    agent2_strategy = generate_from_strategy(rounds_per_game, agent2_strat, agent1_strategy)
-
-    agent1 = Agent(agent1_strategy)
-    agent2 = Agent(agent2_strategy)
-
-    agent1_score, _ = play_game(agent1, agent2)
-
-    return agent1_score
-
-def calculate_fitness(agents, other_strategy: Strategy, rounds_per_game: int = 100):
-    for agent in agents:
-            agent.fitness = play(agent.strategy, other_strategy, rounds_per_game)
+        agent1_strategy = generate_random_strategy(rounds_per_game, rng)
+
+    agent2_strategy = generate_from_strategy(rounds_per_game, agent2_strat, agent1_strategy, rng)
+
+    agent1_score, _ = score_games(agent1_strategy, agent2_strategy)
+
+    return int(agent1_score)
+
+def hash_agents(agents: List[Agent]) -> np.ndarray:
+    """
+    Hash the strategy of every agent, see core.models.genome_index
+    """
+    return hash_genomes(stack_strategies(agents))
+
+def sort_agents(agents: List[Agent], agent_hashes: List[int]) -> Tuple[List[Agent], List[int]]:
+    """
+    Sort agents from the fittest, their hashes are reordered with them
+    """
+    order = sorted(range(len(agents)), key=lambda i: agents[i].fitness, reverse=True)
+    return [agents[i] for i in order], [agent_hashes[i] for i in order]
+
+def calculate_fitness(
+        agents,
+        other_strategy: Strategy,
+        rounds_per_game: int = 100,
+        rng: Optional[np.random.Generator] = None,
+        score_cache: Optional[StrategyScoreCache] = None,
+        agent_hashes: Optional[List[int]] = None,
+):
+    """
+    Set the fitness of every agent to its score against a fixed strategy
+    Known strategies are looked up in score_cache instead of playing again
+    :param agent_hashes: List[int] - the hash of every agent, computed if not given
+    """
+    if score_cache is None:
+        score_cache = StrategyScoreCache()
+
+    if agent_hashes is None:
+        agent_hashes = hash_agents(agents) if agents else []
+    for agent, agent_hash in zip(agents, agent_hashes):
+            agent.fitness = score_cache.score(agent.strategy, other_strategy, rounds_per_game, rng, agent_hash)
     return agents
 
 
-def foo(strategy: Strategy = Strategy.PAVLOV):
+def foo(
+        strategy: Strategy = Strategy.PAVLOV,
+        seed: Optional[int] = None,
+        rng: Optional[np.random.Generator] = None,
+        plot_graphs: bool = True,
+        verbose: int = 1,
+):
+    """
+    Evolve strategies against a fixed strategy
+    :param strategy: Strategy - the opponent
+    :param seed: int - seed of the run generator, drawn from the OS if not given
+    :param rng: np.random.Generator - the run generator, overrides seed
+    :param plot_graphs: bool - plot the run
+    :param verbose: int - print every generation and the best strategy when above 0
+    :return: Dict[str, Any] - the best strategy, its fitness, the best fitness of every generation
+        and the statistics of the score cache
+    """
     generations = 80
     rounds_per_game = 100
 
-    population = generate_agents(50, rounds_per_game)
+    # every random draw of the run comes from this generator,
+    # so a run with the same seed gives the same result
+    if rng is None:
+        rng = np.random.default_rng(seed)
+
+    population = generate_agents(50, rounds_per_game, rng)
     elite_size = 3
-    population = calculate_fitness(population, strategy, rounds_per_game)
-    population.sort(key=lambda x: x.fitness, reverse=True)
+    # offspring that repeat a known strategy are not played again
+    score_cache = StrategyScoreCache()
+    # hash of the strategy of every agent, kept next to the population through every replacement and sort
+    population_hashes = list(hash_agents(population))
+    population = calculate_fitness(population, strategy, rounds_per_game, rng, score_cache, population_hashes)
+    population, population_hashes = sort_agents(population, population_hashes)
+
+    genome_index = GenomeIndex(population_hashes)
 
     fitness_tracker = []
     strategy_tracker = []
-    plot.plot_strategy_versus_other(
-        population[0].strategy,
-        get_strategy(strategy, rounds_per_game, population[0].strategy)
-    )
+    if plot_graphs:
+        plot.plot_strategy_versus_other(
+            population[0].strategy,
+            get_strategy(strategy, rounds_per_game, population[0].strategy)
+        )
     for gen in range(generations):
         
         fitness_tracker.append(population[0].fitness)
@@ -87,62 +133,190 @@ def foo(strategy: Strategy = Strategy.PAVLOV):
         #     print(f'Generation: {gen}, Current best strategy: {population[0].print_strategy()}')
 
         elite_agents = population[:elite_size]
+        elite_hashes = population_hashes[:elite_size]
         # tournament selection
         selected_agents = tournament_selection(
             agents=population,
             selects=int(len(population) * 0.8),
             tournament_size=3,
+            rng=rng,
         )
 
         # crossover
         offspring = []
-        random.shuffle(selected_agents)
+        rng.shuffle(selected_agents)
+        pair_crossed = rng.integers(0, 101, size=len(selected_agents) // 2) < 95 # chance at crossover
 
         for i in range(0, len(selected_agents), 2):
             if i + 1 >= len(selected_agents):
-                offspring.append(selected_agents[i])
+                # the strategy is shared, a mutation gives the child its own copy
+                offspring.append(Agent(selected_agents[i].strategy))
                 break
 
             # perform crossover
-            if random.randint(0, 100) < 95: # chance at crossover
+            if pair_crossed[i // 2]:
                 child1, child2 = single_point_cx(
                     selected_agents[i].strategy,
-                    selected_agents[i + 1].strategy
+                    selected_agents[i + 1].strategy,
+                    rng
                 )
 
                 offspring.append(Agent(child1))
                 offspring.append(Agent(child2))
 
             # perform mutation
+            mutated = rng.integers(0, 101, size=len(offspring)) < 15
+            scrambled = rng.integers(0, 101, size=len(offspring)) < 50
             for index, agent in enumerate(offspring):
-                if random.randint(0, 100) < 15:
-                    if random.randint(0, 100) < 50:
-                        offspring[index].strategy = scramble_mutation(agent.strategy)
+                if mutated[index]:
+                    if scrambled[index]:
+                        offspring[index].strategy = scramble_mutation(agent.strategy, rng)
                     else:
-                        offspring[index].strategy = swap_mutation(agent.strategy)
+                        offspring[index].strategy = swap_mutation(agent.strategy, rng)
 
 
-        offspring = calculate_fitness(offspring, strategy, rounds_per_game)
+        offspring_hashes = list(hash_agents(offspring)) if offspring else []
+        offspring = calculate_fitness(offspring, strategy, rounds_per_game, rng, score_cache, offspring_hashes)
 
         for index, offspring_agent in enumerate(offspring):
-            if tuple(offspring_agent.strategy) in [tuple(agent.strategy) for agent in population]:
+            if offspring_hashes[index] in genome_index:
                 continue
+            genome_index.replace(population_hashes[-(index+1)], offspring_hashes[index])
             population[-(index+1)] = offspring_agent
+            population_hashes[-(index+1)] = offspring_hashes[index]
 
+        for index, elite_hash in enumerate(elite_hashes):
+            genome_index.replace(population_hashes[index], elite_hash)
         population[0:elite_size] = elite_agents
+        population_hashes[0:elite_size] = elite_hashes
 
         # sort again
-        population.sort(key=lambda x: x.fitness, reverse=True)
+        population, population_hashes = sort_agents(population, population_hashes)
 
         average_fitness = np.mean([agent.fitness for agent in population])
-        print(f'Generation: {gen+1}, Best Fitness: {population[0].fitness}, Average Fitness: {average_fitness}')
+        if verbose > 0:
+            print(f'Generation: {gen+1}, Best Fitness: {population[0].fitness}, Average Fitness: {average_fitness}')
         strategy_tracker.append(population[0].strategy)
 
-    print(f'Best strategy: {population[0].print_strategy()}')
-    plot.plot_fitness_over_time(fitness_tracker)
-    plot.plot_cooperation_versus_defect(population[0].strategy)
-    plot.plot_cooperation_and_defect_over_time(strategy_tracker)
-    plot.plot_strategy_versus_other(
-        population[0].strategy,
-        get_strategy(strategy, rounds_per_game, population[0].strategy)
-    )
\ No newline at end of file
+    if verbose > 0:
+        print(f'Best strategy: {population[0].print_strategy()}')
+    if plot_graphs:
+        plot.plot_fitness_over_time(fitness_tracker)
+        plot.plot_cooperation_versus_defect(population[0].strategy)
+        plot.plot_cooperation_and_defect_over_time(strategy_tracker)
+        plot.plot_strategy_versus_other(
+            population[0].strategy,
+            get_strategy(strategy, rounds_per_game, population[0].strategy)
+        )
+
+    return {
+        'strategy': population[0].strategy,
+        'fitness': population[0].fitness,
+        'fitness_over_time': fitness_tracker,
+        'score_cache': score_cache.statistics(),
+    }
+
+def evolve_reactive(
+        strategy: Strategy = Strategy.PAVLOV,
+        memory: int = 1,
+        rounds_per_game: int = 1000,
+        generations: int = 80,
+        population_size: int = 50,
+        elite_size: int = 3,
+        seed: Optional[int] = None,
+        rng: Optional[np.random.Generator] = None,
+        plot_graphs: bool = True,
+        verbose: int = 1,
+):
+    """
+    Evolve memory-n reactive strategies against a fixed strategy, the reactive counterpart of foo
+    The population is a (population_size, 4^n + 2n) genome matrix (see core.models.reactive_genome)
+    and every generation plays all of its games against the opponent at once
+    :param strategy: Strategy - the opponent, any strategy but Strategy.RANDOM
+    :param memory: int - the number of rounds the strategies remember
+    :param rounds_per_game: int - the number of rounds of every game, the genomes do not grow with it
+    :param generations: int - the number of generations
+    :param population_size: int - the number of genomes
+    :param elite_size: int - the number of best genomes that are never replaced
+    :param seed: int - seed of the run generator, drawn from the OS if not given
+    :param rng: np.random.Generator - the run generator, overrides seed
+    :param plot_graphs: bool - plot the run
+    :param verbose: int - print every generation and the best strategy when above 0
+    :return: Dict[str, Any] - the best genome, its score and the best score of every generation
+    """
+    if rng is None:
+        rng = np.random.default_rng(seed)
+
+    opponent = reactive_strategy(strategy, memory)
+
+    def score(genomes: np.ndarray) -> np.ndarray:
+        return play_reactive_games(genomes, opponent, memory, rounds_per_game)[:, 0]
+
+    population = random_reactive_genomes(population_size, memory, rng)
+    fitness = score(population)
+    # hash of every genome, kept next to the population through every replacement and sort
+    hashes = hash_genomes(population)
+    order = np.argsort(-fitness, kind='stable')
+    population, fitness, hashes = population[order], fitness[order], hashes[order]
+
+    genome_index = GenomeIndex(hashes)
+
+    fitness_tracker = []
+    for gen in range(generations):
+        fitness_tracker.append(int(fitness[0]))
+
+        # tournament selection
+        selects = int(population_size * 0.8)
+        tournaments = draw_tournaments(population_size, selects, 3, rng)
+        parents = tournaments[np.arange(selects), np.argmax(fitness[tournaments], axis=1)]
+        rng.shuffle(parents)
+
+        # crossover, the pairs that are not crossed go through unchanged
+        offspring = population[parents]
+        pair_crossed = rng.integers(0, 101, size=selects // 2) < 95 # chance at crossover
+        for pair in np.flatnonzero(pair_crossed):
+            offspring[2 * pair], offspring[2 * pair + 1] = single_point_cx(
+                offspring[2 * pair],
+                offspring[2 * pair + 1],
+                rng
+            )
+
+        # mutation
+        mutated = rng.integers(0, 101, size=len(offspring)) < 15
+        for index in np.flatnonzero(mutated):
+            offspring[index] = bit_flip_mutation(offspring[index], rng=rng)
+
+        offspring_fitness = score(offspring)
+
+        # replace the worst genomes, the elites are never written
+        offspring_hashes = hash_genomes(offspring)
+        for index in range(min(len(offspring), population_size - elite_size)):
+            if offspring_hashes[index] in genome_index:
+                continue
+            genome_index.replace(hashes[-(index+1)], offspring_hashes[index])
+            population[-(index+1)] = offspring[index]
+            fitness[-(index+1)] = offspring_fitness[index]
+            hashes[-(index+1)] = offspring_hashes[index]
+
+        # sort again
+        order = np.argsort(-fitness, kind='stable')
+        population, fitness, hashes = population[order], fitness[order], hashes[order]
+
+        if verbose > 0:
+            print(f'Generation: {gen+1}, Best Fitness: {fitness[0]}, Average Fitness: {np.mean(fitness)}')
+
+    best = population[0]
+    if verbose > 0:
+        print(f'Best strategy: {["C" if action else "D" for action in best[:table_size(memory)]]}')
+    if plot_graphs:
+        _, best_actions, opponent_actions = play_reactive_games(
+            best, opponent, memory, rounds_per_game, return_actions=True
+        )
+        plot.plot_fitness_over_time(fitness_tracker)
+        plot.plot_strategy_versus_other(best_actions[0], opponent_actions[0])
+
+    return {
+        'strategy': best,
+        'fitness': int(fitness[0]),
+        'fitness_over_time': fitness_tracker,
+    }
@@ -1,28 +1,29 @@
-import copy
-import random
-from typing import List
+from typing import List, Optional
 
 import numpy as np
 
-from core.models.agent import Agent
+from core.models.agent import Agent, stack_strategies
 from core.models.action import Action
+from core.evaluation.scoring import score_games, score_group_games
+from core.evaluation.score_cache import StrategyScoreCache
+from core.evaluation.payoff_matrix import payoff_matrix, mean_payoffs, cluster_game_matrix, group_pair_table
 from core.utils.generate import generate_agents
 from core.utils import plot
-from core.selection.selection_algorithm import tournament_selection
+from core.selection.selection_algorithm import draw_tournaments
 from core.crossover.crossover_algorithm import single_point_cx
 from core.mutation.mutation_algorithm import scramble_mutation, swap_mutation
 from core.strategy.strategy import Strategy
+from core.models.genome_index import GenomeIndex, hash_genomes
 
-from core.idp import update_scores
-from core.idp import play as play_vs_strategy
+from core.idp import hash_agents, sort_agents
 
 def count_actions(agents_actions):
     # count the number of cooperations and defections
-    cooperation_count = agents_actions.count(Action.COOPERATE)
-    defection_count = agents_actions.count(Action.DEFECT)
+    cooperation_count = int(np.count_nonzero(agents_actions))
+    defection_count = len(agents_actions) - cooperation_count
     return cooperation_count, defection_count
 
-def get_payoff(agent_action: Action, cooperation_count: int, defection_count: int):
+def get_payoff(agent_action: int, cooperation_count: int, defection_count: int):
     """
     Function to calculate the payoff for an agent based on their action,
     The payoff is calculated by the given formula
@@ -30,127 +31,363 @@ def get_payoff(agent_action: Action, cooperation_count: int, defection_count: in
     Payoff = 3 * C - 1 * D
     if the agent defects, their payoff could be:
     Payoff = 5 * C - 2 * D
-    :param agent_action: Action
+    :param agent_action: int - 1 is cooperate and 0 is defect
     :param cooperation_count: int
     :param defection_count: int
     :return payoff: int - the payoff for the agent
     """
-    if agent_action == Action.COOPERATE:
+    if agent_action == Action.COOPERATE.value:
         return (2 * cooperation_count) - (2 * defection_count)
     else:
         return (6 * cooperation_count) - (1 * defection_count)
 
 def play_agent_vs_agent(agent_1: Agent, agent_2: Agent):
-    agent_1 = copy.deepcopy(agent_1)
-    agent_2 = copy.deepcopy(agent_2)
-    
-    agent1_score,agent2_score = 0, 0
-
-    for _ in range(len(agent_1.strategy)):
-        agent1_action = agent_1.next_action()
-        agent2_action = agent_2.next_action()
-        agent1_score, agent2_score = update_scores(
-            agent1_action,
-            agent2_action,
-            agent1_score,
-            agent2_score
-        )
-
-    return agent1_score, agent2_score
+    agent1_score, agent2_score = score_games(agent_1.strategy, agent_2.strategy)
+    return int(agent1_score), int(agent2_score)
 
 def play_game(agents: List[Agent]):
-    agents = [copy.deepcopy(agent) for agent in agents]
+    """
+    Play every agent in one game, get_payoff is applied to every round of every agent at once
+    (see core.evaluation.scoring.score_group_games)
+    """
+    rounds = min(len(agent.strategy) for agent in agents)
+    strategies = np.stack([agent.strategy[:rounds] for agent in agents])
 
-    scores = [0 for _ in agents]
+    # mean the scores
+    scores = score_group_games(strategies) / len(agents)
 
-    for _ in range(len(agents[0].strategy)):
-        agents_actions = [agent.next_action() for agent in agents]
+    return scores.tolist()
 
-        cooperation_count, defection_count = count_actions(agents_actions)
 
-        for i in range(len(agents)):
-            scores[i] += get_payoff(agents_actions[i], cooperation_count, defection_count)
-    
-    # mean the scores
-    scores = [score / len(agents) for score in scores]
+def cluster_fitness(
+        strategies: np.ndarray,
+        clusters: np.ndarray,
+        rows: slice,
+        rng: Optional[np.random.Generator],
+        score_cache: StrategyScoreCache,
+        agent_hashes,
+) -> np.ndarray:
+    """
+    Get the fitness of some of the agents of calculate_fitness, so the agents can be scored in tiles
+    :param strategies: np.ndarray - (P, R) actions of every agent of every cluster
+    :param clusters: np.ndarray - (P,) cluster of every agent
+    :param rows: slice - the agents to score
+    :param rng: np.random.Generator - draws the moves of the random strategy
+    :param score_cache: StrategyScoreCache - the scores against the fixed strategies of known strategies
+    :param agent_hashes: the hash of every agent in rows
+    :return: np.ndarray - the fitness of every agent in rows
+    """
+    cluster_sizes = np.bincount(clusters)
+    row_clusters = clusters[rows]
 
-    return scores
+    # play the agents against each other, the scores are meaned over the players of each game
+    # like play_game and added in the order of the other cluster
+    games = cluster_game_matrix(strategies, clusters, rows=rows)
+    games = games / (cluster_sizes[row_clusters][:, np.newaxis] + cluster_sizes)
+    fitness = np.zeros(len(row_clusters))
+    for other_cluster in range(len(cluster_sizes)):
+        fitness += np.where(row_clusters != other_cluster, games[:, other_cluster], 0.0)
 
+    # normalise the fitness and play the agents against a random fixed strategy
+    fitness /= len(clusters)
+    for index, (strategy, agent_hash) in enumerate(zip(strategies[rows], agent_hashes)):
+        for strat in list(Strategy):
+            fitness[index] += score_cache.score(
+                strategy,
+                strat,
+                100,
+                rng,
+                agent_hash
+            )
+    return fitness
 
-def calculate_fitness(agent_clusters: List[List[Agent]], rounds_per_game: int = 100, sample_size: int = 10):
+def calculate_fitness(
+        agent_clusters: List[List[Agent]],
+        rounds_per_game: int = 100,
+        sample_size: int = 10,
+        rng: Optional[np.random.Generator] = None,
+        score_cache: Optional[StrategyScoreCache] = None,
+        cluster_hashes: Optional[List[List[int]]] = None,
+):
     """
     Calculate the fitness of agents in the cluster
-    In order to reduce the complexity the function will randomly sample a subset of the agents
-    and play them against each other
+    Every cluster plays a group game with every other cluster, the scores of all the games
+    come from one cluster game matrix (see core.evaluation.payoff_matrix)
     :param agent_cluster: List[List[Agent]]
     :param rounds_per_game: int
     :param sample_size: int
+    :param rng: np.random.Generator - draws the moves of the random strategy
+    :param score_cache: StrategyScoreCache - the scores against the fixed strategies of known strategies
+    :param cluster_hashes: List[List[int]] - the hash of every agent of every cluster, computed if not given
     """
+    if score_cache is None:
+        score_cache = StrategyScoreCache()
 
-    # reset the fitness of all agents
-    for cluster in agent_clusters:
-        for agent in cluster:
-            agent.fitness = 0
+    agents = [agent for cluster in agent_clusters for agent in cluster]
+    if cluster_hashes is None:
+        agent_hashes = hash_agents(agents)
+    else:
+        agent_hashes = [agent_hash for hashes in cluster_hashes for agent_hash in hashes]
+    clusters = np.repeat(np.arange(len(agent_clusters)), [len(cluster) for cluster in agent_clusters])
+
+    fitness = cluster_fitness(stack_strategies(agents), clusters, slice(None), rng, score_cache, agent_hashes)
+    for agent, agent_fitness in zip(agents, fitness):
+        agent.fitness = float(agent_fitness)
 
-    # play the agents against each other
-    for i in range(len(agent_clusters)):
-        for j in range(i + 1, len(agent_clusters)):
-            combined_agents = agent_clusters[i] + agent_clusters[j]
-            scores = play_game(combined_agents)
+    return agent_clusters
 
-            for k, agent in enumerate(agent_clusters[i]):
-                agent.fitness += scores[k]
-            for k, agent in enumerate(agent_clusters[j]):
-                agent.fitness += scores[k + len(agent_clusters[i])]
+def calculate_population_fitness(agents, other_agents, rounds_per_game: int = 100):
+    """
+    Set the fitness of every agent to its mean score in a two player play_game against every other agent,
+    a reduction over the payoff matrix of the two player group game
+    """
+    if not agents:
+        return agents
 
-    # normalise the fitness and play the agents against a random fixed strategy
-    total_agents = sum(len(cluster) for cluster in agent_clusters)
-    for cluster in agent_clusters:
+    # play_game means the scores over its two players
+    matrix = payoff_matrix(stack_strategies(agents), stack_strategies(other_agents), group_pair_table()) / 2
+    for agent, fitness in zip(agents, mean_payoffs(matrix)):
+        agent.fitness = float(fitness)
+    return agents
+
+def breed_strategies(strategies: np.ndarray, fitness: np.ndarray, rng: np.random.Generator) -> List[np.ndarray]:
+    """
+    Select, cross over and mutate the offspring of one cluster, given as arrays
+    :param strategies: np.ndarray - (A, R) actions of the agents of the cluster
+    :param fitness: np.ndarray - (A,) fitness of the agents
+    :param rng: np.random.Generator - the random number generator of the cluster
+    :return: List[np.ndarray] - the strategies of the offspring
+    """
+    # tournament selection
+    selects = int(len(strategies) * 0.8)
+    tournaments = draw_tournaments(len(strategies), selects, 3, rng)
+    selected = tournaments[np.arange(selects), np.argmax(fitness[tournaments], axis=1)]
+
+    # crossover
+    offspring = []
+    rng.shuffle(selected)
+    pair_crossed = rng.integers(0, 101, size=len(selected) // 2) < 95 # chance at crossover
+
+    for i in range(0, len(selected), 2):
+        if i + 1 >= len(selected):
+            offspring.append(strategies[selected[i]])
+            break
+
+        if pair_crossed[i // 2]:
+            child1, child2 = single_point_cx(
+                strategies[selected[i]],
+                strategies[selected[i + 1]],
+                rng
+            )
+            offspring.append(child1)
+            offspring.append(child2)
+
+    # perform mutation, the mutations write to a copy
+    mutated = rng.integers(0, 101, size=len(offspring)) < 15
+    scrambled = rng.integers(0, 101, size=len(offspring)) < 50
+    for index, strategy in enumerate(offspring):
+        if mutated[index]:
+            if scrambled[index]:
+                offspring[index] = scramble_mutation(strategy, rng)
+            else:
+                offspring[index] = swap_mutation(strategy, rng)
+
+    return offspring
+
+def breed_cluster(cluster: List[Agent], rng: np.random.Generator) -> List[Agent]:
+    """
+    Select, cross over and mutate the offspring of one cluster, see breed_strategies
+    :param cluster: List[Agent] - the agents of the cluster
+    :param rng: np.random.Generator - the random number generator of the cluster
+    :return: List[Agent] - the offspring, without fitness
+    """
+    fitness = np.fromiter((agent.fitness for agent in cluster), dtype=np.float64, count=len(cluster))
+    return [Agent(strategy) for strategy in breed_strategies(stack_strategies(cluster), fitness, rng)]
+
+def score_strategies(
+        offspring: np.ndarray,
+        other_offspring: np.ndarray,
+        rounds_per_game: int,
+        rng: np.random.Generator,
+        score_cache: StrategyScoreCache,
+) -> np.ndarray:
+    """
+    Get the fitness of the offspring of a cluster, given as arrays, see score_offspring
+    :param offspring: np.ndarray - (O, R) actions of the offspring to score
+    :param other_offspring: np.ndarray - (Q, R) actions of the offspring they play against
+    :param rounds_per_game: int
+    :param rng: np.random.Generator - draws the moves of the random strategy
+    :param score_cache: StrategyScoreCache - the scores against the fixed strategies of known strategies
+    :return: np.ndarray - (O,) fitness of the offspring
+    """
+    if not len(offspring):
+        return np.zeros(0)
+
+    # play_game means the scores over its two players
+    fitness = mean_payoffs(payoff_matrix(offspring, other_offspring, group_pair_table()) / 2)
+
+    # have the offsprings also play against fixed strategies
+    for index, (strategy, offspring_hash) in enumerate(zip(offspring, hash_genomes(offspring))):
+        for strat in list(Strategy):
+            fitness[index] += score_cache.score(
+                strategy,
+                strat,
+                rounds_per_game,
+                rng,
+                offspring_hash
+            )
+    return fitness
+
+def score_offspring(
+        offspring: List[Agent],
+        other_offspring: List[Agent],
+        rounds_per_game: int,
+        rng: np.random.Generator,
+        score_cache: StrategyScoreCache,
+) -> List[Agent]:
+    """
+    Set the fitness of the offspring of a cluster, their mean score against the offspring
+    of another cluster plus their scores against every fixed strategy
+    :param offspring: List[Agent] - the offspring to score
+    :param other_offspring: List[Agent] - the offspring they play against
+    :param rounds_per_game: int
+    :param rng: np.random.Generator - draws the moves of the random strategy
+    :param score_cache: StrategyScoreCache - the scores against the fixed strategies of known strategies
+    :return: List[Agent] - the offspring
+    """
+    if not offspring:
+        return offspring
+
+    fitness = score_strategies(
+        stack_strategies(offspring),
+        stack_strategies(other_offspring),
+        rounds_per_game,
+        rng,
+        score_cache
+    )
+    for agent, agent_fitness in zip(offspring, fitness):
+        agent.fitness = float(agent_fitness)
+    return offspring
+
+def merge_offspring(
+        cluster: List[Agent],
+        cluster_hashes: List[int],
+        offspring: List[Agent],
+        genome_index: GenomeIndex,
+        elite_agents: List[Agent],
+        elite_hashes: List[int],
+):
+    """
+    Replace the worst agents of a cluster with the offspring that are new to it,
+    put the elites back and sort the cluster again
+    :param cluster: List[Agent] - the cluster, updated in place
+    :param cluster_hashes: List[int] - the hash of every agent of the cluster, updated in place
+    :param offspring: List[Agent] - the scored offspring of the cluster
+    :param genome_index: GenomeIndex - the hashes of the cluster, kept in sync
+    :param elite_agents: List[Agent] - the best agents of the cluster before the generation
+    :param elite_hashes: List[int] - the hashes of the elites
+    """
+    offspring_hashes = hash_agents(offspring) if offspring else []
+    for index, child in enumerate(offspring):
+        if offspring_hashes[index] in genome_index:
+            continue
+        genome_index.replace(cluster_hashes[-(index+1)], offspring_hashes[index])
+        cluster[-(index+1)] = child
+        cluster_hashes[-(index+1)] = offspring_hashes[index]
+
+    for index, elite_hash in enumerate(elite_hashes):
+        genome_index.replace(cluster_hashes[index], elite_hash)
+    cluster[:len(elite_agents)] = elite_agents
+    cluster_hashes[:len(elite_hashes)] = elite_hashes
+
+    cluster[:], cluster_hashes[:] = sort_agents(cluster, cluster_hashes)
+
+def count_cluster_actions(agent_cluster: List[List[Agent]]):
+    """
+    Count the cooperations and defections in the strategies of every agent across every cluster
+    """
+    cooperation_count, defection_count = 0, 0
+    for cluster in agent_cluster:
         for agent in cluster:
-            agent.fitness /= total_agents
-            for strat in list(Strategy):
-                agent.fitness += play_vs_strategy(
-                    agent.strategy,
-                    strat,
-                    100
-                )
+            agent_cooperations, agent_defections = count_actions(agent.strategy)
+            cooperation_count += agent_cooperations
+            defection_count += agent_defections
+    return cooperation_count, defection_count
 
+def report_clusters(
+        agent_cluster: List[List[Agent]],
+        rounds_per_game: int,
+        score_cache: StrategyScoreCache,
+        agent_cluster_fitness_tracker: List[List[int]],
+        total_cooperation_tracker: List[List[float]],
+        total_defection_tracker: List[List[float]],
+):
+    """
+    Print how the best agent of every cluster plays and plot the run
+    """
+    # play two of the best clusters against each other
 
-    return agent_clusters
+    best_agent_1 = agent_cluster[0][0]
+    best_agent_2 = agent_cluster[1][0]
 
-def calculate_population_fitness(agents, other_agents, rounds_per_game: int = 100):
-    for agent in agents:
-        agent.fitness = 0
-
-    for agent in agents:
-        fitness = 0
-        for other_agent in other_agents:
-            fitness += play_game([agent, other_agent])[0]
-        agent.fitness = fitness / len(other_agents)
-    return agents
+    scores = play_agent_vs_agent(best_agent_1, best_agent_2)
+    print(f'Best agent 1 scored: {scores[0]}, Best agent 2 scored: {scores[1]}')
+
+    for index, cluster in enumerate(agent_cluster):
+        print(f'Cluster {index+1} against fixed strategies')
+        scores = {
+            "Always Cooperate: ":  score_cache.score(cluster[0].strategy, Strategy.ALWAYS_COOPERATE, rounds_per_game),
+            "Always Defect: ": score_cache.score(cluster[0].strategy, Strategy.ALWAYS_DEFECT, rounds_per_game),
+            "TFT: ": score_cache.score(cluster[0].strategy, Strategy.TIT_FOR_TAT, rounds_per_game),
+            "Grim Trigger: ": score_cache.score(cluster[0].strategy, Strategy.GRIM_TRIGGER, rounds_per_game),
+            "Pavlov: ": score_cache.score(cluster[0].strategy, Strategy.PAVLOV, rounds_per_game)
+        }
+
+        for key, value in scores.items():
+            print(f"in {key} scored: {value}")
+
+
+    plot.plot_multi_agents_fitness_over_time(agent_cluster_fitness_tracker)
+    plot.plot_multi_agents_cooperation_and_defect_over_time(total_cooperation_tracker, total_defection_tracker)
+
+    for index, cluster in enumerate(agent_cluster):
+        plot.plot_cooperation_versus_defect(cluster[0].strategy, cluster=index+1)
 
 def main(
         generations: int = 500,
         rounds_per_game: int = 100,
         number_of_agents: int = 5,
-        elite_size: int = 3
+        elite_size: int = 3,
+        seed: Optional[int] = None,
+        rng: Optional[np.random.Generator] = None,
 ):
+    # every random draw of the run comes from this generator,
+    # so a run with the same seed gives the same result
+    if rng is None:
+        rng = np.random.default_rng(seed)
+
     # to have n agents we need to loop the generate_agents function n times
-    agent_cluster: List[List[Agent]] = [generate_agents(10, rounds_per_game) for _ in range(number_of_agents)]
+    agent_cluster: List[List[Agent]] = [generate_agents(10, rounds_per_game, rng) for _ in range(number_of_agents)]
+
+    # scores against the fixed strategies, survivors and repeated strategies are never played again
+    score_cache = StrategyScoreCache()
 
     # calculate initial fitness by playing all agents against each other
-    agent_cluster = calculate_fitness(agent_cluster, rounds_per_game)
+    # hash of the strategy of every agent of each cluster, kept next to the clusters through every
+    # replacement and reordered together with them
+    cluster_hashes: List[List[int]] = [list(hash_agents(cluster)) for cluster in agent_cluster]
+    agent_cluster = calculate_fitness(agent_cluster, rounds_per_game, rng=rng, score_cache=score_cache,
+                                      cluster_hashes=cluster_hashes)
+    cluster_indexes: List[GenomeIndex] = [GenomeIndex(hashes) for hashes in cluster_hashes]
 
     agent_cluster_fitness_tracker: List[List[int]] = [[] for _ in range(number_of_agents)]
     total_cooperation_tracker: List[List[float]] = [[] for _ in range(generations)]
     total_defection_tracker: List[List[float]] = [[] for _ in range(generations)]
 
-    offsprings_generated = [[] for _ in range(number_of_agents)]
-
     for gen in range(generations):
-        offsprings_generated = [[] for _ in range(number_of_agents)] # reset offspring
         print(f'Generation: {gen}')
         elite_agents_list: List[List[Agent]] = [cluster[:elite_size] for cluster in agent_cluster]
+        elite_hashes_list: List[List[int]] = [hashes[:elite_size] for hashes in cluster_hashes]
 
         # count the total number of cooperations in every agent across every cluster
 
@@ -159,119 +396,50 @@ def main(
         So that the average cooperation and defection can be plotted
         """
 
-        cooperation_count, defection_count = 0, 0
-        for cluster in agent_cluster:
-            for agent in cluster:
-                cooperation_count += agent.strategy.count(Action.COOPERATE)
-                defection_count += agent.strategy.count(Action.DEFECT)
-        total_cooperation_tracker[gen] = cooperation_count
-        total_defection_tracker[gen] = defection_count
-
-
-        # tournament selection
-        for cluster in agent_cluster:
-            selected_agents = tournament_selection(
-                agents=cluster,
-                selects=int(len(cluster) * 0.8),
-                tournament_size=3
-            )
-
-            # crossover
-            offspring = []
-            random.shuffle(selected_agents)
-
-            for i in range(0, len(selected_agents), 2):
-                if i + 1 >= len(selected_agents):
-                    offspring.append(selected_agents[i])
-                    break
-                
-                if random.randint(0, 100) < 95: # chance at crossover
-                    child1, child2 = single_point_cx(
-                        selected_agents[i].strategy,
-                        selected_agents[i + 1].strategy
-                    )
-                    offspring.append(Agent(child1))
-                    offspring.append(Agent(child2))
-
-            # perform mutation
-            for index, agent in enumerate(offspring):
-                if random.randint(0, 100) < 15:
-                    if random.randint(0, 100) < 50:
-                        offspring[index].strategy = scramble_mutation(agent.strategy)
-                    else:
-                        offspring[index].strategy = swap_mutation(agent.strategy)
-
-                # add all the offsprings to the global offspring list
-                offsprings_generated[agent_cluster.index(cluster)].append(agent)
-
-            # this is wrong we need to escape the forloop here
-
-        # loop through all the offsprings generated from the previous loop and calculate their fitness
-        for i, offspring_cluster in enumerate(offsprings_generated):
-            if i+1 >= len(offsprings_generated):
-                offsprings_generated[i] = calculate_population_fitness(
-                    agents = offspring_cluster,
-                    other_agents = offsprings_generated[0],
-                    rounds_per_game=rounds_per_game
-                )
-            else:
-                offsprings_generated[i] = calculate_population_fitness(
-                    agents = offspring_cluster,
-                    other_agents = offsprings_generated[i+1],
-                    rounds_per_game=rounds_per_game
-                )
-
-            # have the offsprings also play against fixed strategies
-            for offspring in offspring_cluster:
-                for strat in list(Strategy):
-                    offspring.fitness += play_vs_strategy(
-                        offspring.strategy,
-                        strat,
-                        rounds_per_game
-                    )
-
+        total_cooperation_tracker[gen], total_defection_tracker[gen] = count_cluster_actions(agent_cluster)
 
-        for cluster in agent_cluster:
-            offspring = offsprings_generated[agent_cluster.index(cluster)]
+        offsprings_generated = [breed_cluster(cluster, rng) for cluster in agent_cluster]
 
-            for index, child in enumerate(offspring):
-                if tuple(child.strategy) in [tuple(agent.strategy) for agent in cluster]:
-                    continue
-                cluster[-(index+1)] = child
-            cluster[:elite_size] = elite_agents_list[agent_cluster.index(cluster)]
+        # loop through all the offsprings generated from the previous loop and calculate their fitness,
+        # every cluster plays the offspring of the next one
+        for i, offspring_cluster in enumerate(offsprings_generated):
+            offsprings_generated[i] = score_offspring(
+                offspring_cluster,
+                offsprings_generated[(i + 1) % len(offsprings_generated)],
+                rounds_per_game,
+                rng,
+                score_cache
+            )
 
-            cluster.sort(key=lambda x: x.fitness, reverse=True)
+        for cluster_index, cluster in enumerate(agent_cluster):
+            merge_offspring(
+                cluster,
+                cluster_hashes[cluster_index],
+                offsprings_generated[cluster_index],
+                cluster_indexes[cluster_index],
+                elite_agents_list[cluster_index],
+                elite_hashes_list[cluster_index]
+            )
 
         # sort the clusters based on the fitness of the agents
-        agent_cluster.sort(key=lambda x: x[0].fitness, reverse=True)
+        cluster_order = sorted(range(len(agent_cluster)), key=lambda i: agent_cluster[i][0].fitness, reverse=True)
+        agent_cluster = [agent_cluster[i] for i in cluster_order]
+        cluster_indexes = [cluster_indexes[i] for i in cluster_order]
+        cluster_hashes = [cluster_hashes[i] for i in cluster_order]
 
         for i, cluster in enumerate(agent_cluster):
             agent_cluster_fitness_tracker[i].append(cluster[0].fitness)
 
-    # play two of the best clusters against each other
-
-    best_agent_1 = agent_cluster[0][0]
-    best_agent_2 = agent_cluster[1][0]
-
-    scores = play_agent_vs_agent(best_agent_1, best_agent_2)
-    print(f'Best agent 1 scored: {scores[0]}, Best agent 2 scored: {scores[1]}')
-
-    for index, cluster in enumerate(agent_cluster):
-        print(f'Cluster {index+1} against fixed strategies')
-        scores = {
-            "Always Cooperate: ":  play_vs_strategy(cluster[0].strategy, Strategy.ALWAYS_COOPERATE, rounds_per_game),
-            "Always Defect: ": play_vs_strategy(cluster[0].strategy, Strategy.ALWAYS_DEFECT, rounds_per_game),
-            "TFT: ": play_vs_strategy(cluster[0].strategy, Strategy.TIT_FOR_TAT, rounds_per_game),
-            "Grim Trigger: ": play_vs_strategy(cluster[0].strategy, Strategy.GRIM_TRIGGER, rounds_per_game),
-            "Pavlov: ": play_vs_strategy(cluster[0].strategy, Strategy.PAVLOV, rounds_per_game)
-        }
-
-        for key, value in scores.items():
-            print(f"in {key} scored: {value}")
-
-
-    plot.plot_multi_agents_fitness_over_time(agent_cluster_fitness_tracker)
-    plot.plot_multi_agents_cooperation_and_defect_over_time(total_cooperation_tracker, total_defection_tracker)
-
-    for index, cluster in enumerate(agent_cluster):
-        plot.plot_cooperation_versus_defect(cluster[0].strategy, cluster=index+1)
+    report_clusters(
+        agent_cluster,
+        rounds_per_game,
+        score_cache,
+        agent_cluster_fitness_tracker,
+        total_cooperation_tracker,
+        total_defection_tracker
+    )
+
+    return {
+        'clusters': agent_cluster,
+        'score_cache': score_cache.statistics(),
+    }
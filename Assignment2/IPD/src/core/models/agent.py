@@ -1,22 +1,35 @@
-from typing import List
+import numpy as np
 
-from core.models.action import Action
+"""
+A strategy is a uint8 array with one action per round, 1 is cooperate and 0 is defect
+(the values of core.models.action.Action).
+The array is read-only, so agents share it by reference: elites, tournament winners and
+game participants are never copied, and an operator that changes a strategy writes to a
+copy for the child (see core.mutation.mutation_algorithm)
+"""
+
+STRATEGY_DTYPE = np.uint8
+
+def as_strategy(strategy) -> np.ndarray:
+    """
+    Get a strategy as a read-only uint8 array, an array that already is one is used as it is
+    :param strategy: array-like of 0 and 1
+    :return: np.ndarray
+    """
+    strategy = np.asarray(strategy, dtype=STRATEGY_DTYPE)
+    strategy.flags.writeable = False
+    return strategy
+
+def stack_strategies(agents) -> np.ndarray:
+    """
+    Get the strategies of a list of agents as one (agents, rounds) action matrix
+    """
+    return np.stack([agent.strategy for agent in agents])
 
 class Agent:
-    def __init__(self, strategy: List[Action], fitness: float = 0):
-        self.strategy = strategy
+    def __init__(self, strategy, fitness: float = 0):
+        self.strategy: np.ndarray = as_strategy(strategy)
         self.fitness = fitness
 
-    def next_action(self):
-        if len(self.strategy) == 0:
-            raise ValueError("Strategy is empty")
-        return self.strategy.pop(0)
-
     def print_strategy(self):
-        clean_strat = [action.value for action in self.strategy]
-        for i, action in enumerate(clean_strat):
-            if action == 1:
-                clean_strat[i] = 'C'
-            else:
-                clean_strat[i] = 'D'
-        return clean_strat
+        return ['C' if action else 'D' for action in self.strategy]
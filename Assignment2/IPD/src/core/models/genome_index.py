@@ -0,0 +1,53 @@
+import hashlib
+from collections import Counter
+from typing import Iterable
+
+import numpy as np
+
+"""
+Index of the strategy hashes of a population
+Strategies and reactive genomes are arrays of 0 and 1 (see core.models.agent), so a genome is packed
+to one bit per action and its bytes are hashed with BLAKE2b into 64 bits. The hash does not depend on
+the process, so hashes from the workers of core.parallel can be compared with the main process.
+Two different genomes share a hash with a probability of about 2^-64
+"""
+
+def hash_genomes(genomes) -> np.ndarray:
+    """
+    Hash every genome of a batch
+    :param genomes: (genomes, length) array of 0 and 1, a single genome is also accepted
+    :return: np.ndarray - the uint64 hash of each genome
+    """
+    genomes = np.asarray(genomes)
+    if genomes.ndim == 1:
+        genomes = genomes[np.newaxis, :]
+
+    # the length is part of the key, the packed bytes of genomes that only differ in trailing zeros are equal
+    length = genomes.shape[1].to_bytes(4, 'little')
+    packed = np.packbits(genomes, axis=1)
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(length + row.tobytes(), digest_size=8).digest(), 'little') for row in packed],
+        dtype=np.uint64,
+    )
+
+class GenomeIndex(Counter):
+    """
+    Multiset of the strategy hashes present in a population
+    The hash of every agent is kept next to the population, replace takes the stored hash of the
+    agent that leaves, so checking whether an offspring already exists costs O(1) and nothing is hashed twice
+    """
+
+    def __init__(self, genome_hashes: Iterable[int] = ()):
+        super().__init__(int(genome_hash) for genome_hash in genome_hashes)
+
+    def replace(self, old_hash: int, new_hash: int):
+        old_hash = int(old_hash)
+        if self[old_hash] == 0:
+            raise KeyError(f'Genome hash {old_hash} is not in the index')
+        self[old_hash] -= 1
+        if self[old_hash] == 0:
+            del self[old_hash]
+        self[int(new_hash)] += 1
+
+    def __contains__(self, genome_hash) -> bool:
+        return super().__contains__(int(genome_hash))
@@ -0,0 +1,61 @@
+from typing import Optional
+
+import numpy as np
+
+from core.models.agent import STRATEGY_DTYPE
+
+"""
+Memory-n reactive strategy genome
+A reactive strategy picks its action from the joint moves of the last n rounds instead of
+following a fixed action sequence, so it answers whatever the opponent actually plays.
+A joint move is coded from the point of view of the player, 2 * own action + other action,
+and the history of the last n joint moves is the integer with the most recent move in the lowest two bits.
+The genome is a uint8 array of 4^n + 2n actions:
+- genome[:4^n] - the lookup table, the action played after every history
+- genome[4^n:] - the assumed history before the first round, (own, other) pairs from the oldest,
+  so the first n rounds are played by the table as well
+The genome length only depends on n, not on the number of rounds of a game
+"""
+
+def table_size(memory: int) -> int:
+    """
+    Get the number of histories of a memory-n strategy
+    """
+    return 4 ** memory
+
+def genome_length(memory: int) -> int:
+    """
+    Get the length of a memory-n genome, the lookup table and the assumed history
+    """
+    return table_size(memory) + 2 * memory
+
+def initial_states(genomes: np.ndarray, memory: int) -> np.ndarray:
+    """
+    Get the history index of the assumed history of every genome
+    :param genomes: np.ndarray - (G, 4^n + 2n) genomes
+    :param memory: int - the number of rounds remembered
+    :return: np.ndarray - (G,) history indices
+    """
+    history = genomes[:, table_size(memory):].astype(np.int64)
+    codes = 2 * history[:, 0::2] + history[:, 1::2]
+    # the oldest move goes to the highest bits
+    shifts = 2 * np.arange(memory - 1, -1, -1)
+    return (codes << shifts).sum(axis=1)
+
+def random_reactive_genomes(
+        count: int,
+        memory: int = 1,
+        rng: Optional[np.random.Generator] = None,
+    ) -> np.ndarray:
+    """
+    Draw random memory-n genomes as one batch
+    :param count: int - the number of genomes
+    :param memory: int - the number of rounds remembered
+    :param rng: np.random.Generator - the random number generator, a fresh one if not given
+    :return: np.ndarray - (count, 4^n + 2n) genomes
+    """
+    if memory < 1:
+        raise ValueError('memory must be at least 1')
+    if rng is None:
+        rng = np.random.default_rng()
+    return rng.integers(0, 2, size=(count, genome_length(memory))).astype(STRATEGY_DTYPE)
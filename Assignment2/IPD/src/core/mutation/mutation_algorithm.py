@@ -1,25 +1,58 @@
 
+from typing import Optional
+
 import numpy as np
 
+"""
+Strategies are read-only arrays shared between agents,
+every mutation writes to its own copy and returns it
+"""
+
 def scramble_mutation(
-        strategy: list,
-):
+        strategy: np.ndarray,
+        rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    if rng is None:
+        rng = np.random.default_rng()
+    strategy = strategy.copy()
     genome_length = len(strategy)
-    random_subset = np.random.randint(0, genome_length, 2)
+    random_subset = rng.integers(0, genome_length, 2)
     start, end = min(random_subset), max(random_subset)
 
-    subset = strategy[start:end]
-    np.random.shuffle(subset)
-    strategy[start:end] = subset
+    # the slice is a view, shuffling it shuffles the copy in place
+    rng.shuffle(strategy[start:end])
 
     return strategy
 
 def swap_mutation(
-        strategy: list,
-):
+        strategy: np.ndarray,
+        rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    if rng is None:
+        rng = np.random.default_rng()
+    strategy = strategy.copy()
     genome_length = len(strategy)
-    mutation_points = np.random.choice(genome_length, 2, replace=False)
+    mutation_points = rng.choice(genome_length, 2, replace=False)
+
+    strategy[mutation_points] = strategy[mutation_points[::-1]]
+    return strategy
 
-    strategy[mutation_points[0]], strategy[mutation_points[1]] = \
-        strategy[mutation_points[1]], strategy[mutation_points[0]]
-    return strategy
\ No newline at end of file
+def bit_flip_mutation(
+        strategy: np.ndarray,
+        rate: Optional[float] = None,
+        rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    """
+    Flip every action with a small probability, meant for the lookup tables of
+    reactive genomes (see core.models.reactive_genome) where every entry is an independent decision
+    :param strategy: np.ndarray - the actions
+    :param rate: float - the probability of each flip, one flip per strategy on average if not given
+    :param rng: np.random.Generator - the random number generator, a fresh one if not given
+    :return: np.ndarray - the mutated copy
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    if rate is None:
+        rate = 1 / len(strategy)
+    flips = rng.random(len(strategy)) < rate
+    return strategy ^ flips.astype(strategy.dtype)
@@ -0,0 +1,347 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from core.models.agent import Agent, STRATEGY_DTYPE
+from core.models.genome_index import GenomeIndex, hash_genomes
+from core.evaluation.score_cache import StrategyScoreCache
+from core.strategy.strategy import Strategy
+from core.utils.generate import generate_strategies
+from core.idp import foo
+from core.idp2 import cluster_fitness, breed_strategies, score_strategies, report_clusters
+
+"""
+Parallel drivers
+run_clusters is idp2.main with the clusters spread over worker processes.
+The strategies and fitness of the clusters and of their offspring live in shared memory and are
+the state of the run, the workers map them instead of receiving copies, and only the offspring
+counts, the generators and the cache statistics travel between the processes.
+The initial fitness is split into one tile of rows of the cluster game matrix per cluster,
+then every generation has two parallel steps:
+1. every cluster selects, crosses over and mutates its offspring
+2. the offspring of every cluster play the offspring of the next cluster and the fixed strategies,
+   one tile of the pairwise payoff matrix per cluster
+The main process merges the offspring into the shared rows of their cluster and ranks the clusters,
+a cluster keeps its slot for the whole run. Agents are only built for the report and the result.
+Every cluster draws from its own child stream of the run generator, so a run with the same seed
+gives the same result for any number of workers, although not the result of idp2.main.
+
+run_strategies runs idp.foo against every fixed strategy at once, one process per strategy.
+
+Both create process pools, call them under `if __name__ == '__main__':`
+"""
+
+# state of a worker process, set once by _attach_worker
+_worker: Dict[str, Any] = {}
+
+def _create_block(shape: Tuple[int, ...], dtype) -> Tuple[SharedMemory, np.ndarray]:
+    """
+    Create a shared memory segment holding an array of the given shape
+    """
+    size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    shared_memory = SharedMemory(create=True, size=max(size, 1))
+    return shared_memory, np.ndarray(shape, dtype=dtype, buffer=shared_memory.buf)
+
+def _attach_worker(blocks: Dict[str, Tuple[str, Tuple[int, ...], str]], rounds_per_game: int):
+    """
+    Map the shared strategies and fitness of a worker process
+    :param blocks: Dict[str, Tuple[str, Tuple[int, ...], str]] - the segment name, shape and dtype of every array
+    :param rounds_per_game: int
+    """
+    # the workers share the resource tracker of the main process, which unlinks the segments
+    _worker['shared_memory'] = []
+    for key, (name, shape, dtype) in blocks.items():
+        shared_memory = SharedMemory(name=name)
+        _worker['shared_memory'].append(shared_memory)
+        _worker[key] = np.ndarray(shape, dtype=dtype, buffer=shared_memory.buf)
+    _worker['rounds_per_game'] = rounds_per_game
+    _worker['score_cache'] = StrategyScoreCache()
+
+def _initial_fitness(
+        slot: int,
+        hashes: np.ndarray,
+        rng: np.random.Generator,
+    ) -> Tuple[np.random.Generator, int, Dict[str, float]]:
+    """
+    Score the agents of the cluster in a slot in the game of every cluster and against the fixed strategies,
+    see idp2.calculate_fitness, and write their fitness to the shared fitness
+    :param hashes: np.ndarray - the hash of every agent of the cluster
+    :return: Tuple[np.random.Generator, int, Dict[str, float]] - the advanced generator of the cluster,
+        the process id of the worker and the statistics of its score cache
+    """
+    clusters_count, agents_per_cluster, rounds_per_game = _worker['population'].shape
+    _worker['fitness'][slot] = cluster_fitness(
+        _worker['population'].reshape(clusters_count * agents_per_cluster, rounds_per_game),
+        np.repeat(np.arange(clusters_count), agents_per_cluster),
+        slice(slot * agents_per_cluster, (slot + 1) * agents_per_cluster),
+        rng,
+        _worker['score_cache'],
+        hashes
+    )
+    return rng, os.getpid(), _worker['score_cache'].statistics()
+
+def _breed_cluster(slot: int, rng: np.random.Generator) -> Tuple[int, np.random.Generator]:
+    """
+    Breed the offspring of the cluster in a slot and write them to the shared offspring
+    :return: Tuple[int, np.random.Generator] - the number of offspring and the advanced generator of the cluster
+    """
+    offspring = breed_strategies(_worker['population'][slot], _worker['fitness'][slot], rng)
+    if offspring:
+        _worker['offspring'][slot, :len(offspring)] = offspring
+    return len(offspring), rng
+
+def _score_offspring(
+        slot: int,
+        other_slot: int,
+        counts: List[int],
+        rng: np.random.Generator,
+    ) -> Tuple[np.random.Generator, int, Dict[str, float]]:
+    """
+    Score the offspring of the cluster in a slot against the offspring in other_slot and the fixed strategies,
+    and write their fitness to the shared offspring fitness
+    :return: Tuple[np.random.Generator, int, Dict[str, float]] - the advanced generator of the cluster,
+        the process id of the worker and the statistics of its score cache
+    """
+    _worker['offspring_fitness'][slot, :counts[slot]] = score_strategies(
+        _worker['offspring'][slot, :counts[slot]],
+        _worker['offspring'][other_slot, :counts[other_slot]],
+        _worker['rounds_per_game'],
+        rng,
+        _worker['score_cache']
+    )
+    return rng, os.getpid(), _worker['score_cache'].statistics()
+
+def _merge_offspring(
+        population: np.ndarray,
+        fitness: np.ndarray,
+        hashes: np.ndarray,
+        offspring: np.ndarray,
+        offspring_fitness: np.ndarray,
+        genome_index: GenomeIndex,
+        elite_size: int,
+):
+    """
+    idp2.merge_offspring on the rows of one cluster, the arrays are updated in place
+    :param population: np.ndarray - (A, R) actions of the cluster, sorted from the fittest
+    :param fitness: np.ndarray - (A,) fitness of the cluster
+    :param hashes: np.ndarray - (A,) hash of every agent of the cluster
+    :param offspring: np.ndarray - (O, R) actions of the scored offspring
+    :param offspring_fitness: np.ndarray - (O,) fitness of the offspring
+    :param genome_index: GenomeIndex - the hashes of the cluster, kept in sync
+    :param elite_size: int - the number of best agents that are put back
+    """
+    elites = population[:elite_size].copy(), fitness[:elite_size].copy(), hashes[:elite_size].copy()
+
+    offspring_hashes = hash_genomes(offspring) if len(offspring) else []
+    for index in range(len(offspring)):
+        if offspring_hashes[index] in genome_index:
+            continue
+        genome_index.replace(hashes[-(index+1)], offspring_hashes[index])
+        population[-(index+1)] = offspring[index]
+        fitness[-(index+1)] = offspring_fitness[index]
+        hashes[-(index+1)] = offspring_hashes[index]
+
+    for index, elite_hash in enumerate(elites[2]):
+        genome_index.replace(hashes[index], elite_hash)
+    population[:elite_size], fitness[:elite_size], hashes[:elite_size] = elites
+
+    order = np.argsort(-fitness, kind='stable')
+    population[:], fitness[:], hashes[:] = population[order], fitness[order], hashes[order]
+
+def _cluster_agents(population: np.ndarray, fitness: np.ndarray, ranking: List[int]) -> List[List[Agent]]:
+    """
+    Copy the clusters out of the shared arrays as agents, in the order of the ranking
+    """
+    return [
+        [Agent(strategy.copy(), float(agent_fitness)) for strategy, agent_fitness in zip(population[slot], fitness[slot])]
+        for slot in ranking
+    ]
+
+def _combine_statistics(statistics: List[Dict[str, float]]) -> Dict[str, float]:
+    """
+    Add up the statistics of several score caches
+    """
+    hits = sum(s['hits'] for s in statistics)
+    misses = sum(s['misses'] for s in statistics)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+        'entries': sum(s['entries'] for s in statistics),
+    }
+
+def run_clusters(
+        generations: int = 500,
+        rounds_per_game: int = 100,
+        number_of_agents: int = 5,
+        elite_size: int = 3,
+        agents_per_cluster: int = 10,
+        workers: Optional[int] = None,
+        seed: Optional[int] = None,
+        rng: Optional[np.random.Generator] = None,
+        plot_graphs: bool = True,
+        verbose: int = 1,
+) -> Dict[str, Any]:
+    """
+    Run idp2.main with the clusters evolving in parallel worker processes
+    :param generations: int
+    :param rounds_per_game: int
+    :param number_of_agents: int - the number of clusters
+    :param elite_size: int - the number of best agents of every cluster that are kept
+    :param agents_per_cluster: int - the number of agents of every cluster
+    :param workers: int - the number of worker processes, one per cluster up to the number of cores if not given
+    :param seed: int - seed of the run generator, drawn from the OS if not given
+    :param rng: np.random.Generator - the run generator, overrides seed
+    :param plot_graphs: bool - print the report of idp2.main and plot the run
+    :param verbose: int - print every generation when above 0
+    :return: Dict[str, Any] - the clusters, sorted by their best agent, and the statistics of the score caches
+        of the main process and of every worker added up
+    """
+    if rng is None:
+        rng = np.random.default_rng(seed)
+
+    if workers is None:
+        workers = min(number_of_agents, os.cpu_count() or 1)
+
+    offspring_size = int(agents_per_cluster * 0.8)
+    shapes = {
+        'population': ((number_of_agents, agents_per_cluster, rounds_per_game), STRATEGY_DTYPE),
+        'fitness': ((number_of_agents, agents_per_cluster), np.float64),
+        'offspring': ((number_of_agents, offspring_size, rounds_per_game), STRATEGY_DTYPE),
+        'offspring_fitness': ((number_of_agents, offspring_size), np.float64),
+    }
+
+    agent_cluster_fitness_tracker: List[List[int]] = [[] for _ in range(number_of_agents)]
+    total_cooperation_tracker: List[List[float]] = [[] for _ in range(generations)]
+    total_defection_tracker: List[List[float]] = [[] for _ in range(generations)]
+    # latest statistics of the score cache of every worker, by process id
+    worker_statistics: Dict[int, Dict[str, float]] = {}
+
+    segments: List[SharedMemory] = []
+    arrays: Dict[str, np.ndarray] = {}
+    try:
+        for key, (shape, dtype) in shapes.items():
+            shared_memory, arrays[key] = _create_block(shape, dtype)
+            segments.append(shared_memory)
+        blocks = {
+            key: (shared_memory.name, shape, np.dtype(dtype).str)
+            for shared_memory, (key, (shape, dtype)) in zip(segments, shapes.items())
+        }
+        population, fitness = arrays['population'], arrays['fitness']
+
+        for slot in range(number_of_agents):
+            population[slot] = generate_strategies(agents_per_cluster, rounds_per_game, rng)
+        # hash of the strategy of every agent, kept next to the shared rows through every replacement
+        cluster_hashes = hash_genomes(population.reshape(-1, rounds_per_game)).reshape(population.shape[:2])
+        cluster_indexes: List[GenomeIndex] = [GenomeIndex(hashes) for hashes in cluster_hashes]
+        # every cluster breeds with its own child stream, a cluster and its generator keep their slot
+        cluster_rngs = rng.spawn(number_of_agents)
+        slots = list(range(number_of_agents))
+        # slots of the clusters from the best, the order the clusters pair up in
+        ranking = list(slots)
+
+        def record(results):
+            # collect the advanced generators and the cache statistics of a parallel step
+            for slot, (cluster_rng, pid, statistics) in zip(slots, results):
+                cluster_rngs[slot] = cluster_rng
+                worker_statistics[pid] = statistics
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_attach_worker,
+            initargs=(blocks, rounds_per_game),
+        ) as executor:
+            # one tile of rows of the cluster game matrix per cluster
+            record(executor.map(_initial_fitness, slots, list(cluster_hashes), cluster_rngs))
+
+            for gen in range(generations):
+                if verbose > 0:
+                    print(f'Generation: {gen}')
+                cooperations = int(np.count_nonzero(population))
+                total_cooperation_tracker[gen], total_defection_tracker[gen] = cooperations, population.size - cooperations
+
+                bred = list(executor.map(_breed_cluster, slots, cluster_rngs))
+                counts = [count for count, _ in bred]
+                cluster_rngs = [cluster_rng for _, cluster_rng in bred]
+
+                # every cluster plays the offspring of the next one in the ranking
+                next_slots = {slot: ranking[(rank + 1) % number_of_agents] for rank, slot in enumerate(ranking)}
+                record(executor.map(
+                    _score_offspring,
+                    slots,
+                    [next_slots[slot] for slot in slots],
+                    [counts] * number_of_agents,
+                    cluster_rngs,
+                ))
+
+                for slot in slots:
+                    _merge_offspring(
+                        population[slot],
+                        fitness[slot],
+                        cluster_hashes[slot],
+                        arrays['offspring'][slot, :counts[slot]],
+                        arrays['offspring_fitness'][slot, :counts[slot]],
+                        cluster_indexes[slot],
+                        elite_size
+                    )
+
+                # rank the clusters based on the fitness of their best agent
+                ranking = sorted(ranking, key=lambda slot: fitness[slot, 0], reverse=True)
+
+                for rank, slot in enumerate(ranking):
+                    agent_cluster_fitness_tracker[rank].append(float(fitness[slot, 0]))
+
+        agent_cluster = _cluster_agents(population, fitness, ranking)
+    finally:
+        arrays.clear()
+        population = fitness = None
+        for shared_memory in segments:
+            shared_memory.close()
+            shared_memory.unlink()
+
+    score_cache = StrategyScoreCache()
+    if plot_graphs:
+        report_clusters(
+            agent_cluster,
+            rounds_per_game,
+            score_cache,
+            agent_cluster_fitness_tracker,
+            total_cooperation_tracker,
+            total_defection_tracker
+        )
+
+    return {
+        'clusters': agent_cluster,
+        'score_cache': _combine_statistics([score_cache.statistics(), *worker_statistics.values()]),
+    }
+
+def _run_foo(strategy: Strategy, rng: np.random.Generator) -> Dict[str, Any]:
+    return foo(strategy, rng=rng, plot_graphs=False, verbose=0)
+
+def run_strategies(
+        strategies: Optional[List[Strategy]] = None,
+        workers: Optional[int] = None,
+        seed: Optional[int] = None,
+        rng: Optional[np.random.Generator] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run idp.foo against several fixed strategies at once, one worker process per run
+    :param strategies: List[Strategy] - the opponents, every strategy if not given
+    :param workers: int - the number of worker processes, one per strategy up to the number of cores if not given
+    :param seed: int - seed of the run generator, drawn from the OS if not given
+    :param rng: np.random.Generator - the run generator, overrides seed, every run gets a child stream of it
+    :return: Dict[str, Dict[str, Any]] - the result of foo by strategy name
+    """
+    if strategies is None:
+        strategies = list(Strategy)
+    if rng is None:
+        rng = np.random.default_rng(seed)
+    if workers is None:
+        workers = min(len(strategies), os.cpu_count() or 1)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_run_foo, strategies, rng.spawn(len(strategies)))
+        return {strategy.value: result for strategy, result in zip(strategies, results)}
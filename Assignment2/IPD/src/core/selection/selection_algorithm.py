@@ -1,29 +1,62 @@
+from typing import Optional
+
 import numpy as np
 
+def draw_tournaments(
+        population_size: int,
+        selects: int,
+        tournament_size: int,
+        rng: Optional[np.random.Generator] = None,
+    ) -> np.ndarray:
+    """
+    Draw every tournament at once
+    Each row holds `tournament_size` distinct indices, rows that drew a repeated index
+    are drawn again, which keeps every tournament a uniform sample without replacement
+    :param population_size: int - the number of agents to draw from
+    :param selects: int - the number of tournaments
+    :param tournament_size: int - the size of each tournament
+    :param rng: np.random.Generator - the random number generator, a fresh one if not given
+    :return: np.ndarray - (selects, tournament_size) matrix of indices
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    if tournament_size > population_size:
+        raise ValueError('Tournament size cannot be larger than the population')
+
+    if 2 * tournament_size > population_size:
+        # repeats would be too frequent for redrawing, rank random keys instead
+        random_keys = rng.random((selects, population_size))
+        return np.argsort(random_keys, axis=1)[:, :tournament_size]
+
+    tournaments = rng.integers(0, population_size, size=(selects, tournament_size))
+    while True:
+        ordered = np.sort(tournaments, axis=1)
+        repeated = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+        if not repeated.any():
+            return tournaments
+        tournaments[repeated] = rng.integers(0, population_size, size=(repeated.sum(), tournament_size))
+
 def tournament_selection(
         agents: list,
         selects: int = 2,
         tournament_size: int = 2,
+        rng: Optional[np.random.Generator] = None,
 ) -> list:
     """
     Tournament Selection
     this function selects the best strategies from a random subset
-    :param strategies - a list of the strategies
+    All tournaments are drawn as one (selects, tournament_size) index matrix
+    and reduced with an argmax over the fitness vector
+    :param agents: list - the agents to select from
     :param selects: int - the number of strategies to select
     :param tournament_size: int - the size of the tournament
+    :param rng: np.random.Generator - the random number generator, a fresh one if not given
     :return: list
     """
 
-    selected_agents_index = []
-    for _ in range(selects):
-        tournament_indices = np.random.choice(
-            len(agents),
-            size=tournament_size,
-            replace=False,
-        )
-        tournament_fitness = [agents[i].fitness for i in tournament_indices]
-        best_index = tournament_indices[np.argmax(tournament_fitness)]
-        selected_agents_index.append(best_index)
+    fitness = np.fromiter((agent.fitness for agent in agents), dtype=np.float64, count=len(agents))
+    tournaments = draw_tournaments(len(agents), selects, tournament_size, rng)
+    winners = tournaments[np.arange(selects), np.argmax(fitness[tournaments], axis=1)]
 
-    selected_agents = [agents[i] for i in selected_agents_index]
-    return selected_agents
\ No newline at end of file
+    selected_agents = [agents[i] for i in winners]
+    return selected_agents
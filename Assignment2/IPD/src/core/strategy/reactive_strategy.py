@@ -0,0 +1,45 @@
+import numpy as np
+
+from core.models.agent import STRATEGY_DTYPE
+from core.models.reactive_genome import table_size
+from core.strategy.strategy import Strategy
+
+"""
+The fixed strategies as memory-n reactive genomes, see core.models.reactive_genome
+They all start from a history of mutual cooperation and only look at the last round,
+its joint move is the lowest two bits of the history: bit 1 is the own action and bit 0 the other action
+- Tit for Tat plays the last action of the other agent
+- Grim Trigger cooperates while both agents cooperated in the last round,
+  after the first defection of the other agent its own defection keeps it defecting
+- Pavlov cooperates when both agents played the same action in the last round (win-stay, lose-shift).
+  core.strategy.strategy.pavlov compares with the current action of the other agent instead,
+  which only a sequence built against a known opponent can do
+The random strategy has no lookup table
+"""
+
+def reactive_strategy(strategy: Strategy, memory: int = 1) -> np.ndarray:
+    """
+    Get the memory-n genome of a fixed strategy
+    :param strategy: Strategy - any strategy but Strategy.RANDOM
+    :param memory: int - the number of rounds remembered
+    :return: np.ndarray - (4^n + 2n,) genome
+    """
+    histories = np.arange(table_size(memory))
+    own_action = (histories >> 1) & 1
+    other_action = histories & 1
+
+    if strategy == Strategy.ALWAYS_COOPERATE:
+        table = np.ones_like(histories)
+    elif strategy == Strategy.ALWAYS_DEFECT:
+        table = np.zeros_like(histories)
+    elif strategy == Strategy.TIT_FOR_TAT:
+        table = other_action
+    elif strategy == Strategy.GRIM_TRIGGER:
+        table = own_action & other_action
+    elif strategy == Strategy.PAVLOV:
+        table = (own_action == other_action).astype(np.int64)
+    else:
+        raise ValueError(f"{strategy.value} strategy has no reactive genome")
+
+    cooperative_history = np.ones(2 * memory, dtype=np.int64)
+    return np.concatenate([table, cooperative_history]).astype(STRATEGY_DTYPE)
@@ -1,8 +1,14 @@
 from enum import Enum
-from typing import List, Dict, Callable
-import random as rnd
+from typing import List, Dict, Callable, Optional
 
-from core.models.action import Action
+import numpy as np
+
+from core.models.agent import STRATEGY_DTYPE
+
+"""
+Every strategy is built as a whole uint8 action array (1 is cooperate, 0 is defect),
+the opponent based strategies from the action array of the opponent
+"""
 
 
 class Strategy(Enum):
@@ -15,59 +21,50 @@ class Strategy(Enum):
 
 
 
-def always_cooperate(count: int) -> List[Action]:
-    return [Action.COOPERATE for _ in range(count)]
+def always_cooperate(count: int) -> np.ndarray:
+    return np.ones(count, dtype=STRATEGY_DTYPE)
 
-def always_defect(count: int) -> List[Action]:
-    return [Action.DEFECT for _ in range(count)]
+def always_defect(count: int) -> np.ndarray:
+    return np.zeros(count, dtype=STRATEGY_DTYPE)
 
-def tit_for_tat(count: int, other_strategy: List[Action]) -> List[Action]:
+def tit_for_tat(count: int, other_strategy: np.ndarray) -> np.ndarray:
     """
     Do what the other agent did last round.
     1. The first action is cooperate.
     2. The following actions are the n-1 action of the other agent
     """
-    actions = [Action.COOPERATE]
-    for action in other_strategy:
-        if len(actions) >= count:
-            break
+    other_strategy = np.asarray(other_strategy, dtype=STRATEGY_DTYPE)
+    return np.concatenate([np.ones(1, dtype=STRATEGY_DTYPE), other_strategy[:count - 1]])
 
-        actions.append(action)
-    return actions
+def random(count: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    if rng is None:
+        rng = np.random.default_rng()
+    # every action is drawn in one batch, 1 is cooperate and 0 is defect
+    return rng.integers(0, 2, size=count).astype(STRATEGY_DTYPE)
 
-def random(count: int) -> List[Action]:
-    return [rnd.choice([Action.COOPERATE, Action.DEFECT]) for _ in range(count)]
 
-
-def grim_trigger(count: int, other_strategy: List[Action]) -> List[Action]:
+def grim_trigger(count: int, other_strategy: np.ndarray) -> np.ndarray:
     """
     Cooperate until the other agent defects, then alway defect
+    A round cooperates while the other agent cooperated in every earlier round,
+    the running minimum of its actions shifted by one round
     """
-    actions = []
-    defected = False
-    for action in other_strategy:
-        if defected:
-            actions.append(Action.DEFECT)
-        else:
-            if action == Action.DEFECT:
-                defected = True
-            actions.append(Action.COOPERATE)
-    return actions
-
-def pavlov(count: int, other_strategy: List[Action]) -> List[Action]:
+    other_strategy = np.asarray(other_strategy, dtype=STRATEGY_DTYPE)
+    return np.concatenate([np.ones(1, dtype=STRATEGY_DTYPE), np.minimum.accumulate(other_strategy)[:-1]])
+
+def pavlov(count: int, other_strategy: np.ndarray) -> np.ndarray:
     """
     cooperate if both agents did the same thing in the previous round, otherwise defect
+    Round i defects when the action of the other agent in round i differs from our action in round i-1,
+    so the defections are the cumulative XOR of the defections of the other agent from round 1 on
     """
-    actions = [Action.COOPERATE]
-    for i in range(1, count):
-        if other_strategy[i] == actions[i-1]:
-            actions.append(Action.COOPERATE)
-        else:
-            actions.append(Action.DEFECT)
-    return actions
+    other_strategy = np.asarray(other_strategy, dtype=STRATEGY_DTYPE)
+    other_defects = 1 - other_strategy[1:count]
+    defects = np.concatenate([[0], np.cumsum(other_defects) & 1])
+    return (1 - defects).astype(STRATEGY_DTYPE)
 
 
-strategy_functions: Dict[Strategy, Callable[..., List[Action]]] = {
+strategy_functions: Dict[Strategy, Callable[..., np.ndarray]] = {
     Strategy.ALWAYS_COOPERATE: always_cooperate,
     Strategy.ALWAYS_DEFECT: always_defect,
     Strategy.TIT_FOR_TAT: tit_for_tat,
@@ -80,10 +77,18 @@ opponent_based_strategies: List[Strategy] = [
     Strategy.GRIM_TRIGGER, Strategy.PAVLOV, Strategy.TIT_FOR_TAT
 ]
 
-def get_strategy(strategy: Strategy, count: int, other_strategy: List[Action] = None) -> List[Action]:
+def get_strategy(
+        strategy: Strategy,
+        count: int,
+        other_strategy: Optional[np.ndarray] = None,
+        rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
     """
     function to call selected strategy without manually calling strategy function
+    the random strategy draws its actions from rng
     """
+    if strategy == Strategy.RANDOM:
+        return strategy_functions[strategy](count, rng)
     if strategy in opponent_based_strategies:
         if other_strategy is None:
             raise ValueError(f"{strategy.value} strategy requires other strategy as a parameter")
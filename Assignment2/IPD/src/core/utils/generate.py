@@ -1,30 +1,45 @@
-import random
-from typing import List
+from typing import List, Optional
 
-from core.models.action import Action
-from core.strategy.strategy import Strategy, get_strategy
-from core.models.agent import Agent
+import numpy as np
 
-def generate_random_strategy(count: int) -> List[Action]:
-    return [random.choice([Action.COOPERATE, Action.DEFECT]) for _ in range(count)]
+from core.strategy.strategy import Strategy, get_strategy, random as random_strategy
+from core.models.agent import Agent, STRATEGY_DTYPE
+
+def generate_random_strategy(count: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    return random_strategy(count, rng)
 
 
 def generate_from_strategy(
         count: int,
         strategy: Strategy,
-        other_agent_strategy: List[Action] = None
-) -> List[Action]:
-    return get_strategy(strategy, count, other_agent_strategy)
+        other_agent_strategy: Optional[np.ndarray] = None,
+        rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    return get_strategy(strategy, count, other_agent_strategy, rng)
 
-def generate_agents(agents: int = 100, strategy_count: int = 100) -> List[Agent]:
+def generate_strategies(
+        agents: int = 100,
+        strategy_count: int = 100,
+        rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
     """
-    generates a list of agents with random strategies
+    generates the random strategies of a number of agents as one (agents, strategy_count) batch
     """
     if strategy_count <= 2:
         raise ValueError('strategy count must be greater than or equal to 2')
-    agent_strategies = []
-    for _ in range(agents):
-        strategy = generate_random_strategy(strategy_count)
-        agent = Agent(strategy)
-        agent_strategies.append(agent)
-    return agent_strategies
\ No newline at end of file
+    if rng is None:
+        rng = np.random.default_rng()
+
+    return rng.integers(0, 2, size=(agents, strategy_count)).astype(STRATEGY_DTYPE)
+
+def generate_agents(
+        agents: int = 100,
+        strategy_count: int = 100,
+        rng: Optional[np.random.Generator] = None,
+) -> List[Agent]:
+    """
+    generates a list of agents with random strategies
+    the strategies of every agent are drawn as one batch (see generate_strategies),
+    each agent holds a row of it
+    """
+    return [Agent(row) for row in generate_strategies(agents, strategy_count, rng)]
\ No newline at end of file
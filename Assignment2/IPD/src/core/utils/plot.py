@@ -4,8 +4,8 @@ from core.models.action import Action
 
 
 def plot_strategy_versus_other(strategy, other):
-    strategy_actions = [1 if action == Action.COOPERATE else 0 for action in strategy]
-    other_actions = [1 if action == Action.COOPERATE else 0 for action in other]
+    strategy_actions = [1 if action == Action.COOPERATE.value else 0 for action in strategy]
+    other_actions = [1 if action == Action.COOPERATE.value else 0 for action in other]
     indices = list(range(len(strategy)))
 
     plt.plot(indices, strategy_actions, label='My Strategy', color='blue')
@@ -24,8 +24,8 @@ def plot_fitness_over_time(fitness_history):
     plt.show()
 
 def plot_cooperation_versus_defect(agent_strategy, cluster: str = None):
-    cooperation_count = sum(1 for action in agent_strategy if action == Action.COOPERATE)
-    defect_count = sum(1 for action in agent_strategy if action == Action.DEFECT)
+    cooperation_count = sum(1 for action in agent_strategy if action == Action.COOPERATE.value)
+    defect_count = sum(1 for action in agent_strategy if action == Action.DEFECT.value)
 
     labels = ['Cooperate', 'Defect']
     counts = [cooperation_count, defect_count]
@@ -44,8 +44,8 @@ def plot_cooperation_and_defect_over_time(strategy_history):
     defect_counts = []
 
     for strategy in strategy_history:
-        cooperation_count = sum(1 for action in strategy if action == Action.COOPERATE)
-        defect_count = sum(1 for action in strategy if action == Action.DEFECT)
+        cooperation_count = sum(1 for action in strategy if action == Action.COOPERATE.value)
+        defect_count = sum(1 for action in strategy if action == Action.DEFECT.value)
         cooperation_counts.append(cooperation_count)
         defect_counts.append(defect_count)
 